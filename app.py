@@ -5,6 +5,7 @@ This file initializes the Flask application, configures extensions, and register
 """
 import os
 import argparse
+import json
 import threading
 import sys
 import mimetypes
@@ -16,12 +17,24 @@ from flask_limiter.util import get_remote_address
 # Load environment variables from .env file in the project root
 load_dotenv(os.path.join(os.path.abspath(os.path.dirname(__file__)), '.env'))
 
-from scripts.config import Config
+from scripts.config import Config, get_enabled_language_configs
 from scripts.extensions import db, login_manager, bcrypt
+from scripts.models import upgrade_schema
 from scripts.admin_routes import admin_bp
 from scripts.api_key_routes import api_key_bp
 from scripts.api_routes import api_bp
 from scripts.core_routes import core_bp
+from scripts.execution_queue import execution_queue
+from scripts.execution_scheduler import execution_scheduler
+from scripts.execution_cache import execution_result_cache
+from scripts.build_cache import build_artifact_cache
+from scripts.warm_pool import warm_interpreter_pool
+from scripts.code_execution import prepare_launch_profiles
+from scripts.executor_service import sandbox_executor
+from scripts.test_case_blobs import test_case_blob_store
+from scripts.data_version import data_version
+from scripts.scoreboard_cache import scoreboard_cache
+from scripts.scoreboard_events import scoreboard_events
 from scripts.theme_utils import get_active_theme
 
 def create_app(config_class=Config):
@@ -37,11 +50,32 @@ def create_app(config_class=Config):
     login_manager.init_app(app)
     login_manager.unauthorized_handler(lambda: redirect(url_for('core.home')))
     bcrypt.init_app(app)
+    # Large test case data is moved to files as test cases are created, also by seeding and imports
+    test_case_blob_store.init_app(app)
+    data_version.init_app(app)
+    # Keeps the ranked scoreboard in memory, updated as solves, awards and hint reveals commit
+    scoreboard_cache.init_app(app)
+    scoreboard_events.init_app(app)
 
-    # Create database tables if they don't exist
+    # Create database tables if they don't exist, and add columns newer than the existing tables
     with app.app_context():
         db.create_all()
+        upgrade_schema()
         app.config['ACTIVE_THEME'] = get_active_theme()
+
+    # Resume queued coding submissions and bind the sandbox worker pool to this app
+    execution_scheduler.init_app(app)
+    execution_queue.init_app(app)
+    execution_result_cache.init_app(app)
+    sandbox_executor.init_app(app)
+
+    # Sandboxes only run in this process when no executor service is configured
+    if not sandbox_executor.remote:
+        build_artifact_cache.init_app(app)
+        # Validate the sandbox launch profiles of the enabled languages once instead of on every run
+        with app.app_context():
+            prepare_launch_profiles(get_enabled_language_configs(), rootfs_dir=app.config.get('SANDBOX_ROOTFS_DIR'))
+        warm_interpreter_pool.init_app(app)
     
     # Initialize Flask-Limiter
     limiter = Limiter(
@@ -119,6 +153,38 @@ def recalculate_all_challenge_stripes(app):
             print(f"Updated stripe status for Challenge: {challenge.name}")
         print("All challenge stripe statuses recalculated successfully.")
 
+def collect_test_case_blobs(app):
+    """
+    Removes test case blob files no longer referenced by any test case.
+    """
+    with app.app_context():
+        from scripts.models import collect_test_case_blobs as collect
+        print(f"Removed {collect()} unreferenced test case blob files.")
+
+def verify_all_coding_challenges(app, challenge_ids=None, report_file=None, max_parallel=None):
+    """
+    Verifies the reference solutions of all (or the given) coding challenges in parallel,
+    prints a summary and optionally writes the full report to a JSON file.
+
+    Returns:
+        bool: True if no challenge failed verification.
+    """
+    from scripts.solution_verification import verify_coding_challenges
+    with app.app_context():
+        report = verify_coding_challenges(challenge_ids=challenge_ids or None, max_parallel=max_parallel)
+    for entry in report['challenges']:
+        print(f"[{entry['status'].upper():8}] #{entry['challenge_id']} {entry['name']}: "
+              f"{entry['passed']}/{entry['test_cases']} test cases passed in {entry['duration_seconds']:.2f}s")
+        if entry['status'] != 'verified' and entry['message']:
+            print(f"           {entry['message'].splitlines()[0]}")
+    print(f"Verified {report['verified']} of {report['total']} coding challenges in {report['duration_seconds']:.2f}s "
+          f"({report['failed']} failed, {report['skipped']} skipped, {report['error']} errors, {report['max_parallel']} at once).")
+    if report_file:
+        with open(report_file, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Verification report written to {report_file}.")
+    return report['failed'] == 0 and report['error'] == 0
+
 if __name__ == '__main__':
     from scripts.import_export import import_challenges_from_yaml, import_categories_from_yaml, import_users_from_json, export_data_to_yaml
     parser = argparse.ArgumentParser(description='WindFlag CTF Platform', add_help=False)
@@ -129,6 +195,10 @@ if __name__ == '__main__':
     parser.add_argument('-users', '-u', type=str, metavar='JSON_FILE', help='Import users from a JSON file.')
     parser.add_argument('-export-yaml', '-e', nargs='+', metavar=('OUTPUT_FILE', 'DATA_TYPE'), help='Export data to a YAML file.')
     parser.add_argument('-recalculate-stripes', action='store_true', help='Recalculate stripe statuses.')
+    parser.add_argument('-verify-challenges', nargs='*', type=int, metavar='CHALLENGE_ID', help='Verify the reference solutions of all (or the given) coding challenges.')
+    parser.add_argument('-verify-report', type=str, metavar='JSON_FILE', help='Write the -verify-challenges report to a JSON file.')
+    parser.add_argument('-verify-parallel', type=int, metavar='N', help='Number of challenges -verify-challenges verifies at once.')
+    parser.add_argument('-collect-test-case-blobs', action='store_true', help='Remove test case blob files no longer referenced by any test case.')
     parser.add_argument('-test', nargs='?', type=int, const=1800, help='Run in test mode.')
     args = parser.parse_args()
 
@@ -163,6 +233,11 @@ if __name__ == '__main__':
         export_data_to_yaml(output_file, data_type)
     elif args.recalculate_stripes:
         recalculate_all_challenge_stripes(app)
+    elif args.collect_test_case_blobs:
+        collect_test_case_blobs(app)
+    elif args.verify_challenges is not None:
+        if not verify_all_coding_challenges(app, args.verify_challenges, report_file=args.verify_report, max_parallel=args.verify_parallel):
+            sys.exit(1)
     else:
         if args.test is not None:
             timer = threading.Timer(test_mode_timeout, os._exit, args=[0])
@@ -0,0 +1,102 @@
+"""
+Load test of the code execution pipeline: result cache, sandbox slots and result handling.
+
+Submits many submissions concurrently through `run_test_cases`, the entry point used for
+graded submissions, and reports throughput and p50/p95 latency per submission. By default
+runs use the 'fake' sandbox backend, whose runtime waits --latency-ms and echoes its input,
+so the pipeline can be loaded on machines without bwrap or any language runtime.
+
+Usage:
+    python benchmarks/bench_execution_pipeline.py [--submissions 200] [--concurrency 16] [--test-cases 5]
+        [--mode sequential|batch|parallel] [--backend fake|rlimit|bwrap] [--latency-ms 50]
+        [--distinct-codes 20] [--max-sandboxes N] [--no-cache] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from scripts import code_execution
+from scripts.config import Config
+from scripts.execution_cache import execution_result_cache
+from scripts.execution_scheduler import execution_scheduler
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--submissions', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16, help="Submissions in flight at once")
+    parser.add_argument('--test-cases', type=int, default=5, help="Test cases per submission")
+    parser.add_argument('--mode', default='sequential', choices=['sequential', 'batch', 'parallel'])
+    parser.add_argument('--backend', default='fake', choices=['fake', 'rlimit', 'bwrap'])
+    parser.add_argument('--latency-ms', type=int, default=50, help="Run time of the fake backend")
+    parser.add_argument('--distinct-codes', type=int, default=20, help="Different programs submitted, the rest are resubmissions")
+    parser.add_argument('--max-sandboxes', type=int, default=None, help="CODE_EXECUTION_MAX_SANDBOXES (defaults to the configured value)")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the execution result cache")
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON for tracking over time")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(
+        SANDBOX_BACKEND=args.backend,
+        SANDBOX_FAKE_LATENCY_MS=args.latency_ms,
+        CODE_EXECUTION_MODE=args.mode,
+        EXECUTION_CACHE_SIZE=0 if args.no_cache else max(1024, args.distinct_codes * args.test_cases),
+    )
+    if args.max_sandboxes:
+        app.config['CODE_EXECUTION_MAX_SANDBOXES'] = args.max_sandboxes
+        app.config['EXECUTION_MAX_CONCURRENT_SUBMISSIONS'] = args.max_sandboxes
+    execution_result_cache.init_app(app)
+    execution_scheduler.init_app(app)
+    # Echo programs, so every test case passes with the fake and the real runtimes alike
+    test_cases = [(f"case {i}", f"case {i}") for i in range(args.test_cases)]
+
+    def submit(i):
+        code = f"print(input()) # submission {i % args.distinct_codes}"
+        start = time.perf_counter()
+        with app.app_context():
+            # Every submission comes from a different user, so the per-user limit never applies
+            results = code_execution.run_test_cases('python3', code, test_cases, user_id=i)
+        return time.perf_counter() - start, all(result.success for result in results)
+
+    with app.app_context():
+        code_execution.prepare_launch_profiles(['python3'], rootfs_dir=app.config.get('SANDBOX_ROOTFS_DIR'))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        outcomes = list(executor.map(submit, range(args.submissions)))
+    elapsed = time.perf_counter() - start
+
+    timings = [timing for timing, _ in outcomes]
+    results = {
+        'backend': args.backend,
+        'mode': args.mode,
+        'submissions': args.submissions,
+        'failed_submissions': sum(1 for _, passed in outcomes if not passed),
+        'submissions_per_second': args.submissions / elapsed,
+        'p50_ms': percentile(timings, 0.5) * 1000,
+        'p95_ms': percentile(timings, 0.95) * 1000,
+        'mean_ms': statistics.mean(timings) * 1000,
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.submissions} submissions x {args.test_cases} test cases, {args.concurrency} concurrent, "
+          f"{args.backend} backend, {args.mode} mode, cache {'off' if args.no_cache else 'on'}")
+    print(f"throughput {results['submissions_per_second']:.1f}/s, p50 {results['p50_ms']:.1f}ms, "
+          f"p95 {results['p95_ms']:.1f}ms, failed {results['failed_submissions']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark of sandbox launch and teardown latency per language.
+
+Runs a trivial program through `execute_code_in_sandbox` repeatedly and reports p50/p95
+wall time, once with the cached launch profile and in-memory code (the default) and once
+the way every run used to work: bwrap arguments rebuilt and bind paths checked per run,
+and the code written to a temporary directory that is removed afterwards. The "prepare"
+columns time only the host-side work done before bwrap is started.
+
+Run it after changing the runtime paths with configure_runtimes.py to catch regressions.
+
+Usage:
+    python benchmarks/bench_sandbox_launch.py [--runs 50] [--languages python3 bash] [--bwrap /usr/bin/bwrap] [--rootfs DIR] [--json]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from scripts import code_execution
+from scripts.config import Config
+
+# Programs printing 'ok' that pass the static analysis of their language
+TRIVIAL_PROGRAMS = {
+    'python3': "print('ok')",
+    'nodejs': "console.log('ok');",
+    'php': "<?php echo 'ok';",
+    'bash': "echo ok",
+    'dart': "void main() { print('ok'); }",
+}
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def summarise(timings):
+    return {'p50_ms': percentile(timings, 0.5) * 1000, 'p95_ms': percentile(timings, 0.95) * 1000, 'mean_ms': statistics.mean(timings) * 1000}
+
+def prepare_cached(language, code):
+    """
+    The host-side work of a run with the cached launch profile.
+    """
+    file_extension = code_execution.LANGUAGE_CONFIGS[language][1]
+    if code_execution._supports_data_binds() and language not in code_execution.LANGUAGE_BUILD_CONFIGS:
+        code_fd = code_execution._create_code_memfd(code)
+        code_execution._build_bwrap_args(language)
+        os.close(code_fd)
+    else:
+        temp_host_dir, _ = code_execution._create_sandbox_dir(code, file_extension)
+        code_execution._build_bwrap_args(language)
+        shutil.rmtree(temp_host_dir)
+
+def prepare_uncached(language, code):
+    """
+    The host-side work of a run without launch profiles: argv rebuilt, paths checked, temporary directory.
+    """
+    file_extension = code_execution.LANGUAGE_CONFIGS[language][1]
+    temp_host_dir, _ = code_execution._create_sandbox_dir(code, file_extension)
+    code_execution._build_launch_profile(language)
+    shutil.rmtree(temp_host_dir)
+
+def run_uncached(language, code):
+    # Forget the profile and pretend bwrap cannot bind data, so the run takes the per-run path
+    with code_execution._launch_profiles_lock:
+        code_execution._launch_profiles.pop(language, None)
+        data_bind_support = code_execution._data_bind_support.get(code_execution.BWRAP_PATH)
+        code_execution._data_bind_support[code_execution.BWRAP_PATH] = False
+    try:
+        return code_execution.execute_code_in_sandbox(language, code, 'ok')
+    finally:
+        with code_execution._launch_profiles_lock:
+            code_execution._data_bind_support[code_execution.BWRAP_PATH] = data_bind_support
+
+def measure(runs, f):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = f()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--languages', nargs='+', default=None, help="Defaults to every language whose runtime is installed")
+    parser.add_argument('--bwrap', default=None, help="Path of the bwrap binary (defaults to BWRAP_PATH)")
+    parser.add_argument('--rootfs', default=None, help="SANDBOX_ROOTFS_DIR to run on prepared root filesystems (defaults to the configured one)")
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON for tracking over time")
+    args = parser.parse_args()
+
+    if args.bwrap:
+        code_execution.BWRAP_PATH = args.bwrap
+    languages = args.languages or [
+        language for language, config in code_execution.LANGUAGE_CONFIGS.items() if os.path.exists(config[0])
+    ]
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    results = {}
+    with app.app_context():
+        code_execution.prepare_launch_profiles(languages, rootfs_dir=args.rootfs or app.config.get('SANDBOX_ROOTFS_DIR'))
+        for language in languages:
+            code = TRIVIAL_PROGRAMS[language]
+            # Warm up the page cache and the build cache before measuring
+            warmup = code_execution.execute_code_in_sandbox(language, code, 'ok')
+            if not warmup.success:
+                print(f"Skipping {language}: {warmup.error_message.strip()[:100]}", file=sys.stderr)
+                continue
+
+            cached_timings, cached_result = measure(args.runs, lambda: code_execution.execute_code_in_sandbox(language, code, 'ok'))
+            uncached_timings, uncached_result = measure(args.runs, lambda: run_uncached(language, code))
+            assert cached_result.success and uncached_result.success, (language, cached_result.error_message, uncached_result.error_message)
+            prepare_cached_timings, _ = measure(args.runs, lambda: prepare_cached(language, code))
+            prepare_uncached_timings, _ = measure(args.runs, lambda: prepare_uncached(language, code))
+
+            results[language] = {
+                'profile': summarise(cached_timings),
+                'per_run': summarise(uncached_timings),
+                'prepare_profile': summarise(prepare_cached_timings),
+                'prepare_per_run': summarise(prepare_uncached_timings),
+            }
+
+    if args.json:
+        print(json.dumps({'runs': args.runs, 'in_memory_code': code_execution._supports_data_binds(), 'results': results}, indent=2))
+        return
+
+    print(f"in-memory code: {'yes' if code_execution._supports_data_binds() else 'no (bwrap lacks --ro-bind-data)'}, {args.runs} runs per mode")
+    print(f"{'language':<10}{'profile p50':>13}{'p95':>9}{'per-run p50':>13}{'p95':>9}{'prepare p50':>13}{'per-run':>10}")
+    for language, result in results.items():
+        print(
+            f"{language:<10}"
+            f"{result['profile']['p50_ms']:>11.1f}ms{result['profile']['p95_ms']:>7.1f}ms"
+            f"{result['per_run']['p50_ms']:>11.1f}ms{result['per_run']['p95_ms']:>7.1f}ms"
+            f"{result['prepare_profile']['p50_ms']:>11.3f}ms{result['prepare_per_run']['p50_ms']:>8.3f}ms"
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Micro-benchmark for `_static_code_analysis` on 200 KB submissions.
+
+Compares the original linear scan over LANGUAGE_BLACKLISTS with the pre-compiled matcher,
+both on a first call and on a repeated call served from the per-code memo.
+
+Usage:
+    python benchmarks/bench_static_analysis.py [--size-kb 200] [--repeat 5]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.code_execution import LANGUAGE_BLACKLISTS, _analysis_cache, _static_code_analysis
+
+# A line of harmless code per language that contains none of the blacklisted literals,
+# so every check has to scan the whole input (the worst case for the analysis)
+CLEAN_LINES = {
+    'python3': "value{i} = value{i} + {i}\nprint(value{i})\n",
+    'nodejs': "let value{i} = {i} + 1;\nconsole.log(value{i});\n",
+    'php': "$value{i} = {i} + 1;\necho $value{i};\n",
+    'bash': "VALUE{i}={i}\necho $VALUE{i}\n",
+    'dart': "var value{i} = {i} + 1;\nprint(value{i});\n",
+}
+
+def linear_static_code_analysis(language, code):
+    """
+    The original implementation: one substring check per literal and one uncompiled re.search per pattern.
+    """
+    blacklist = LANGUAGE_BLACKLISTS[language]
+    for forbidden_import in blacklist.get('forbidden_imports', []):
+        if forbidden_import in code:
+            return False, f"Forbidden import '{forbidden_import}' detected in code. This is not allowed for security reasons."
+    for forbidden_keyword in blacklist.get('forbidden_keywords', []):
+        if forbidden_keyword in code:
+            return False, f"Forbidden keyword '{forbidden_keyword}' detected in code. This operation is not allowed."
+    for forbidden_regex_pattern in blacklist.get('forbidden_regex', []):
+        if re.search(forbidden_regex_pattern, code, re.IGNORECASE | re.DOTALL):
+            return False, f"Forbidden code pattern '{forbidden_regex_pattern}' detected. This operation is not allowed."
+    return True, "OK"
+
+def make_code(language, size_bytes):
+    lines = []
+    total = 0
+    i = 0
+    while total < size_bytes:
+        line = CLEAN_LINES[language].format(i=i)
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return ''.join(lines)
+
+def best_of(repeat, f):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = f()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-kb', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'language':<10}{'linear ms':>12}{'compiled ms':>14}{'memoised ms':>14}{'speedup':>10}  verdict")
+    for language in LANGUAGE_BLACKLISTS:
+        code = make_code(language, args.size_kb * 1024)
+        linear_ms, expected = best_of(args.repeat, lambda: linear_static_code_analysis(language, code))
+
+        def first_call():
+            _analysis_cache.clear()
+            return _static_code_analysis(language, code)
+        compiled_ms, result = best_of(args.repeat, first_call)
+        memoised_ms, _ = best_of(args.repeat, lambda: _static_code_analysis(language, code))
+
+        assert result == expected, (language, result, expected)
+        print(f"{language:<10}{linear_ms:>12.2f}{compiled_ms:>14.2f}{memoised_ms:>14.3f}{linear_ms / compiled_ms:>9.1f}x  {result[1][:40]}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Builds minimal per-language root filesystems for the code execution sandbox.
+
+For every language, the runtime, the shell tools used to start runs and all of their shared
+libraries are copied into <output>/<language>, together with the language's bind trees from
+LANGUAGE_CONFIGS and, for python3, its standard library. Point SANDBOX_ROOTFS_DIR at <output>
+and restart the application; languages without a root filesystem keep binding host paths.
+
+With --squashfs, <output>/<language>.squashfs images are written as well (requires mksquashfs).
+Mount them read-only at <SANDBOX_ROOTFS_DIR>/<language>, e.g.:
+    mount -o loop,ro /srv/windflag/rootfs/python3.squashfs /srv/windflag/rootfs/python3
+
+Usage:
+    python3 build_sandbox_rootfs.py --output /srv/windflag/rootfs [--languages python3 bash] [--include /usr/bin/sed] [--squashfs]
+"""
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+from scripts.code_execution import LANGUAGE_CONFIGS, _ROOTFS_MOUNT_POINTS
+
+# Commands every sandbox needs: runs are started with `bash -c`, batches use `timeout`,
+# and setup scripts commonly use the others
+BASE_COMMANDS = ['bash', 'sh', 'timeout', 'env', 'cat', 'echo', 'ls', 'cp', 'mkdir', 'rm']
+
+# Standard library directories not needed to run submissions
+PYTHON_STDLIB_IGNORE = shutil.ignore_patterns('test', 'idlelib', 'tkinter', 'turtledemo', 'ensurepip')
+
+def is_elf(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(4) == b'\x7fELF'
+    except OSError:
+        return False
+
+def shared_libraries(path):
+    """
+    Returns the shared libraries (including the dynamic loader) an ELF file needs, as reported by ldd.
+    """
+    result = subprocess.run(['ldd', path], capture_output=True, text=True, check=False)
+    libraries = []
+    for line in result.stdout.splitlines():
+        match = re.search(r'(?:=>\s*)?(/\S+)\s+\(0x', line)
+        if match and os.path.exists(match.group(1)):
+            libraries.append(match.group(1))
+    return libraries
+
+# Top-level directories that merged-/usr systems replace with symlinks into /usr
+MERGED_USR_DIRECTORIES = ('bin', 'sbin', 'lib', 'lib32', 'lib64', 'libx32')
+
+class RootfsBuilder:
+    def __init__(self, rootfs):
+        self.rootfs = rootfs
+        self.copied = set()
+        self.elf_files = []
+
+        # Mirror the host's /usr merge first, so that e.g. #!/bin/sh and /lib/... library paths resolve
+        for directory in MERGED_USR_DIRECTORIES:
+            host_path = os.path.join('/', directory)
+            if os.path.islink(host_path):
+                link_target = os.readlink(host_path)
+                os.makedirs(os.path.join(rootfs, link_target.lstrip('/')), exist_ok=True)
+                os.symlink(link_target, os.path.join(rootfs, directory))
+
+    def target(self, host_path):
+        return os.path.join(self.rootfs, host_path.lstrip('/'))
+
+    def add(self, host_path, ignore=None):
+        """
+        Copies a file or directory tree to the same path inside the root filesystem.
+        """
+        host_path = os.path.abspath(host_path)
+        if host_path in self.copied:
+            return
+        self.copied.add(host_path)
+        target = self.target(host_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        if os.path.isdir(host_path):
+            shutil.copytree(host_path, target, symlinks=True, ignore=ignore, dirs_exist_ok=True)
+            for directory, _, filenames in os.walk(target):
+                for filename in filenames:
+                    copied_path = os.path.join(directory, filename)
+                    if not os.path.islink(copied_path) and is_elf(copied_path):
+                        self.elf_files.append(os.path.join('/', os.path.relpath(copied_path, self.rootfs)))
+        else:
+            # Files are copied with their symlinks resolved, e.g. /usr/bin/python3 -> python3.11
+            shutil.copy2(host_path, target)
+            if is_elf(host_path):
+                self.elf_files.append(host_path)
+
+    def add_libraries(self):
+        """
+        Copies the shared libraries of every ELF file added so far.
+        """
+        while self.elf_files:
+            elf_file = self.elf_files.pop()
+            source = elf_file if os.path.exists(elf_file) else self.target(elf_file)
+            for library in shared_libraries(source):
+                self.add(library)
+
+    def add_mount_points(self):
+        for mount_point in _ROOTFS_MOUNT_POINTS:
+            os.makedirs(os.path.join(self.rootfs, mount_point), exist_ok=True)
+
+def python_stdlib(runtime_path):
+    result = subprocess.run(
+        [runtime_path, '-c', "import sysconfig; print(sysconfig.get_paths()['stdlib'])"],
+        capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+def build_rootfs(language, output_dir, extra_paths):
+    runtime_host_path, file_extension, execute_cmd_template, language_binds_config = LANGUAGE_CONFIGS[language]
+    if not os.path.exists(runtime_host_path):
+        print(f"Warning: {language} runtime not found at {runtime_host_path}. Skipping.")
+        return None
+
+    rootfs = os.path.join(output_dir, language)
+    if os.path.exists(rootfs):
+        shutil.rmtree(rootfs)
+    os.makedirs(rootfs)
+    builder = RootfsBuilder(rootfs)
+
+    builder.add(runtime_host_path)
+    for host_path, sandbox_path in language_binds_config:
+        if os.path.exists(host_path):
+            builder.add(host_path)
+        else:
+            print(f"Warning: Language bind path does not exist: {host_path}. Skipping for {language}.")
+    if language == 'python3':
+        builder.add(python_stdlib(runtime_host_path), ignore=PYTHON_STDLIB_IGNORE)
+
+    for command in BASE_COMMANDS:
+        command_path = shutil.which(command)
+        if command_path:
+            builder.add(command_path)
+        else:
+            print(f"Warning: {command} not found. Skipping.")
+    for extra_path in extra_paths:
+        builder.add(extra_path)
+
+    builder.add_libraries()
+    builder.add_mount_points()
+    print(f"Built {rootfs} ({len(builder.copied)} paths)")
+    return rootfs
+
+def build_squashfs(rootfs):
+    image_path = f"{rootfs}.squashfs"
+    if os.path.exists(image_path):
+        os.remove(image_path)
+    # Fixed timestamps and ordering make images of identical trees identical
+    subprocess.run(['mksquashfs', rootfs, image_path, '-noappend', '-all-root', '-mkfs-time', '0', '-all-time', '0', '-quiet'], check=True)
+    print(f"Wrote {image_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', required=True, help="Directory to create the root filesystems in (SANDBOX_ROOTFS_DIR)")
+    parser.add_argument('--languages', nargs='+', default=list(LANGUAGE_CONFIGS))
+    parser.add_argument('--include', nargs='*', default=[], help="Additional host files or directories to copy, e.g. tools used by setup scripts")
+    parser.add_argument('--squashfs', action='store_true', help="Also write a squashfs image per language")
+    args = parser.parse_args()
+
+    if args.squashfs and not shutil.which('mksquashfs'):
+        sys.exit("mksquashfs not found. Install squashfs-tools or omit --squashfs.")
+
+    os.makedirs(args.output, exist_ok=True)
+    for language in args.languages:
+        if language not in LANGUAGE_CONFIGS:
+            print(f"Warning: Unknown language {language}. Skipping.")
+            continue
+        rootfs = build_rootfs(language, args.output, args.include)
+        if rootfs and args.squashfs:
+            build_squashfs(rootfs)
+
+if __name__ == '__main__':
+    main()
@@ -5,7 +5,7 @@ It includes routes for managing categories, challenges, users, award categories,
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_required, current_user, logout_user
 from scripts.extensions import db, get_setting
-from scripts.models import Category, Challenge, Submission, User, Setting, ChallengeFlag, FlagSubmission, AwardCategory, Award, FlagAttempt, ChallengeFile
+from scripts.models import Category, Challenge, Submission, User, Setting, ChallengeFlag, FlagSubmission, AwardCategory, Award, FlagAttempt, ChallengeFile, collect_test_case_blobs
 from scripts.forms import CategoryForm, ChallengeForm, AdminSettingsForm, AwardCategoryForm, InlineGiveAwardForm, _get_timezone_choices
 from functools import wraps
 from sqlalchemy import func
@@ -19,6 +19,8 @@ from scripts.theme_utils import scan_themes, get_active_theme, set_active_theme
 import os
 import uuid
 from werkzeug.utils import secure_filename
+from scripts.execution_cache import execution_result_cache
+from scripts.scoreboard_events import scoreboard_events
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -76,6 +78,8 @@ def admin_settings():
         _update_setting('ENABLE_LIVE_SCORE_GRAPH', form.enable_live_score_graph.data) # New: Save live score graph setting
 
         db.session.commit()
+        if not form.enable_live_score_graph.data:
+            scoreboard_events.disconnect_all()
         flash('Settings updated successfully!', 'success')
         return redirect(url_for('admin.admin_settings'))
     elif request.method == 'GET':
@@ -620,6 +624,8 @@ def update_challenge(challenge_id):
             db.session.add(hint)
         
         db.session.commit()
+        # Cached results may have been produced with the old setup code or expected output
+        execution_result_cache.invalidate_challenge(challenge.id)
         flash('Challenge has been updated!', 'success')
         return redirect(url_for('admin.manage_challenges'))
     elif request.method == 'GET':
@@ -703,6 +709,8 @@ def delete_challenge(challenge_id):
     challenge = Challenge.query.get_or_404(challenge_id)
     db.session.delete(challenge)
     db.session.commit()
+    execution_result_cache.invalidate_challenge(challenge_id)
+    collect_test_case_blobs()
     flash('Challenge has been deleted!', 'success')
     return redirect(url_for('admin.manage_challenges'))
 
@@ -1100,7 +1108,7 @@ def analytics():
 
     # Data for Challenge Points Over Time Chart (Cumulative Score)
     from scripts.chart_data_utils import get_global_score_history_data
-    global_chart_data = get_global_score_history_data()
+    global_chart_data = get_global_score_history_data(max_points=current_app.config.get('CHART_POINTS_PER_SERIES', 500))
 
     if global_chart_data:
         global_stats_over_time = global_chart_data.get('global_stats_over_time', [])
@@ -1,13 +1,26 @@
 """
 This module defines the API routes and functions for the WindFlag CTF platform.
 """
-from flask import Blueprint, request, jsonify, g
+import bisect
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
+from flask import Blueprint, Response, request, jsonify, g, current_app
 from flask_login import current_user, login_required
 from scripts.extensions import db
-from scripts.models import Challenge, Category, ChallengeFlag, Submission, User, AwardCategory, Setting, CHALLENGE_TYPES, UserHint, FlagSubmission, TestCase
-from scripts.utils import api_key_required
-from scripts.code_execution import execute_code_in_sandbox, CodeExecutionResult
+from scripts.models import Challenge, Category, ChallengeFlag, Submission, User, AwardCategory, Setting, CHALLENGE_TYPES, UserHint, FlagSubmission, TestCase, CodeExecutionJob, CodeExecutionRecord, collect_test_case_blobs
+from scripts.utils import api_key_required, make_datetime_timezone_aware
+from scripts.code_execution import run_test_cases, preview_test_case_data, CodeExecutionResult
+from scripts.execution_queue import execution_queue, register_job_handler, job_to_dict, SUPERSEDED_JOB_RESULT
+from scripts.execution_scheduler import PRIORITY_LOW, PRIORITY_NORMAL
+from scripts.execution_cache import execution_result_cache
+from scripts.solution_verification import verify_coding_challenges
+from scripts.data_version import data_version, conditional_response
 from functools import wraps
+from sqlalchemy import func, case
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -240,12 +253,33 @@ def create_challenge():
     }), 201
 
 
+# Unlock and expiration times of the categories and challenges, as of a data version
+_schedule_cache = {'version': None, 'instants': []}
+
+def _passed_schedule_instants():
+    """
+    Returns how many unlock and expiration times of categories and challenges have passed. They
+    change the challenge list without any data changing, so they are part of its ETag.
+    """
+    version = data_version.current
+    if _schedule_cache['version'] != version:
+        instants = [instant for (instant,) in db.session.query(Category.unlock_date_time).filter(Category.unlock_date_time.isnot(None))]
+        for unlock_date_time, expiration_date in db.session.query(Challenge.unlock_date_time, Challenge.expiration_date):
+            instants += [instant for instant in (unlock_date_time, expiration_date) if instant is not None]
+        _schedule_cache.update(version=version, instants=sorted(make_datetime_timezone_aware(instant) for instant in instants))
+    return bisect.bisect_right(_schedule_cache['instants'], datetime.now(UTC))
+
 @api_bp.route('/public/challenges', methods=['GET'])
 @login_required
 def get_public_challenges():
     """
     Gets a list of all challenges for the public API.
+    Unchanged lists are answered with 304 Not Modified (see scripts/data_version.py).
     """
+    etag = f"challenges-{data_version.token()}-{current_user.id}-{_passed_schedule_instants()}"
+    return conditional_response(etag, _public_challenges_data)
+
+def _public_challenges_data():
     categories = Category.query.order_by(Category.name).all()
     solved_challenges = {sub.challenge_id for sub in current_user.submissions}
     
@@ -266,8 +300,6 @@ def get_public_challenges():
             if challenge.is_unlocked_for_user(current_user, user_completed_challenges_cache):
                 is_expired = False
                 if challenge.expiration_date:
-                    from datetime import datetime, UTC
-                    from scripts.utils import make_datetime_timezone_aware
                     aware_expiration_date = make_datetime_timezone_aware(challenge.expiration_date)
                     if datetime.now(UTC) > aware_expiration_date:
                         is_expired = True
@@ -407,7 +439,7 @@ def get_challenge(challenge_id):
         'language': challenge.language,
         'starter_code': challenge.starter_code,
         'flags': [{'id': f.id, 'content': f.flag_content} for f in challenge.flags],
-        'test_cases': [{'id': tc.id, 'input_data': tc.input_data, 'expected_output': tc.expected_output, 'order': tc.order} for tc in sorted(challenge.test_cases, key=lambda tc: tc.order)]
+        'test_cases': [{'id': tc.id, 'input_data': tc.read_input_data(), 'expected_output': tc.read_expected_output(), 'order': tc.order} for tc in sorted(challenge.test_cases, key=lambda tc: tc.order)]
     })
 
 
@@ -448,8 +480,95 @@ def update_challenge_api(challenge_id):
             db.session.add(test_case)
 
     db.session.commit()
+    # Cached results may have been produced with the old test cases or setup code
+    execution_result_cache.invalidate_challenge(challenge.id)
+    if 'test_cases' in data and isinstance(data['test_cases'], list):
+        collect_test_case_blobs()
     return jsonify({'message': 'Challenge updated successfully'})
 
+# Seconds the per-test-case failure rates of a challenge are reused before being recomputed
+_FAILURE_RATE_TTL_SECONDS = 60
+_failure_rate_cache = {} # challenge_id -> (expiry time, {test_case_id: failure rate})
+
+def _order_by_failure_rate(challenge, sorted_test_cases):
+    """
+    Returns the test cases with the most frequently failed ones first, based on the recorded
+    runs of earlier submissions, so that fail-fast runs reject wrong code as early as possible.
+    Test cases with the same failure rate keep their order.
+    """
+    now = time.monotonic()
+    cached = _failure_rate_cache.get(challenge.id)
+    if cached and cached[0] > now:
+        failure_rates = cached[1]
+    else:
+        failure_rates = CodeExecutionRecord.failure_rates(challenge.id)
+        _failure_rate_cache[challenge.id] = (now + _FAILURE_RATE_TTL_SECONDS, failure_rates)
+    return sorted(sorted_test_cases, key=lambda test_case: -failure_rates.get(test_case.id, 0.0))
+
+def _test_case_result_dict(test_case_fields, execution_result):
+    """
+    Serialises the result of one test case run, given the test case's (id, input_data, expected_output).
+    Test case data kept in the blob store is truncated like program output.
+    """
+    test_case_id, input_data, expected_output = test_case_fields
+    return {
+        'test_case_id': test_case_id,
+        'input_data': preview_test_case_data(input_data),
+        'expected_output': preview_test_case_data(expected_output),
+        'actual_output': execution_result.stdout,
+        'passed': execution_result.success,
+        'error_message': execution_result.error_message,
+        'is_timeout': execution_result.is_timeout,
+        'stderr': execution_result.stderr,
+        'cpu_time_seconds': execution_result.cpu_time_seconds,
+        'peak_memory_kb': execution_result.peak_memory_kb,
+        'wall_time_seconds': execution_result.wall_time_seconds,
+        'superseded': execution_result.superseded,
+        'skipped': execution_result.skipped,
+    }
+
+def _run_challenge_test_cases(challenge, code, sorted_test_cases, user=None, priority=PRIORITY_NORMAL, fail_fast=False, on_test_case_result=None):
+    """
+    Runs code against the given test cases of a coding challenge.
+
+    If a user is given, the runs are scheduled fairly against other users' submissions and the
+    resources used by each run are recorded as CodeExecutionRecords (added to the session,
+    committed by the caller). With fail_fast, the test cases after the first failed one are
+    not run and reported as skipped. on_test_case_result, if given, receives each result dict
+    as soon as the test case finishes, possibly from another thread.
+
+    Returns:
+        list: One result dict per test case, in the order of sorted_test_cases.
+    """
+    # Plain values, as results may be reported from sandbox pool threads
+    test_case_fields = [(test_case.id, test_case.input_source(), test_case.expected_output_source()) for test_case in sorted_test_cases]
+    on_result = None
+    if on_test_case_result:
+        on_result = lambda index, execution_result: on_test_case_result(_test_case_result_dict(test_case_fields[index], execution_result))
+
+    execution_results = run_test_cases(
+        challenge.language,
+        code,
+        [(input_data, expected_output) for _, input_data, expected_output in test_case_fields],
+        setup_code=challenge.setup_code,
+        challenge_id=challenge.id,
+        user_id=user.id if user is not None else None,
+        priority=priority,
+        fail_fast=fail_fast,
+        on_result=on_result
+    )
+
+    if user is not None:
+        for test_case, execution_result in zip(sorted_test_cases, execution_results):
+            execution_record = CodeExecutionRecord.from_result(execution_result, user.id, challenge, test_case_id=test_case.id)
+            if execution_record:
+                db.session.add(execution_record)
+
+    return [
+        _test_case_result_dict(fields, execution_result)
+        for fields, execution_result in zip(test_case_fields, execution_results)
+    ]
+
 @api_bp.route('/admin/verify_coding_challenge', methods=['POST'])
 @login_required
 def verify_coding_challenge():
@@ -476,35 +595,11 @@ def verify_coding_challenge():
     if not test_cases:
         return jsonify({'message': 'No test cases defined for this coding challenge.'}), 400
 
-    all_test_cases_passed = True
-    test_case_results = []
-
     sorted_test_cases = sorted(test_cases, key=lambda tc: tc.order)
+    # Verification yields to player submissions under load
+    test_case_results = _run_challenge_test_cases(challenge, challenge.reference_solution, sorted_test_cases, priority=PRIORITY_LOW)
+    all_test_cases_passed = all(result['passed'] for result in test_case_results)
 
-    for test_case in sorted_test_cases:
-        execution_result = execute_code_in_sandbox(
-            language=challenge.language,
-            code=challenge.reference_solution,
-            expected_output=test_case.expected_output,
-            setup_code=challenge.setup_code,
-            test_case_input=test_case.input_data,
-        )
-
-        test_case_passed = execution_result.success
-        if not test_case_passed:
-            all_test_cases_passed = False
-
-        test_case_results.append({
-            'test_case_id': test_case.id,
-            'input_data': test_case.input_data,
-            'expected_output': test_case.expected_output,
-            'actual_output': execution_result.stdout,
-            'passed': test_case_passed,
-            'error_message': execution_result.error_message,
-            'is_timeout': execution_result.is_timeout,
-            'stderr': execution_result.stderr
-        })
-    
     # Update solution_verified status of the challenge
     challenge.solution_verified = all_test_cases_passed
     db.session.commit()
@@ -525,94 +620,309 @@ def verify_coding_challenge():
         }), 200
 
 
-@api_bp.route('/challenges/<int:challenge_id>/submit_code', methods=['POST'])
-@login_required # User must be logged in
-def submit_code_challenge(challenge_id):
+def _grade_code_submission(challenge, user, user_code, on_test_case_result=None):
     """
-    Submits code for a coding challenge and runs it against multiple test cases.
-    """
-    challenge = Challenge.query.get_or_404(challenge_id)
-    if challenge.challenge_type != 'CODING':
-        return jsonify({'message': 'This is not a coding challenge.'}), 400
-
-    data = request.get_json()
-    if not data or 'code' not in data:
-        return jsonify({'message': 'Request body must be JSON and include "code"'}), 400
-
-    user_code = data['code']
+    Runs submitted code against every test case of a coding challenge and records a solve if all pass.
+    on_test_case_result, if given, is called as on_test_case_result(index, result_dict) as soon as
+    each test case finishes, where index is the test case's position in the response.
 
+    Returns:
+        tuple: (response_data, status_code) as returned by the submit_code endpoint.
+    """
     test_cases = challenge.test_cases # Access the relationship
     if not test_cases:
-        return jsonify({'message': 'No test cases defined for this coding challenge.'}), 400
-
-    all_test_cases_passed = True
-    test_case_results = []
+        return {'message': 'No test cases defined for this coding challenge.'}, 400
 
     # Sort test cases by their 'order' field
     sorted_test_cases = sorted(test_cases, key=lambda tc: tc.order)
-
-    for test_case in sorted_test_cases:
-        execution_result = execute_code_in_sandbox(
-            language=challenge.language,
-            code=user_code,
-            expected_output=test_case.expected_output,
-            setup_code=challenge.setup_code,
-            test_case_input=test_case.input_data,
+    execution_order = sorted_test_cases
+    fail_fast = current_app.config.get('CODE_EXECUTION_FAIL_FAST', False)
+    if fail_fast and current_app.config.get('CODE_EXECUTION_ORDER_BY_FAILURE_RATE', False):
+        execution_order = _order_by_failure_rate(challenge, sorted_test_cases)
+    report_result = None
+    if on_test_case_result:
+        response_index = {test_case.id: i for i, test_case in enumerate(sorted_test_cases)}
+        report_result = lambda result: on_test_case_result(response_index[result['test_case_id']], result)
+    results_by_test_case = {
+        result['test_case_id']: result
+        for result in _run_challenge_test_cases(
+            challenge, user_code, execution_order, user=user, fail_fast=fail_fast, on_test_case_result=report_result
         )
-
-        test_case_passed = execution_result.success
-        if not test_case_passed:
-            all_test_cases_passed = False
-
-        test_case_results.append({
-            'test_case_id': test_case.id,
-            'input_data': test_case.input_data,
-            'expected_output': test_case.expected_output,
-            'actual_output': execution_result.stdout,
-            'passed': test_case_passed,
-            'error_message': execution_result.error_message,
-            'is_timeout': execution_result.is_timeout,
-            'stderr': execution_result.stderr
-        })
+    }
+    # Results are always reported in the challenge's test case order
+    test_case_results = [results_by_test_case[test_case.id] for test_case in sorted_test_cases]
+    if any(result['superseded'] for result in test_case_results):
+        # A newer submission of the user replaced this one while it was waiting for a sandbox
+        return dict(SUPERSEDED_JOB_RESULT, is_correct=False), 409
+    db.session.commit() # Stores the usage records of the runs
+    all_test_cases_passed = all(result['passed'] for result in test_case_results)
 
     if all_test_cases_passed:
         # Check if the user has already solved this challenge
         existing_submission = Submission.query.filter_by(
-            user_id=current_user.id,
+            user_id=user.id,
             challenge_id=challenge.id
         ).first()
 
         if not existing_submission:
             # Mark challenge as solved for the user
             new_submission = Submission(
-                user_id=current_user.id,
+                user_id=user.id,
                 challenge_id=challenge.id,
                 score_at_submission=challenge.points # Store current points
             )
             db.session.add(new_submission)
-            current_user.score += challenge.points
+            user.score += challenge.points
             db.session.commit()
-            return jsonify({
+            return {
                 'message': 'Challenge solved! All test cases passed.',
                 'is_correct': True,
                 'success': True,
                 'test_case_results': test_case_results
-            }), 200
+            }, 200
         else:
-            return jsonify({
+            return {
                 'message': 'Challenge already solved! All test cases passed.',
                 'is_correct': True,
                 'success': True,
                 'test_case_results': test_case_results
-            }), 200
+            }, 200
     else:
         # Provide feedback on why it failed
-        return jsonify({
+        return {
             'message': 'Some test cases failed.',
             'is_correct': False,
             'success': False,
             'test_case_results': test_case_results
-        }), 200
+        }, 200
+
+@register_job_handler('SUBMIT_CODE')
+def _process_submit_code_job(job):
+    """
+    Execution queue handler for code submitted through the submit_code endpoint.
+    """
+    response_data, _ = _grade_code_submission(job.challenge, job.user, job.code)
+    return response_data
+
+@api_bp.route('/challenges/<int:challenge_id>/submit_code', methods=['POST'])
+@login_required # User must be logged in
+def submit_code_challenge(challenge_id):
+    """
+    Submits code for a coding challenge and runs it against multiple test cases.
+    When the execution queue is enabled, the submission is queued and a job ID is returned instead.
+    """
+    challenge = Challenge.query.get_or_404(challenge_id)
+    if challenge.challenge_type != 'CODING':
+        return jsonify({'message': 'This is not a coding challenge.'}), 400
+
+    data = request.get_json()
+    if not data or 'code' not in data:
+        return jsonify({'message': 'Request body must be JSON and include "code"'}), 400
+
+    user_code = data['code']
+
+    if not challenge.test_cases:
+        return jsonify({'message': 'No test cases defined for this coding challenge.'}), 400
+
+    if execution_queue.enabled:
+        job = execution_queue.submit('SUBMIT_CODE', current_user.id, challenge.id, user_code)
+        return jsonify(job_to_dict(job)), 202
+
+    response_data, status_code = _grade_code_submission(challenge, current_user, user_code)
+    return jsonify(response_data), status_code
+
+@api_bp.route('/challenges/<int:challenge_id>/submit_code/stream', methods=['POST'])
+@login_required
+def submit_code_challenge_stream(challenge_id):
+    """
+    Streaming variant of submit_code: responds with newline-delimited JSON events, so every test
+    case result reaches the browser as soon as it finishes:
+
+        {"event": "start", "test_case_count": n}
+        {"event": "test_case", "index": i, "result": {...}}   (once per test case, in completion order)
+        {"event": "done", "status": 200, "result": {...}}     (the submit_code response)
+        {"event": "error", "message": "..."}                  (instead of "done" if grading failed)
+
+    When the execution queue is enabled, the submission is queued and a job is returned as by submit_code.
+    """
+    challenge = Challenge.query.get_or_404(challenge_id)
+    if challenge.challenge_type != 'CODING':
+        return jsonify({'message': 'This is not a coding challenge.'}), 400
+
+    data = request.get_json()
+    if not data or 'code' not in data:
+        return jsonify({'message': 'Request body must be JSON and include "code"'}), 400
+
+    user_code = data['code']
+    test_case_count = len(challenge.test_cases)
+    if not test_case_count:
+        return jsonify({'message': 'No test cases defined for this coding challenge.'}), 400
+
+    if execution_queue.enabled:
+        job = execution_queue.submit('SUBMIT_CODE', current_user.id, challenge.id, user_code)
+        return jsonify(job_to_dict(job)), 202
+
+    app = current_app._get_current_object()
+    user_id = current_user.id
+    # Holds every event of the submission, so grading never blocks on a slow reader
+    events = queue.Queue(maxsize=test_case_count + 3)
+    cancelled = threading.Event()
+
+    def report(event):
+        if not cancelled.is_set():
+            events.put(event)
+
+    def grade():
+        try:
+            if cancelled.is_set():
+                return # The client left while the submission was waiting for a grading thread
+            with app.app_context():
+                try:
+                    response_data, status_code = _grade_code_submission(
+                        db.session.get(Challenge, challenge_id), db.session.get(User, user_id), user_code,
+                        on_test_case_result=lambda index, result: report({'event': 'test_case', 'index': index, 'result': result})
+                    )
+                    report({'event': 'done', 'status': status_code, 'result': response_data})
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.exception(f"Streamed grading of challenge {challenge_id} failed: {e}")
+                    report({'event': 'error', 'message': f'An unexpected error occurred while processing your submission: {e}'})
+        finally:
+            events.put(None)
+
+    # Grading runs on a shared, bounded pool of threads, so the response can be streamed while the
+    # test cases run; when all of them are busy it runs in the request itself and the results arrive together
+    in_background = _stream_grading_pool.submit(app, grade)
+
+    def generate():
+        try:
+            yield json.dumps({'event': 'start', 'test_case_count': test_case_count}) + '\n'
+            if not in_background:
+                grade()
+            while (event := events.get()) is not None:
+                yield json.dumps(event) + '\n'
+        finally:
+            # Also reached when the client disconnects: results of a running grading are dropped
+            cancelled.set()
+
+    # Proxies must not buffer the stream, or the results would again arrive all at once
+    return Response(generate(), mimetype='application/x-ndjson', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+class _StreamGradingPool:
+    """
+    The threads grading streamed submissions. There are as many as submissions may run at once
+    (EXECUTION_MAX_CONCURRENT_SUBMISSIONS, or CODE_EXECUTION_MAX_SANDBOXES), since further ones
+    would only wait for the scheduler.
+    """
+    def __init__(self):
+        self._executor = None
+        self._free = None
+        self._lock = threading.Lock()
+
+    def submit(self, app, fn):
+        """
+        Runs fn on a free grading thread and returns True, or returns False if all are busy.
+        """
+        with self._lock:
+            if self._executor is None:
+                size = max(1, int(app.config.get('EXECUTION_MAX_CONCURRENT_SUBMISSIONS') or app.config.get('CODE_EXECUTION_MAX_SANDBOXES') or 1))
+                self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='submit-code-stream')
+                self._free = threading.BoundedSemaphore(size)
+        if not self._free.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                fn()
+            finally:
+                self._free.release()
+        self._executor.submit(run)
+        return True
+
+_stream_grading_pool = _StreamGradingPool()
+
+@api_bp.route('/code_jobs/<job_id>', methods=['GET'])
+@login_required
+def get_code_job(job_id):
+    """
+    Returns the status of a queued code execution job, including its verdict once finished.
+    """
+    job = db.session.get(CodeExecutionJob, job_id)
+    if not job or (job.user_id != current_user.id and not current_user.is_admin):
+        return jsonify({'message': 'Job not found'}), 404
+    return jsonify(job_to_dict(job))
+
+@api_bp.route('/admin/verify_coding_challenges', methods=['POST'])
+@admin_api_required
+def verify_coding_challenges_api():
+    """
+    Verifies the reference solutions of all coding challenges, or of those selected by
+    challenge_ids, category_id and unverified_only, in parallel and returns the report.
+    """
+    data = request.get_json(silent=True) or {}
+    challenge_ids = data.get('challenge_ids')
+    if challenge_ids is not None and (not isinstance(challenge_ids, list) or not all(isinstance(i, int) for i in challenge_ids)):
+        return jsonify({'message': '"challenge_ids" must be a list of challenge IDs'}), 400
+    category_id = data.get('category_id')
+    if category_id is not None and not isinstance(category_id, int):
+        return jsonify({'message': '"category_id" must be an integer'}), 400
+    max_parallel = data.get('max_parallel')
+    if max_parallel is not None and (not isinstance(max_parallel, int) or max_parallel < 1):
+        return jsonify({'message': '"max_parallel" must be a positive integer'}), 400
+
+    report = verify_coding_challenges(
+        challenge_ids=challenge_ids,
+        category_id=category_id,
+        unverified_only=bool(data.get('unverified_only', False)),
+        max_parallel=max_parallel
+    )
+    return jsonify(report)
+
+@api_bp.route('/admin/execution_queue', methods=['GET'])
+@admin_api_required
+def get_execution_queue_stats():
+    """
+    Returns execution queue depth, wait times and worker utilisation.
+    """
+    return jsonify(execution_queue.get_stats())
+
+@api_bp.route('/admin/execution_usage', methods=['GET'])
+@admin_api_required
+def get_execution_usage():
+    """
+    Returns the sandbox resources used by coding submissions, aggregated per challenge or per user
+    (?group_by=challenge|user), most expensive first.
+    """
+    group_by = request.args.get('group_by', 'challenge')
+    if group_by == 'challenge':
+        group_column, name_column = CodeExecutionRecord.challenge_id, Challenge.name
+        query = db.session.query(group_column, name_column).join(Challenge, Challenge.id == CodeExecutionRecord.challenge_id)
+    elif group_by == 'user':
+        group_column, name_column = CodeExecutionRecord.user_id, User.username
+        query = db.session.query(group_column, name_column).join(User, User.id == CodeExecutionRecord.user_id)
+    else:
+        return jsonify({'message': 'group_by must be "challenge" or "user"'}), 400
+
+    total_cpu_time = func.coalesce(func.sum(CodeExecutionRecord.cpu_time_seconds), 0)
+    rows = query.add_columns(
+        func.count(CodeExecutionRecord.id),
+        total_cpu_time,
+        func.avg(CodeExecutionRecord.cpu_time_seconds),
+        func.max(CodeExecutionRecord.peak_memory_kb),
+        func.avg(CodeExecutionRecord.wall_time_seconds),
+        func.sum(case((CodeExecutionRecord.is_timeout, 1), else_=0))
+    ).group_by(group_column, name_column).order_by(total_cpu_time.desc()).all()
+
+    return jsonify([{
+        'id': group_id,
+        'name': name,
+        'runs': runs,
+        'total_cpu_time_seconds': round(total_cpu, 4),
+        'avg_cpu_time_seconds': round(avg_cpu, 4) if avg_cpu is not None else None,
+        'max_peak_memory_kb': max_memory,
+        'avg_wall_time_seconds': round(avg_wall, 4) if avg_wall is not None else None,
+        'timeouts': timeouts or 0
+    } for group_id, name, runs, total_cpu, avg_cpu, max_memory, avg_wall, timeouts in rows])
 
 
 @api_bp.route('/challenges/<int:challenge_id>', methods=['DELETE'])
@@ -624,6 +934,8 @@ def delete_challenge_api(challenge_id):
     challenge = Challenge.query.get_or_404(challenge_id)
     db.session.delete(challenge)
     db.session.commit()
+    execution_result_cache.invalidate_challenge(challenge_id)
+    collect_test_case_blobs()
     return jsonify({'message': 'Challenge deleted successfully'})
 
 # Category Endpoints
@@ -880,7 +1192,12 @@ def get_analytics():
     """
     # Import necessary functions from admin_routes to reuse logic
     from scripts.admin_routes import _get_challenge_points_by_category, _get_award_points_by_category, _get_challenge_points_by_user, _get_award_points_by_user, _get_challenges_solved_over_time, _get_fails_vs_succeeds_data, _get_challenge_solve_counts, _get_user_challenge_matrix_data
-    from scripts.chart_data_utils import get_global_score_history_data
+    from scripts.chart_data_utils import get_global_score_history_data, requested_chart_points, requested_compact_encoding, epoch_ms
+
+    try:
+        max_points = requested_chart_points()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
     # Data for Points by Category
     challenge_points_by_category = _get_challenge_points_by_category()
@@ -909,8 +1226,8 @@ def get_analytics():
     solved_dates = [str(date) for date, _ in challenges_solved_over_time]
     solved_counts = [count for _, count in challenges_solved_over_time]
 
-    # Data for Challenge Points Over Time Chart (Cumulative Score)
-    global_chart_data = get_global_score_history_data()
+    # Data for Challenge Points Over Time Chart (Cumulative Score), down-sampled to ?points=N per series
+    global_chart_data = get_global_score_history_data(max_points=max_points)
 
     if global_chart_data:
         global_stats_over_time = global_chart_data.get('global_stats_over_time', [])
@@ -935,16 +1252,25 @@ def get_analytics():
     # Data for User-Challenge Matrix Table
     all_users, all_challenges, user_challenge_status = _get_user_challenge_matrix_data()
 
+    if requested_compact_encoding():
+        # Epoch milliseconds instead of ISO strings, see chart_data_utils.compact_series
+        challenges_solved_over_time = {'t': [epoch_ms(date) for date in solved_dates], 'counts': solved_counts}
+        cumulative_points_over_time = {'t': [epoch_ms(date) for date in cumulative_points_dates], 'values': cumulative_points_values}
+    else:
+        challenges_solved_over_time = {'dates': solved_dates, 'counts': solved_counts}
+        cumulative_points_over_time = {'dates': cumulative_points_dates, 'values': cumulative_points_values}
+
     return jsonify({
         'category_data': {'labels': category_labels, 'values': category_values},
         'user_data': {'labels': user_labels, 'values': user_values},
-        'challenges_solved_over_time': {'dates': solved_dates, 'counts': solved_counts},
-        'cumulative_points_over_time': {'dates': cumulative_points_dates, 'values': cumulative_points_values},
+        'challenges_solved_over_time': challenges_solved_over_time,
+        'cumulative_points_over_time': cumulative_points_over_time,
         'fails_vs_succeeds': {'labels': fails_succeeds_labels, 'values': fails_succeeds_values},
         'challenge_solve_counts': {'labels': challenge_solve_labels, 'values': challenge_solve_values},
         'user_challenge_matrix': {
             'users': [{'id': u.id, 'username': u.username} for u in all_users],
             'challenges': [{'id': c.id, 'name': c.name} for c in all_challenges],
             'status': user_challenge_status
-        }
+        },
+        'encoding': 'compact' if requested_compact_encoding() else 'json'
     })
\ No newline at end of file
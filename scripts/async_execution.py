@@ -0,0 +1,216 @@
+"""
+This module provides asyncio-native counterparts of the sandbox execution functions.
+
+Sandbox processes are started with asyncio.create_subprocess_exec and supervised by the event
+loop: stdin, stdout and stderr are pumped without blocking, and time limits are enforced with
+asyncio timeouts, so one loop can supervise hundreds of concurrent runs without a thread per run.
+Runs use the same checks, sandbox backend, resource limits and global sandbox cap
+(CODE_EXECUTION_MAX_SANDBOXES) as `execute_code_in_sandbox`, and return the same results.
+
+A Flask application context must be active in the task calling these functions; tasks created
+from it inherit the context. Compilation for languages with a build step still runs in a worker
+thread, and the warm interpreter pool is not used. As asyncio reaps the sandbox process itself,
+CPU time and peak memory are only recorded when runs get a cgroup (SANDBOX_CGROUP_ROOT).
+"""
+import asyncio
+import os
+import shutil
+import subprocess
+
+from flask import current_app
+
+from scripts.code_execution import (
+    EXECUTION_TIMEOUT_SECONDS, LANGUAGE_BUILD_CONFIGS, LANGUAGE_CONFIGS, MAX_OUTPUT_SIZE_BYTES, BWRAP_PATH,
+    CodeExecutionResult, _READ_CHUNK_BYTES, _STOPPED_TIMEOUT, _StdoutMonitor, _build_bwrap_args,
+    _build_run_command, _check_submission, _create_code_memfd, _create_sandbox_dir, _get_sandbox_backend,
+    _get_sandbox_limits, _get_sandbox_slots, _open_test_case_input, _prepare_build, _streamed_result, _supports_data_binds,
+)
+
+# Time allowed for a killed sandbox to close its pipes
+_KILL_GRACE_SECONDS = 5
+
+async def _acquire_sandbox_slot():
+    """
+    Takes one of the global sandbox slots shared with the synchronous code paths, polling instead
+    of blocking the event loop while all of them are in use.
+
+    Returns:
+        threading.BoundedSemaphore: The semaphore to release once the sandbox has exited.
+    """
+    slots = _get_sandbox_slots()
+    delay = 0.001
+    while not slots.acquire(blocking=False):
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.05)
+    return slots
+
+async def _feed_stdin(process, input_bytes):
+    if process.stdin is None:
+        return # The process reads its input from a file
+    try:
+        if input_bytes:
+            process.stdin.write(input_bytes)
+            await process.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass # The program stopped reading its input
+    finally:
+        process.stdin.close()
+
+async def _read_stdout(process, stdout_monitor):
+    """
+    Reads stdout until it is closed or the run can be stopped early. Returns the stop reason or None.
+    """
+    while True:
+        data = await process.stdout.read(_READ_CHUNK_BYTES)
+        if not data:
+            return None
+        stop_reason = stdout_monitor.feed(data)
+        if stop_reason:
+            return stop_reason
+
+async def _read_stderr(process, stderr_bytes):
+    # Stderr beyond MAX_OUTPUT_SIZE_BYTES is read but discarded
+    while True:
+        data = await process.stderr.read(_READ_CHUNK_BYTES)
+        if not data:
+            return
+        stderr_bytes += data[:max(0, MAX_OUTPUT_SIZE_BYTES - len(stderr_bytes))]
+
+async def _discard_output(stream):
+    while await stream.read(_READ_CHUNK_BYTES):
+        pass
+
+async def _stream_process_async(process, input_bytes, stdout_monitor, timeout, sandbox):
+    """
+    Asynchronous version of _stream_process for a process started by asyncio, collecting stdout
+    with the given _StdoutMonitor.
+
+    Returns:
+        tuple: (returncode, stdout, stderr, stop_reason) where stop_reason is None if the program exited by itself.
+    """
+    stderr_bytes = bytearray()
+    stdin_task = asyncio.ensure_future(_feed_stdin(process, input_bytes))
+    stderr_task = asyncio.ensure_future(_read_stderr(process, stderr_bytes))
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    try:
+        stop_reason = await asyncio.wait_for(_read_stdout(process, stdout_monitor), timeout)
+        if not stop_reason:
+            # Stdout is closed, but the program may still be running
+            await asyncio.wait_for(asyncio.gather(stderr_task, process.wait()), max(0, deadline - loop.time()))
+    except asyncio.TimeoutError:
+        stop_reason = _STOPPED_TIMEOUT
+
+    if stop_reason:
+        stderr_task.cancel()
+        await asyncio.gather(stderr_task, return_exceptions=True)
+        sandbox.kill(process)
+        try:
+            # asyncio only reports the exit once every pipe is closed, so discard the remaining output
+            await asyncio.wait_for(
+                asyncio.gather(_discard_output(process.stdout), _discard_output(process.stderr), process.wait()),
+                _KILL_GRACE_SECONDS
+            )
+        except asyncio.TimeoutError:
+            pass
+    stdin_task.cancel()
+    await asyncio.gather(stdin_task, return_exceptions=True)
+
+    return process.returncode, stdout_monitor.stdout(), stderr_bytes.decode('utf-8', errors='replace'), stop_reason
+
+async def execute_code_in_sandbox_async(language, code, expected_output, setup_code=None, test_case_input=None):
+    """
+    Executes user-provided code in a sandbox and compares its output, without blocking the event loop.
+
+    Takes the same arguments and returns the same CodeExecutionResult as execute_code_in_sandbox.
+    """
+    rejection = _check_submission(language, code)
+    if rejection:
+        return rejection
+
+    runtime_host_path, file_extension, execute_cmd_template, language_binds_config = LANGUAGE_CONFIGS[language]
+
+    temp_host_dir = None
+    code_fd = None
+    if not setup_code and language not in LANGUAGE_BUILD_CONFIGS and _supports_data_binds():
+        code_fd = _create_code_memfd(code)
+        code_bind_args = ['--ro-bind-data', str(code_fd), f'/sandbox/user_code{file_extension}']
+    else:
+        temp_host_dir, code_bind_args = _create_sandbox_dir(code, file_extension, setup_code)
+
+    try:
+        if language in LANGUAGE_BUILD_CONFIGS:
+            # Compiling (or waiting for the same code to be compiled) blocks, so it runs in a worker thread
+            build_bind_args, build_cmd_template, build_failure = await asyncio.to_thread(_prepare_build, language, code, temp_host_dir)
+            if build_failure:
+                return build_failure
+            code_bind_args += build_bind_args
+            execute_cmd_template = build_cmd_template
+
+        bwrap_cmd = _build_bwrap_args(language) + code_bind_args + [
+            '--', 'bash', '-c', _build_run_command(execute_cmd_template, setup_code)
+        ]
+
+        process = None
+        stdin, input_bytes = _open_test_case_input(test_case_input)
+        stdout_monitor = _StdoutMonitor(expected_output)
+        sandbox_run = _get_sandbox_limits().start_run(language)
+        sandbox = _get_sandbox_backend().prepare(language, bwrap_cmd)
+        slots = await _acquire_sandbox_slot()
+        try:
+            sandbox_run.mark_started()
+            process = await asyncio.create_subprocess_exec(
+                *sandbox_run.wrap_command(sandbox.argv), stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                pass_fds=() if code_fd is None else (code_fd,),
+                **sandbox.popen_kwargs()
+            )
+            returncode, _, stderr, stop_reason = await _stream_process_async(
+                process, input_bytes, stdout_monitor,
+                timeout=EXECUTION_TIMEOUT_SECONDS + 2, # Give bwrap itself a bit more time to clean up
+                sandbox=sandbox
+            )
+            sandbox_run.record_exit()
+            return _streamed_result(returncode, stdout_monitor, stderr, stop_reason, expected_output, sandbox_run)
+        except FileNotFoundError:
+            return CodeExecutionResult(False, "", "", f"bwrap or runtime not found. Check paths: {BWRAP_PATH}, {runtime_host_path}")
+        except asyncio.CancelledError:
+            if process is not None and process.returncode is None:
+                sandbox.kill(process)
+            raise
+        except Exception as e:
+            if process is not None and process.returncode is None:
+                sandbox.kill(process)
+            return CodeExecutionResult(False, "", "", f"An unexpected error occurred during execution: {e}")
+        finally:
+            slots.release()
+            if stdin is not subprocess.PIPE:
+                stdin.close()
+            stdout_monitor.close()
+            sandbox_run.close()
+            sandbox.cleanup(process)
+
+    finally:
+        if code_fd is not None:
+            os.close(code_fd)
+        if temp_host_dir and os.path.exists(temp_host_dir):
+            shutil.rmtree(temp_host_dir)
+
+async def execute_test_cases_async(language, code, test_cases, setup_code=None):
+    """
+    Runs code against a list of test cases concurrently, one sandbox per test case, with up to
+    CODE_EXECUTION_MAX_PARALLEL of them running at once (and within the global sandbox cap).
+
+    Returns:
+        list: One CodeExecutionResult per test case, in the same order as test_cases.
+    """
+    if not test_cases:
+        return []
+    max_parallel = current_app.config.get('CODE_EXECUTION_MAX_PARALLEL') or os.cpu_count() or 1
+    parallel_runs = asyncio.Semaphore(max(1, int(max_parallel)))
+
+    async def run_case(input_data, expected_output):
+        async with parallel_runs:
+            return await execute_code_in_sandbox_async(language, code, expected_output, setup_code=setup_code, test_case_input=input_data)
+
+    return list(await asyncio.gather(*(run_case(input_data, expected_output) for input_data, expected_output in test_cases)))
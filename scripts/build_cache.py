@@ -0,0 +1,158 @@
+"""
+This module provides a content-addressed cache for compiled submission artifacts.
+
+Languages with a build step (see LANGUAGE_BUILD_CONFIGS in scripts/code_execution.py) compile
+a submission once and run the artifact for every test case. Artifacts are stored under a hash
+of the language, runtime version, build command and code, so identical code - resubmissions
+and reference solutions re-verified by administrators - is compiled only once. Runs receive a
+hard link to the cached file, so evicting an artifact never affects a sandbox that uses it.
+Compilation errors are cached as well, so a broken submission is not recompiled per test case.
+"""
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from scripts.execution_cache import _runtime_version, is_cacheable
+
+def make_build_key(language, runtime_path, build_command, code):
+    """
+    Returns the SHA-256 key identifying the artifact built from the given code.
+    """
+    payload = json.dumps([language, _runtime_version(runtime_path), build_command, code], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _link_or_copy(source_path, destination_path):
+    try:
+        os.link(source_path, destination_path)
+    except OSError:
+        # Hard links do not work across file systems
+        shutil.copyfile(source_path, destination_path)
+
+def _remove_artifact(entry):
+    if isinstance(entry, str):
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
+
+class BuildArtifactCache:
+    """
+    A bounded, thread-safe LRU cache of build artifacts stored in a private directory.
+    """
+    def __init__(self, max_entries=256):
+        self._max_entries = max_entries
+        self._directory = None
+        self._entries = OrderedDict() # key -> artifact path inside the cache directory, or the failed build's result
+        self._builds_in_progress = {} # key -> lock held while the artifact is being built
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        atexit.register(self._remove_directory)
+
+    def init_app(self, app):
+        """
+        Sizes the cache from BUILD_CACHE_SIZE (0 disables caching) and creates its directory
+        inside BUILD_CACHE_DIR (defaults to the system temporary directory).
+        """
+        app.extensions['build_artifact_cache'] = self
+        with self._lock:
+            self._max_entries = max(0, int(app.config.get('BUILD_CACHE_SIZE', 256)))
+            self._remove_directory()
+            if self._max_entries:
+                # One directory per process, so workers never evict each other's artifacts
+                self._directory = tempfile.mkdtemp(prefix='windflag_build_cache_', dir=app.config.get('BUILD_CACHE_DIR') or None)
+
+    @property
+    def enabled(self):
+        return self._max_entries > 0 and self._directory is not None
+
+    @contextmanager
+    def building(self, key):
+        """
+        Serialises builds of the same key, so concurrent runs of one submission (e.g. in 'parallel'
+        mode) compile it once and the others pick up the cached artifact.
+        """
+        with self._lock:
+            build_lock = self._builds_in_progress.setdefault(key, threading.Lock())
+        with build_lock:
+            try:
+                yield
+            finally:
+                # Threads still waiting on this lock find the artifact in the cache once they get it
+                with self._lock:
+                    if self._builds_in_progress.get(key) is build_lock:
+                        del self._builds_in_progress[key]
+
+    def fetch(self, key, destination_path):
+        """
+        Places the cached artifact at destination_path.
+
+        Returns:
+            tuple: (hit, failure) where hit is False if nothing is cached for the key, and failure is
+                the CodeExecutionResult of a cached failed build (no artifact is placed then).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if not isinstance(entry, str):
+                return True, entry
+            _link_or_copy(entry, destination_path)
+            return True, None
+
+    def put(self, key, artifact_path):
+        """
+        Stores a copy of a freshly built artifact.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if not isinstance(self._entries.get(key), str):
+                cached_path = os.path.join(self._directory, key)
+                _link_or_copy(artifact_path, cached_path)
+                self._entries[key] = cached_path
+            self._store(key, self._entries[key])
+
+    def put_failure(self, key, result):
+        """
+        Stores the result of a build that failed because of the code itself.
+        """
+        if not self.enabled or not is_cacheable(result):
+            return
+        with self._lock:
+            self._store(key, result)
+
+    def clear(self):
+        with self._lock:
+            for entry in self._entries.values():
+                _remove_artifact(entry)
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            _, evicted_entry = self._entries.popitem(last=False)
+            _remove_artifact(evicted_entry)
+
+    def _remove_directory(self):
+        if self._directory:
+            shutil.rmtree(self._directory, ignore_errors=True)
+        self._directory = None
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+build_artifact_cache = BuildArtifactCache()
@@ -2,6 +2,7 @@ from datetime import datetime, timedelta, UTC
 from collections import defaultdict
 from sqlalchemy.orm import joinedload
 from sqlalchemy import func
+from flask import current_app, request
 from scripts.extensions import db, get_setting
 from scripts.models import User, Submission, Challenge, Award, FlagAttempt, Category, UserHint, Hint
 import math
@@ -32,11 +33,146 @@ def _calculate_stats(data):
         'q3': q3
     }
 
-def get_global_score_history_data():
+def lttb_indices(xs, ys, max_points):
+    """
+    Selects the points of a series to keep with the largest-triangle-three-buckets algorithm:
+    the first and last points, and from each of max_points - 2 buckets in between the point forming
+    the largest triangle with the previously kept point and the average of the next bucket. This
+    keeps the visible shape of the series (steps, peaks) with a fraction of its points.
+
+    Args:
+        xs (list): The x values, as numbers in ascending order.
+        ys (list): The y values.
+        max_points (int): Number of points to keep; series with fewer points are kept whole.
+
+    Returns:
+        list: The indices of the points to keep, in ascending order.
+    """
+    n = len(xs)
+    if max_points is None or max_points >= n or max_points < 3:
+        return list(range(n))
+
+    bucket_size = (n - 2) / (max_points - 2)
+    indices = [0]
+    previous = 0
+    for bucket in range(max_points - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_start, next_end = end, min(int((bucket + 2) * bucket_size) + 1, n)
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        prev_x, prev_y = xs[previous], ys[previous]
+        largest_area, selected = -1, start
+        for i in range(start, end):
+            # Twice the triangle's area, which ranks the same
+            area = abs((prev_x - avg_x) * (ys[i] - prev_y) - (prev_x - xs[i]) * (avg_y - prev_y))
+            if area > largest_area:
+                largest_area, selected = area, i
+        indices.append(selected)
+        previous = selected
+    indices.append(n - 1)
+    return indices
+
+_UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+def _epoch_seconds(iso_timestamp):
+    timestamp = datetime.fromisoformat(iso_timestamp)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=UTC) # Naive timestamps from the database are UTC
+    return timestamp.timestamp()
+
+def epoch_ms(timestamp):
+    """
+    Returns a datetime (naive ones are UTC) or ISO timestamp as milliseconds since the Unix epoch.
+    """
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=UTC)
+    return (timestamp - _UNIX_EPOCH) // timedelta(milliseconds=1)
+
+def downsample_points(points, max_points, y_key='y'):
+    """
+    Down-samples a chart series of {'x': ISO timestamp, y_key: value, ...} dicts to at most max_points points.
+    """
+    if max_points is None or len(points) <= max_points:
+        return points
+    xs = [_epoch_seconds(point['x']) for point in points]
+    ys = [point[y_key] for point in points]
+    return [points[i] for i in lttb_indices(xs, ys, max_points)]
+
+def requested_chart_points():
+    """
+    Returns the number of points per chart series requested with ?points=N, or
+    CHART_POINTS_PER_SERIES. None (for ?points=0) sends series whole.
+
+    Raises:
+        ValueError: If points is not a non-negative integer.
+    """
+    points = request.args.get('points')
+    if points is None:
+        points = current_app.config.get('CHART_POINTS_PER_SERIES', 500)
+    elif not points.isdigit():
+        raise ValueError('"points" must be a non-negative integer')
+    points = int(points)
+    # Fewer than 3 points cannot show a series' shape
+    return max(points, 3) if points else None
+
+def requested_compact_encoding():
+    """
+    Returns whether the client asked for the compact encoding of chart series with ?format=compact.
+    """
+    return request.args.get('format') == 'compact'
+
+def compact_series(points, value_keys=('y',), interned_keys=()):
+    """
+    Encodes a chart series of {'x': ISO timestamp, ...} dicts in the compact encoding, as parallel arrays:
+
+        {'t': [epoch milliseconds, ...], 'y': [...], ..., 'interned': {key: [distinct values, ...]}}
+
+    The columns of interned_keys hold indexes into their table in 'interned', so that repeated
+    strings are sent once. This is a fraction of the size of the dicts and much faster to encode.
+    """
+    series = {'t': [epoch_ms(point['x']) for point in points]}
+    for key in value_keys:
+        series[key] = [point.get(key) for point in points]
+    if interned_keys:
+        series['interned'] = {}
+        for key in interned_keys:
+            table = {}
+            series[key] = [table.setdefault(point.get(key), len(table)) for point in points]
+            series['interned'][key] = list(table)
+    return series
+
+# Series of the profile charts, with their value columns and interned columns
+_PROFILE_CHART_SERIES = {
+    'points_over_time': (('y',), ('category',)),
+    'target_user_score_history': (('y',), ()),
+    'global_stats_over_time': (('min', 'max', 'avg', 'std_dev', 'q1', 'q3'), ()),
+    'challenges_complete': (('y',), ()),
+}
+
+def compact_profile_charts_data(profile_charts_data):
+    """
+    Returns the profile charts data with its time series in the compact encoding (see compact_series).
+    Empty series stay empty lists, which the profile template checks for.
+    """
+    compact_data = dict(profile_charts_data, encoding='compact')
+    for key, (value_keys, interned_keys) in _PROFILE_CHART_SERIES.items():
+        if compact_data.get(key):
+            compact_data[key] = compact_series(compact_data[key], value_keys, interned_keys)
+    return compact_data
+
+def get_global_score_history_data(max_points=None):
     """
     Generates time series data for global score statistics (min, max, avg, std dev, Q1, Q3)
     across all active users, and individual user cumulative scores over time.
 
+    Args:
+        max_points (int, optional): Down-samples every series to at most this many points, all
+            onto the same timestamps (see lttb_indices).
+
     Returns:
         dict: A dictionary containing:
             - 'global_stats_over_time': List of dicts, each with 'x' (timestamp) and global stats.
@@ -184,6 +320,18 @@ def get_global_score_history_data():
     # Fill in gaps for users who didn't have an event at every global timestamp
     all_global_timestamps = sorted(list(set([d['x'] for d in global_stats_over_time])))
 
+    if max_points and len(all_global_timestamps) > max_points:
+        # Every series is down-sampled onto the same timestamps, chosen by LTTB on the average score,
+        # so that the series still line up point for point; user scores are only filled in at those
+        global_stats_by_timestamp = {d['x']: d for d in global_stats_over_time}
+        kept_indices = lttb_indices(
+            [_epoch_seconds(timestamp) for timestamp in all_global_timestamps],
+            [global_stats_by_timestamp[timestamp]['avg'] for timestamp in all_global_timestamps],
+            max_points
+        )
+        all_global_timestamps = [all_global_timestamps[i] for i in kept_indices]
+        global_stats_over_time = [global_stats_by_timestamp[timestamp] for timestamp in all_global_timestamps]
+
     final_user_scores_history = {}
     for user in all_users: # Iterate through all_users to ensure all are included
         username = user.username
@@ -255,7 +403,7 @@ def get_profile_points_over_time_data(target_user, db_session, get_setting_func,
         profile_charts_data['points_over_time'] = points_over_time_data
 
         # Always populate target_user_score_history, as it's the user's own data
-        global_chart_data_for_user_history = get_global_score_history_data() # Fetch global data once
+        global_chart_data_for_user_history = get_global_score_history_data(max_points=current_app.config.get('CHART_POINTS_PER_SERIES', 500)) # Fetch global data once
         target_user_history = global_chart_data_for_user_history['user_scores_over_time'].get(target_user.username, [])
         if not target_user_history or target_user_history[0]['y'] != 0:
             target_user_history.insert(0, {'x': datetime.min.replace(tzinfo=UTC_tz).isoformat(), 'y': 0})
@@ -1,11 +1,33 @@
 import re # Added for regex matching in static analysis
+import codecs
+import hashlib
+import io
+import select
+import selectors
 import subprocess
 import tempfile
 import os
 import secrets
+import shlex
 import shutil
+import signal
+import sys
+import threading
+import time
+import traceback
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from flask import current_app
 from scripts.config import get_enabled_language_configs
+from scripts.execution_cache import execution_result_cache, make_cache_key, _runtime_version
+from scripts.warm_pool import warm_interpreter_pool, encode_submission
+from scripts.sandbox_limits import SandboxLimits
+from scripts.build_cache import build_artifact_cache, make_build_key
+from scripts.executor_service import sandbox_executor
+from scripts.sandbox_backends import get_sandbox_backend
+from scripts.execution_scheduler import execution_scheduler, PRIORITY_NORMAL
+from scripts.test_case_blobs import TestCaseBlob
 
 # Configuration for bwrap paths and language runtimes
 # These should ideally be configurable or checked for existence
@@ -24,6 +46,12 @@ BWRAP_COMMON_ARGS = [
 # Max output size for stdout/stderr
 MAX_OUTPUT_SIZE_BYTES = 10 * 1024 # 10 KB
 
+CODE_SIZE_LIMIT_BYTES = 200 * 1024 # 0.2 MB
+EXECUTION_TIMEOUT_SECONDS = 5 # Fixed timeout
+
+SUPERSEDED_MESSAGE = "Superseded by a newer submission for this challenge."
+SKIPPED_MESSAGE = "Not run: an earlier test case already failed."
+
 # Language-specific configurations
 # Tuple: (runtime_path, file_extension, execute_command_template, bind_args)
 LANGUAGE_CONFIGS = {
@@ -66,6 +94,29 @@ LANGUAGE_CONFIGS = {
     )
 }
 
+# Languages with a build step: the code is compiled once per submission and the artifact is run
+# for every test case. Compiled artifacts are cached by content (see scripts/build_cache.py).
+# Tuple: (build_command, artifact_name, execute_command_template)
+# The build command runs in a sandbox with /sandbox/build writable and must write the artifact there.
+LANGUAGE_BUILD_CONFIGS = {
+    'dart': (
+        '/sandbox/dart-sdk/bin/dart compile kernel /sandbox/user_code.dart -o /sandbox/build/user_code.dill',
+        'user_code.dill',
+        '/sandbox/dart-sdk/bin/dart run /sandbox/build/user_code.dill'
+    )
+}
+
+BUILD_TIMEOUT_SECONDS = 30 # Time limit for compiling a submission
+
+# Parse-only commands run in a sandbox to reject code with syntax errors once per submission
+# instead of once per test case (SYNTAX_PRECHECK_SANDBOXED). {runtime} is the runtime's path.
+# Python code is checked on the host instead (SYNTAX_PRECHECK).
+LANGUAGE_SYNTAX_CHECKS = {
+    'nodejs': '{runtime} --check /sandbox/user_code.js',
+    'php': '{runtime} -l /sandbox/user_code.php',
+    'bash': 'bash -n /sandbox/user_code.sh',
+}
+
 # Language-specific blacklists for static code analysis
 # These are patterns or keywords that indicate potentially dangerous operations
 LANGUAGE_BLACKLISTS = {
@@ -182,6 +233,144 @@ LANGUAGE_BLACKLISTS = {
     }
 }
 
+_REGEX_METACHARACTERS = set('.^$*+?{}[]|()\\')
+
+def _build_literal_matcher(literals):
+    """
+    Compiles a list of literal strings into one regex that finds any of them in a single pass.
+
+    The literals are merged into a trie first, so shared prefixes (e.g. 'getuid(' and 'getgid(')
+    are only compared once per position instead of once per literal.
+    """
+    if not literals:
+        return None
+    trie = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[''] = True # Marks the end of a literal
+
+    def to_regex(node):
+        branches = [re.escape(char) + to_regex(child) for char, child in sorted(node.items()) if char != '']
+        if not branches:
+            return ''
+        regex = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A literal ending here also matches on its own, longer literals are optional continuations
+        return f'(?:{regex})?' if '' in node else regex
+
+    return re.compile(to_regex(trie))
+
+def _required_literal(pattern):
+    """
+    Returns the lowercase ASCII literal every match of a regex pattern starts with, or None.
+
+    Only simple leading literals (optionally after a leading \\b) are recognised; patterns with
+    alternation or without such a prefix return None and are always searched in full.
+    """
+    i = 0
+    in_class = False
+    while i < len(pattern):
+        if pattern[i] == '\\':
+            i += 2
+            continue
+        if pattern[i] == '[':
+            in_class = True
+        elif pattern[i] == ']':
+            in_class = False
+        elif pattern[i] == '|' and not in_class:
+            return None
+        i += 1
+
+    literal = []
+    i = 2 if pattern.startswith('\\b') else 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\' and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            literal.append(pattern[i + 1])
+            i += 2
+        elif char == '\\' or char in _REGEX_METACHARACTERS:
+            if char in '*?{' and literal:
+                literal.pop() # The previous character is optional
+            break
+        else:
+            literal.append(char)
+            i += 1
+
+    required = ''.join(literal)
+    if not required or not required.isascii():
+        return None
+    return required.lower()
+
+def _compile_blacklist(blacklist):
+    """
+    Pre-compiles one LANGUAGE_BLACKLISTS entry for _static_code_analysis.
+    """
+    return {
+        'literal_matcher': _build_literal_matcher(blacklist.get('forbidden_imports', []) + blacklist.get('forbidden_keywords', [])),
+        'regexes': [
+            (pattern, re.compile(pattern, re.IGNORECASE | re.DOTALL), _required_literal(pattern))
+            for pattern in blacklist.get('forbidden_regex', [])
+        ]
+    }
+
+# Compiled once at import time, keyed like LANGUAGE_BLACKLISTS
+_COMPILED_BLACKLISTS = {language: _compile_blacklist(blacklist) for language, blacklist in LANGUAGE_BLACKLISTS.items()}
+
+# Memoised analysis results keyed by (language, SHA-256 of the code), as the same code is
+# usually analysed several times per submission (route check, then once per sandbox run)
+_ANALYSIS_CACHE_SIZE = 256
+_analysis_cache = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+
+def _analyse_code(language, code):
+    blacklist = LANGUAGE_BLACKLISTS[language]
+    compiled = _COMPILED_BLACKLISTS[language]
+
+    # One pass finds whether any forbidden import or keyword occurs; the lists are only
+    # walked in order on a hit, to report the same entry the checks below always have
+    if compiled['literal_matcher'] and compiled['literal_matcher'].search(code):
+        # Check for forbidden imports
+        for forbidden_import in blacklist.get('forbidden_imports', []):
+            if forbidden_import in code:
+                return False, f"Forbidden import '{forbidden_import}' detected in code. This is not allowed for security reasons."
+
+        # Check for forbidden keywords (exact string match)
+        for forbidden_keyword in blacklist.get('forbidden_keywords', []):
+            if forbidden_keyword in code:
+                return False, f"Forbidden keyword '{forbidden_keyword}' detected in code. This operation is not allowed."
+
+    # Case-insensitive regexes cannot use the regex engine's literal fast path, so skip patterns
+    # whose leading literal does not occur at all. Lowercasing is only an exact case fold for ASCII.
+    folded_code = code.lower() if code.isascii() else None
+
+    # Check for forbidden regex patterns
+    for forbidden_regex_pattern, forbidden_regex, required_literal in compiled['regexes']:
+        if folded_code is not None and required_literal and required_literal not in folded_code:
+            continue
+        if forbidden_regex.search(code): # Case-insensitive and dotall for multiline
+            return False, f"Forbidden code pattern '{forbidden_regex_pattern}' detected. This operation is not allowed."
+
+    return True, "OK"
+
+def _memoised_analysis(kind, language, code, analyse):
+    """
+    Returns analyse(language, code), memoised in the analysis cache under (kind, language, code hash).
+    """
+    cache_key = (kind, language, hashlib.sha256(code.encode('utf-8', 'surrogatepass')).hexdigest())
+    with _analysis_cache_lock:
+        if cache_key in _analysis_cache:
+            _analysis_cache.move_to_end(cache_key)
+            return _analysis_cache[cache_key]
+
+    result = analyse(language, code)
+
+    with _analysis_cache_lock:
+        _analysis_cache[cache_key] = result
+        if len(_analysis_cache) > _ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+    return result
+
 def _static_code_analysis(language, code):
     """
     Performs static analysis on the submitted code to check for blacklisted patterns.
@@ -189,25 +378,66 @@ def _static_code_analysis(language, code):
     """
     if language not in LANGUAGE_BLACKLISTS:
         return True, "OK" # No specific blacklist for this language, proceed with caution.
+    return _memoised_analysis('blacklist', language, code, _analyse_code)
 
-    blacklist = LANGUAGE_BLACKLISTS[language]
+# Runtime identity (see _runtime_version) -> whether the host interpreter parses code like it
+_host_python_compatibility = {}
 
-    # Check for forbidden imports
-    for forbidden_import in blacklist.get('forbidden_imports', []):
-        if forbidden_import in code:
-            return False, f"Forbidden import '{forbidden_import}' detected in code. This is not allowed for security reasons."
-        
-    # Check for forbidden keywords (exact string match)
-    for forbidden_keyword in blacklist.get('forbidden_keywords', []):
-        if forbidden_keyword in code:
-            return False, f"Forbidden keyword '{forbidden_keyword}' detected in code. This operation is not allowed."
+def _host_parses_like_runtime(runtime_path):
+    """
+    Returns whether this interpreter has the same major.minor version as the python3 runtime,
+    so that its parser accepts and rejects exactly the same code.
+    """
+    runtime_key = _runtime_version(runtime_path)
+    if runtime_key not in _host_python_compatibility:
+        try:
+            version = subprocess.run(
+                [runtime_path, '-c', 'import sys; print("%d.%d" % sys.version_info[:2])'],
+                capture_output=True, text=True, timeout=5
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            version = None
+        _host_python_compatibility[runtime_key] = version == "%d.%d" % sys.version_info[:2]
+    return _host_python_compatibility[runtime_key]
 
-    # Check for forbidden regex patterns
-    for forbidden_regex_pattern in blacklist.get('forbidden_regex', []):
-        if re.search(forbidden_regex_pattern, code, re.IGNORECASE | re.DOTALL): # Case-insensitive and dotall for multiline
-            return False, f"Forbidden code pattern '{forbidden_regex_pattern}' detected. This operation is not allowed."
-            
-    return True, "OK"
+def _python_syntax_error(language, code):
+    """
+    Compiles (without running) Python code on the host. Returns the error report the runtime
+    prints to stderr for a syntax error, or None if the code compiles or the check is inconclusive.
+    """
+    try:
+        # Compiled from bytes, so that coding declarations are honoured as when running the file
+        source = code.encode('utf-8')
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore') # e.g. SyntaxWarning for invalid escape sequences
+            compile(source, f'/sandbox/user_code{LANGUAGE_CONFIGS[language][1]}', 'exec', dont_inherit=True)
+    except SyntaxError as e:
+        if e.text is None and e.lineno:
+            # Errors raised by the compiler rather than the parser carry no source line, which
+            # the runtime reads back from the file
+            lines = source.decode('utf-8', errors='replace').splitlines()
+            if e.lineno <= len(lines):
+                e.text = lines[e.lineno - 1] + '\n'
+        return ''.join(traceback.format_exception_only(type(e), e)).strip()
+    except (UnicodeError, ValueError, RecursionError, MemoryError):
+        return None # Left to the runtime, whose messages for these differ between versions
+    return None
+
+def _syntax_precheck(language, code):
+    """
+    Rejects Python code that cannot compile without starting a sandbox (SYNTAX_PRECHECK).
+
+    Returns:
+        CodeExecutionResult: The result the failed run would have produced, or None.
+    """
+    if language != 'python3' or not current_app.config.get('SYNTAX_PRECHECK', True):
+        return None
+    if not _host_parses_like_runtime(LANGUAGE_CONFIGS[language][0]):
+        return None
+    syntax_error = _memoised_analysis('syntax', language, code, _python_syntax_error)
+    if syntax_error is None:
+        return None
+    return _evaluate_execution(1, "", _truncate_output(syntax_error), "")
 
 class CodeExecutionResult:
     def __init__(self, success, stdout, stderr, error_message, is_timeout=False):
@@ -216,25 +446,66 @@ class CodeExecutionResult:
         self.stderr = stderr
         self.error_message = error_message
         self.is_timeout = is_timeout
+        # Resources used by the run, when it was measured (see scripts/sandbox_limits.py)
+        self.cpu_time_seconds = None
+        self.peak_memory_kb = None
+        self.wall_time_seconds = None
+        # Whether the result was served from the execution result cache instead of being run
+        self.cached = False
+        # Whether the run was skipped because a newer submission replaced it (see scripts/execution_scheduler.py)
+        self.superseded = False
+        # Whether the test case was not run because an earlier one failed (fail-fast runs)
+        self.skipped = False
 
-def execute_code_in_sandbox(language, code, expected_output, setup_code=None, test_case_input=None):
+def _skipped_result():
+    result = CodeExecutionResult(False, "", "", SKIPPED_MESSAGE)
+    result.skipped = True
+    return result
+
+def _skip_after_first_failure(results):
     """
-    Executes user-provided code in a bwrap sandbox and compares its output.
+    Replaces the results following the first failed one with skipped results.
+    """
+    for i, result in enumerate(results):
+        if not result.success:
+            return results[:i + 1] + [_skipped_result() for _ in results[i + 1:]]
+    return results
 
-    Args:
-        language (str): The programming language (e.g., 'python3', 'nodejs').
-        code (str): The user's submitted code.
-        expected_output (str): The expected STDOUT from the code.
-        setup_code (str, optional): Code/commands to run before user's code.
-        test_case_input (str, optional): Input to be fed to the user's code via stdin.
-        # timeout (int, optional): Maximum execution time in seconds. Removed as it's now fixed.
+def _report_results(results, on_result, indices=None):
+    """
+    Passes results that became available together to an on_result(index, result) callback.
+    """
+    if on_result:
+        for index, result in zip(indices if indices is not None else range(len(results)), results):
+            on_result(index, result)
+    return results
 
-    Returns:
-        CodeExecutionResult: An object containing success status, stdout, stderr, and error message.
+def _get_sandbox_limits():
+    return SandboxLimits.from_config(current_app.config)
+
+def _get_sandbox_backend():
+    return get_sandbox_backend(current_app.config)
+
+# Global cap on concurrently running sandboxes, shared by every submission in this process
+_sandbox_slots = None
+_sandbox_slots_lock = threading.Lock()
+
+def _get_sandbox_slots():
+    """
+    Returns the semaphore limiting concurrent sandboxes, sized from CODE_EXECUTION_MAX_SANDBOXES.
     """
-    CODE_SIZE_LIMIT_BYTES = 200 * 1024 # 0.2 MB
-    EXECUTION_TIMEOUT_SECONDS = 5 # Fixed timeout
+    global _sandbox_slots
+    with _sandbox_slots_lock:
+        if _sandbox_slots is None:
+            max_sandboxes = current_app.config.get('CODE_EXECUTION_MAX_SANDBOXES') or os.cpu_count() or 1
+            _sandbox_slots = threading.BoundedSemaphore(max(1, int(max_sandboxes)))
+        return _sandbox_slots
 
+def _check_submission(language, code):
+    """
+    Validates the language and code before anything is written to disk or sandboxed.
+    Returns a failed CodeExecutionResult if the submission must be rejected, otherwise None.
+    """
     # Check if the language is enabled via Flask's current_app.config
     # This assumes a Flask app context is active when this function is called
     enabled_languages = get_enabled_language_configs()
@@ -252,133 +523,1041 @@ def execute_code_in_sandbox(language, code, expected_output, setup_code=None, te
     if len(code.encode('utf-8')) > CODE_SIZE_LIMIT_BYTES:
         return CodeExecutionResult(False, "", "", f"Submitted code exceeds the size limit of {CODE_SIZE_LIMIT_BYTES / 1024} KB.")
 
+    return _syntax_precheck(language, code)
+
+# Validated bwrap arguments per language (without the bwrap path itself), computed once per process
+_launch_profiles = {}
+# bwrap path -> whether it supports --ro-bind-data
+_data_bind_support = {}
+_launch_profiles_lock = threading.Lock()
+# Directory holding prepared per-language root filesystems (SANDBOX_ROOTFS_DIR), see build_sandbox_rootfs.py
+_sandbox_rootfs_dir = None
+
+# Directories a prepared root filesystem must provide as mount points
+_ROOTFS_MOUNT_POINTS = ('proc', 'dev', 'tmp', 'sandbox')
+
+def _build_bwrap_args(language):
+    """
+    Returns the bwrap arguments shared by every run of the given language, taken from the
+    language's cached launch profile.
+    """
+    with _launch_profiles_lock:
+        profile = _launch_profiles.get(language)
+        if profile is None:
+            profile = _launch_profiles[language] = _build_launch_profile(language)
+    return [BWRAP_PATH] + profile
+
+def _get_language_rootfs(language):
+    """
+    Returns the prepared root filesystem of a language inside SANDBOX_ROOTFS_DIR, or None if
+    there is none or it lacks the runtime or the required mount points.
+    """
+    if not _sandbox_rootfs_dir:
+        return None
+    rootfs = os.path.join(_sandbox_rootfs_dir, language)
+    if not os.path.isdir(rootfs):
+        return None
+
+    runtime_host_path = LANGUAGE_CONFIGS[language][0]
+    missing = [path for path in (runtime_host_path.lstrip('/'),) + _ROOTFS_MOUNT_POINTS if not os.path.exists(os.path.join(rootfs, path))]
+    if missing:
+        print(f"Warning: Sandbox root filesystem {rootfs} is missing {', '.join(missing)}. Binding host paths for {language}.")
+        return None
+    return rootfs
+
+def _build_rootfs_launch_profile(language, rootfs):
+    """
+    Builds the bwrap arguments for a language with a prepared root filesystem, which is bound
+    as a single read-only tree instead of the host's system directories.
+    """
+    language_binds_config = LANGUAGE_CONFIGS[language][3]
+
+    bwrap_args = ['--ro-bind', rootfs, '/']
+    common_args = list(BWRAP_COMMON_ARGS)
+    for i in range(len(common_args) - 1):
+        # The root filesystem is read-only, so files cannot be bound into a plain /sandbox directory
+        if common_args[i] == '--dir' and common_args[i + 1] == '/sandbox':
+            common_args[i] = '--tmpfs'
+    bwrap_args.extend(common_args)
+
+    # Trees the language expects below /sandbox (e.g. the Dart SDK) are taken from the root filesystem's copy
+    for host_path, sandbox_path in language_binds_config:
+        if sandbox_path == '/sandbox' or sandbox_path.startswith('/sandbox/'):
+            bwrap_args.extend(['--ro-bind', os.path.join(rootfs, host_path.lstrip('/')), sandbox_path])
+
+    return bwrap_args
+
+def _build_launch_profile(language):
+    """
+    Builds the bwrap arguments for a language: common options, system binds and language-specific
+    binds. Bind paths that do not exist are skipped with a warning.
+    """
     runtime_host_path, file_extension, execute_cmd_template, language_binds_config = LANGUAGE_CONFIGS[language]
 
-    # Create temporary directory for user code and setup script
+    rootfs = _get_language_rootfs(language)
+    if rootfs:
+        return _build_rootfs_launch_profile(language, rootfs)
+
+    bwrap_args = list(BWRAP_COMMON_ARGS)
+
+    # Add common binds (e.g., /usr, /bin, /lib, /lib64, etc.)
+    # Check if paths exist before binding
+    for host_path, sandbox_path in [
+        ('/usr', '/usr'),
+        ('/bin', '/bin'),
+        ('/lib', '/lib'),
+        ('/lib64', '/lib64')
+    ]:
+        if os.path.exists(host_path):
+            bwrap_args.extend(['--ro-bind', host_path, sandbox_path])
+        else:
+            print(f"Warning: Common bind path does not exist: {host_path}. Skipping.")
+
+    # Add language-specific binds
+    for host_path, sandbox_path in language_binds_config:
+        if os.path.exists(host_path):
+            bwrap_args.extend(['--ro-bind', host_path, sandbox_path])
+        else:
+            print(f"Warning: Language bind path does not exist: {host_path}. Skipping for {language}.")
+
+    # Ensure the runtime executable itself is bound if not covered by a general /usr/bin bind
+    if os.path.exists(runtime_host_path) and runtime_host_path not in [arg for sublist in language_binds_config for arg in sublist]:
+         bwrap_args.extend(['--ro-bind', runtime_host_path, runtime_host_path])
+
+    return bwrap_args
+
+def _supports_data_binds():
+    """
+    Returns whether the installed bwrap can populate files from a file descriptor (--ro-bind-data),
+    which lets the code be passed in memory instead of through a temporary directory.
+    Always False for sandbox backends other than bwrap.
+    """
+    if not _get_sandbox_backend().supports_data_binds:
+        return False
+    with _launch_profiles_lock:
+        supported = _data_bind_support.get(BWRAP_PATH)
+    if supported is None:
+        try:
+            probe = subprocess.run([BWRAP_PATH, '--help'], capture_output=True, timeout=5, check=False)
+            supported = b'--ro-bind-data' in probe.stdout + probe.stderr
+        except (OSError, subprocess.TimeoutExpired):
+            supported = False
+        with _launch_profiles_lock:
+            _data_bind_support[BWRAP_PATH] = supported
+    return supported and hasattr(os, 'memfd_create')
+
+def prepare_launch_profiles(languages, rootfs_dir=None):
+    """
+    Validates and caches the launch profiles of the given languages, so bind paths are checked
+    once at startup instead of on every run. The runtime paths are read from LANGUAGE_CONFIGS
+    (as written by configure_runtimes.py); restart the application after changing them.
+
+    Args:
+        languages (iterable): The languages to prepare.
+        rootfs_dir (str, optional): SANDBOX_ROOTFS_DIR; languages with a prepared root filesystem
+            in it are run on that instead of the host's system directories.
+    """
+    global _sandbox_rootfs_dir
+    with _launch_profiles_lock:
+        _launch_profiles.clear()
+        _data_bind_support.clear()
+        _sandbox_rootfs_dir = rootfs_dir or None
+    for language in languages:
+        if language in LANGUAGE_CONFIGS:
+            _build_bwrap_args(language)
+    _supports_data_binds()
+
+def _create_code_memfd(code):
+    """
+    Returns a memory file holding the code, to be passed to bwrap with --ro-bind-data.
+    """
+    code_fd = os.memfd_create('user_code', os.MFD_CLOEXEC)
+    try:
+        remaining = memoryview(code.encode('utf-8'))
+        while remaining:
+            remaining = remaining[os.write(code_fd, remaining):]
+        os.lseek(code_fd, 0, os.SEEK_SET)
+    except OSError:
+        os.close(code_fd)
+        raise
+    return code_fd
+
+def _create_sandbox_dir(code, file_extension, setup_code=None):
+    """
+    Creates the temporary host directory holding the user's code and optional setup script.
+
+    Returns:
+        tuple: (temp_host_dir, bind_args) where bind_args bind the files into /sandbox.
+    """
     temp_dir_name = f"sandbox_run_{secrets.token_urlsafe(8)}"
     temp_host_dir = os.path.join(tempfile.gettempdir(), temp_dir_name)
     os.makedirs(temp_host_dir, exist_ok=True)
 
     user_code_path_host = os.path.join(temp_host_dir, f"user_code{file_extension}")
-    setup_code_path_host = None
-    setup_cmd_in_sandbox = None
+    with open(user_code_path_host, 'w') as f:
+        f.write(code)
+    bind_args = ['--ro-bind', user_code_path_host, f'/sandbox/user_code{file_extension}']
+
+    if setup_code:
+        setup_code_path_host = os.path.join(temp_host_dir, "setup_script.sh")
+        with open(setup_code_path_host, 'w') as f:
+            f.write(setup_code)
+        os.chmod(setup_code_path_host, 0o755) # Make executable
+        bind_args.extend(['--ro-bind', setup_code_path_host, '/sandbox/setup_script.sh'])
 
+    return temp_host_dir, bind_args
+
+def _build_run_command(execute_cmd_template, setup_code=None):
+    """
+    Returns the shell command line that runs the optional setup script followed by the user's code.
+    """
+    if setup_code:
+        return f"/sandbox/setup_script.sh && {execute_cmd_template}"
+    return execute_cmd_template
+
+def _run_to_completion(sandbox, sandbox_run, timeout):
+    """
+    Runs a prepared sandbox without input under the given limits and collects its output.
+    On timeout the sandbox is killed and subprocess.TimeoutExpired is raised.
+
+    Returns:
+        tuple: (returncode, stdout, stderr) with the output as bytes.
+    """
+    process = None
     try:
-        # Write user code to a temporary file
-        with open(user_code_path_host, 'w') as f:
-            f.write(code)
-
-        # Handle setup code if provided
-        if setup_code:
-            setup_code_path_host = os.path.join(temp_host_dir, "setup_script.sh")
-            with open(setup_code_path_host, 'w') as f:
-                f.write(setup_code)
-            os.chmod(setup_code_path_host, 0o755) # Make executable
-            setup_cmd_in_sandbox = "/sandbox/setup_script.sh"
-
-        bwrap_args = [BWRAP_PATH] + BWRAP_COMMON_ARGS
-
-        # Add common binds (e.g., /usr, /bin, /lib, /lib64, etc.)
-        # Check if paths exist before binding
-        for host_path, sandbox_path in [
-            ('/usr', '/usr'),
-            ('/bin', '/bin'),
-            ('/lib', '/lib'),
-            ('/lib64', '/lib64')
-        ]:
-            if os.path.exists(host_path):
-                bwrap_args.extend(['--ro-bind', host_path, sandbox_path])
-            else:
-                print(f"Warning: Common bind path does not exist: {host_path}. Skipping.")
-        
-        # Add language-specific binds
-        for host_path, sandbox_path in language_binds_config:
-            if os.path.exists(host_path):
-                bwrap_args.extend(['--ro-bind', host_path, sandbox_path])
+        process = subprocess.Popen(
+            sandbox_run.wrap_command(sandbox.argv), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            **sandbox.popen_kwargs()
+        )
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            sandbox.kill(process)
+            process.communicate()
+            raise
+        return process.returncode, stdout, stderr
+    finally:
+        sandbox.cleanup(process)
+
+def _compile_in_sandbox(language, temp_host_dir):
+    """
+    Runs the language's build command on the code in temp_host_dir, writing the artifact to temp_host_dir/build.
+
+    Returns:
+        CodeExecutionResult: The failure if the code could not be compiled, otherwise None.
+    """
+    runtime_host_path, file_extension, execute_cmd_template, language_binds_config = LANGUAGE_CONFIGS[language]
+    build_command = LANGUAGE_BUILD_CONFIGS[language][0]
+    build_host_dir = os.path.join(temp_host_dir, 'build')
+    os.makedirs(build_host_dir, exist_ok=True)
+
+    bwrap_cmd = _build_bwrap_args(language) + [
+        '--ro-bind', os.path.join(temp_host_dir, f"user_code{file_extension}"), f'/sandbox/user_code{file_extension}',
+        '--bind', build_host_dir, '/sandbox/build',
+        '--setenv', 'HOME', '/tmp', # Compilers may keep state in the home directory
+        '--', 'bash', '-c', build_command
+    ]
+    sandbox_limits = _get_sandbox_limits()
+    sandbox_limits.cpu_time_limit_seconds = BUILD_TIMEOUT_SECONDS
+    sandbox_run = sandbox_limits.start_run(language)
+    try:
+        with _get_sandbox_slots():
+            sandbox = _get_sandbox_backend().prepare(language, bwrap_cmd)
+            returncode, stdout, stderr = _run_to_completion(sandbox, sandbox_run, BUILD_TIMEOUT_SECONDS + 2)
+    except subprocess.TimeoutExpired:
+        return CodeExecutionResult(False, "", "", "Compilation timed out.", is_timeout=True)
+    except FileNotFoundError:
+        return CodeExecutionResult(False, "", "", f"bwrap or runtime not found. Check paths: {BWRAP_PATH}, {runtime_host_path}")
+    finally:
+        sandbox_run.close()
+
+    if returncode != 0:
+        # Compiler diagnostics may go to either stream
+        diagnostics = _truncate_output((stderr or stdout).decode('utf-8', errors='replace').strip())
+        return CodeExecutionResult(False, "", diagnostics, f"Compilation failed with exit code {returncode}.\nCompiler Output:\n{diagnostics}")
+    return None
+
+def _check_syntax_in_sandbox(language, code):
+    """
+    Runs the language's parse-only command (LANGUAGE_SYNTAX_CHECKS) on the code in a sandbox.
+
+    Returns:
+        CodeExecutionResult: The failure if the code does not parse, otherwise None (also when
+            the check itself could not run, leaving the verdict to the test case runs).
+    """
+    runtime_host_path, file_extension, execute_cmd_template, language_binds_config = LANGUAGE_CONFIGS[language]
+    temp_host_dir, code_bind_args = _create_sandbox_dir(code, file_extension)
+    bwrap_cmd = _build_bwrap_args(language) + code_bind_args + [
+        '--', 'bash', '-c', LANGUAGE_SYNTAX_CHECKS[language].format(runtime=runtime_host_path)
+    ]
+    sandbox_run = _get_sandbox_limits().start_run(language)
+    try:
+        with _get_sandbox_slots():
+            sandbox = _get_sandbox_backend().prepare(language, bwrap_cmd)
+            returncode, stdout, stderr = _run_to_completion(sandbox, sandbox_run, EXECUTION_TIMEOUT_SECONDS + 2)
+    except (subprocess.TimeoutExpired, FileNotFoundError):
+        return None
+    finally:
+        sandbox_run.close()
+        if os.path.exists(temp_host_dir):
+            shutil.rmtree(temp_host_dir)
+
+    if returncode == 0:
+        return None
+    # Parsers report errors on either stream (php -l uses stdout)
+    diagnostics = _truncate_output((stderr or stdout).decode('utf-8', errors='replace').strip())
+    return _evaluate_execution(returncode, "", diagnostics, "")
+
+def _prepare_build(language, code, temp_host_dir):
+    """
+    For languages with a build step, places the compiled code in temp_host_dir/build, compiling it
+    only if no artifact built from identical code is cached.
+
+    Returns:
+        tuple: (bind_args, execute_cmd_template, failure) where failure is the CodeExecutionResult of a
+            failed build, or (None, None, None) for languages without a build step.
+    """
+    if language not in LANGUAGE_BUILD_CONFIGS:
+        return None, None, None
+
+    build_command, artifact_name, execute_cmd_template = LANGUAGE_BUILD_CONFIGS[language]
+    build_key = make_build_key(language, LANGUAGE_CONFIGS[language][0], build_command, code)
+    artifact_host_path = os.path.join(temp_host_dir, 'build', artifact_name)
+    os.makedirs(os.path.dirname(artifact_host_path), exist_ok=True)
+
+    with build_artifact_cache.building(build_key):
+        cached, failure = build_artifact_cache.fetch(build_key, artifact_host_path)
+        if not cached:
+            failure = _compile_in_sandbox(language, temp_host_dir)
+            if failure:
+                build_artifact_cache.put_failure(build_key, failure)
+            elif not os.path.exists(artifact_host_path):
+                failure = CodeExecutionResult(False, "", "", f"An unexpected error occurred during execution: compilation did not produce {artifact_name}.")
             else:
-                print(f"Warning: Language bind path does not exist: {host_path}. Skipping for {language}.")
-        
-        # Ensure the runtime executable itself is bound if not covered by a general /usr/bin bind
-        if os.path.exists(runtime_host_path) and runtime_host_path not in [arg for sublist in language_binds_config for arg in sublist]:
-             bwrap_args.extend(['--ro-bind', runtime_host_path, runtime_host_path])
-
-
-        # Bind user's code and setup script into the sandbox
-        bwrap_args.extend(['--ro-bind', user_code_path_host, f'/sandbox/user_code{file_extension}'])
-        if setup_code_path_host:
-            bwrap_args.extend(['--ro-bind', setup_code_path_host, '/sandbox/setup_script.sh'])
-
-        # Command to execute inside the sandbox
-        command_to_execute_in_sandbox = []
-        if setup_cmd_in_sandbox:
-            command_to_execute_in_sandbox = ['bash', '-c', f"{setup_cmd_in_sandbox} && {execute_cmd_template}"]
+                build_artifact_cache.put(build_key, artifact_host_path)
+        if failure:
+            return None, None, failure
+
+    return ['--ro-bind', artifact_host_path, f'/sandbox/build/{artifact_name}'], execute_cmd_template, None
+
+def _truncate_output(output):
+    if len(output) > MAX_OUTPUT_SIZE_BYTES:
+        return output[:MAX_OUTPUT_SIZE_BYTES] + f"\n... (output truncated to {MAX_OUTPUT_SIZE_BYTES} bytes)"
+    return output
+
+def preview_test_case_data(data):
+    """
+    Returns test case data for display: strings as they are, blobs cut to MAX_OUTPUT_SIZE_BYTES characters.
+    """
+    if not isinstance(data, TestCaseBlob):
+        return data
+    text = data.read_text(MAX_OUTPUT_SIZE_BYTES + 1)
+    if len(text) > MAX_OUTPUT_SIZE_BYTES:
+        text = text[:MAX_OUTPUT_SIZE_BYTES] + f"\n... ({data.size} bytes, truncated to {MAX_OUTPUT_SIZE_BYTES} bytes)"
+    return text
+
+def _expected_output_size(expected_output):
+    if isinstance(expected_output, TestCaseBlob):
+        return expected_output.size
+    return len(expected_output.encode('utf-8'))
+
+def _evaluate_execution(returncode, stdout, stderr, expected_output, output_matches=None):
+    """
+    Turns the exit code and (already stripped and truncated) output of a run into a CodeExecutionResult.
+    output_matches is the verdict of a _StdoutMonitor that saw the full output; without it, stdout is
+    compared to the expected output, which must then be a string.
+    """
+    if returncode != 0:
+        error_message = f"Execution failed with exit code {returncode}.\n"
+        if stdout:
+            error_message += f"Program Output (stdout):\n{stdout}\n"
+        if stderr:
+            error_message += f"Error Output (stderr):\n{stderr}\n"
+        if not stdout and not stderr:
+            error_message += "No output or errors captured.\n"
+        return CodeExecutionResult(False, stdout, stderr, error_message.strip())
+
+    if output_matches is None:
+        output_matches = stdout == expected_output.strip()
+    if output_matches:
+        return CodeExecutionResult(True, stdout, stderr, "")
+    else:
+        error_message = f"Output mismatch.\n" \
+                        f"Expected Output:\n'{preview_test_case_data(expected_output).strip()}'\n\n" \
+                        f"Actual Program Output (stdout):\n'{stdout}'\n"
+        if stderr:
+            error_message += f"\nError Output (stderr):\n{stderr}\n"
+        return CodeExecutionResult(False, stdout, stderr, error_message.strip())
+
+# Reasons for _stream_process to stop a run before the program exits by itself
+_STOPPED_TIMEOUT = 'timeout'
+_STOPPED_OUTPUT_LIMIT = 'output_limit'
+_STOPPED_MISMATCH = 'mismatch'
+
+_READ_CHUNK_BYTES = 32 * 1024
+# Stdout kept for display; the reported output is cut to MAX_OUTPUT_SIZE_BYTES after stripping anyway
+_RETAINED_STDOUT_CHARS = 2 * MAX_OUTPUT_SIZE_BYTES
+
+def _close_pipes(process):
+    for pipe in (process.stdin, process.stdout, process.stderr):
+        if pipe and not pipe.closed:
+            pipe.close()
+
+class _ExpectedOutputReader:
+    """
+    Reads an expected output (a string or a TestCaseBlob) front to back, without its leading
+    whitespace, so that blobs are compared chunk by chunk instead of being loaded whole.
+    """
+    def __init__(self, expected_output):
+        if isinstance(expected_output, TestCaseBlob):
+            self.size = expected_output.size
+            self._stream = expected_output.open_text()
         else:
-            command_to_execute_in_sandbox = ['bash', '-c', execute_cmd_template] # Always use bash -c for execute_cmd_template
+            expected_output = expected_output.strip()
+            self.size = len(expected_output.encode('utf-8'))
+            self._stream = io.StringIO(expected_output)
+        self._buffer = ''
+        self._started = False
 
-        bwrap_cmd = bwrap_args + ['--'] + command_to_execute_in_sandbox # Use -- to separate bwrap args from inner command
+    def take(self, length):
+        """
+        Returns the next `length` characters, or fewer at the end.
+        """
+        while len(self._buffer) < length:
+            chunk = self._stream.read(max(length - len(self._buffer), _READ_CHUNK_BYTES))
+            if not chunk:
+                break
+            if not self._started:
+                chunk = chunk.lstrip()
+                self._started = bool(chunk)
+            self._buffer += chunk
+        text, self._buffer = self._buffer[:length], self._buffer[length:]
+        return text
+
+    def at_end(self):
+        """
+        Returns whether nothing but whitespace is left.
+        """
+        while not self._buffer.strip():
+            self._buffer = self._stream.read(_READ_CHUNK_BYTES)
+            if not self._buffer:
+                return True
+        return False
+
+    def close(self):
+        self._stream.close()
+
+class _StdoutMonitor:
+    """
+    Collects a run's stdout as it is produced and decides when the run can be stopped early:
+    when the output exceeds the expected output plus MAX_OUTPUT_SIZE_BYTES, or when the output
+    received so far can no longer match the expected output. Only the beginning of the output
+    is kept, as that is all a result reports.
+    """
+    def __init__(self, expected_output):
+        self._expected = _ExpectedOutputReader(expected_output)
+        self.limit = self._expected.size + MAX_OUTPUT_SIZE_BYTES
+        self.size = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._chunks = []
+        self._retained = 0
+
+        # Incremental version of `stdout.strip() == expected.strip()`: the output seen so far, without
+        # its leading whitespace and with trailing whitespace held back, must be a prefix of the expected output
+        self._output_started = False
+        self._pending_whitespace = ''
+        self._mismatched = False
+
+    def feed(self, data):
+        """
+        Adds a chunk of stdout. Returns the reason to stop the run, or None to keep reading.
+        """
+        stop_reason = None
+        self.size += len(data)
+        if self.size > self.limit:
+            stop_reason = _STOPPED_OUTPUT_LIMIT
+            data = data[:len(data) - (self.size - self.limit)]
+        text = self._decoder.decode(data)
+        if self._retained < _RETAINED_STDOUT_CHARS:
+            self._chunks.append(text)
+            self._retained += len(text)
 
-        process_input = test_case_input if test_case_input else None # input should be string when text=True
+        if not self._output_started:
+            text = text.lstrip()
+            self._output_started = bool(text)
+        text = self._pending_whitespace + text
+        verified = text.rstrip()
+        self._pending_whitespace = text[len(verified):]
+        if verified and not self._mismatched and self._expected.take(len(verified)) != verified:
+            self._mismatched = True
+        if self._mismatched:
+            stop_reason = stop_reason or _STOPPED_MISMATCH
+        return stop_reason
 
-        # Execute the bwrap command
+    def matches(self):
+        """
+        Returns whether the complete output, stripped, equals the stripped expected output.
+        """
+        return not self._mismatched and self.size <= self.limit and self._expected.at_end()
+
+    def stdout(self):
+        return ''.join(self._chunks) + self._decoder.decode(b'', final=True)
+
+    def close(self):
+        self._expected.close()
+
+def _stream_process(process, input_bytes, expected_output, timeout, sandbox_run=None, stdout_monitor=None):
+    """
+    Feeds stdin to a sandbox process and reads its stdout/stderr as they are produced.
+    A process started with a file as its stdin gets empty input_bytes.
+
+    Nothing is buffered beyond the output limits: stdout may not exceed the expected output
+    plus MAX_OUTPUT_SIZE_BYTES, and stderr beyond MAX_OUTPUT_SIZE_BYTES is read but discarded.
+    The process is killed as soon as the time limit or the stdout limit is reached, or when the
+    stdout received so far can no longer match the expected output.
+
+    If a SandboxRun is given, the process is reaped through it so that its resource usage is recorded.
+    If a _StdoutMonitor for expected_output is given, stdout is collected by it, so the caller can
+    check whether the complete output matched.
+
+    Returns:
+        tuple: (returncode, stdout, stderr, stop_reason) where stop_reason is None if the program exited by itself.
+    """
+    wait = sandbox_run.wait if sandbox_run else (lambda process, timeout=None: process.wait(timeout=timeout))
+    stdout_monitor = stdout_monitor or _StdoutMonitor(expected_output)
+    stderr_bytes = bytearray()
+
+    stop_reason = None
+    input_view = memoryview(input_bytes)
+    input_offset = 0
+    deadline = time.monotonic() + timeout
+
+    with selectors.DefaultSelector() as selector:
+        if input_view:
+            selector.register(process.stdin, selectors.EVENT_WRITE)
+        elif process.stdin:
+            process.stdin.close()
+        selector.register(process.stdout, selectors.EVENT_READ)
+        selector.register(process.stderr, selectors.EVENT_READ)
+
+        while selector.get_map() and not stop_reason:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                stop_reason = _STOPPED_TIMEOUT
+                break
+
+            for key, _ in selector.select(remaining):
+                if key.fileobj is process.stdin:
+                    try:
+                        input_offset += os.write(key.fd, input_view[input_offset:input_offset + select.PIPE_BUF])
+                    except BrokenPipeError:
+                        input_offset = len(input_view) # The program stopped reading its input
+                    if input_offset >= len(input_view):
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+                    continue
+
+                data = os.read(key.fd, _READ_CHUNK_BYTES)
+                if not data:
+                    selector.unregister(key.fileobj)
+                    key.fileobj.close()
+                    continue
+
+                if key.fileobj is process.stderr:
+                    stderr_bytes += data[:max(0, MAX_OUTPUT_SIZE_BYTES - len(stderr_bytes))]
+                    continue
+
+                stop_reason = stdout_monitor.feed(data)
+                if stop_reason:
+                    break
+
+    returncode = None
+    if not stop_reason:
+        # Both pipes are closed, but the program may still be running
         try:
-            process = subprocess.run(
-                bwrap_cmd,
-                capture_output=True,
-                text=True, # Decode stdout/stderr as text
-                input=process_input,
-                timeout=EXECUTION_TIMEOUT_SECONDS + 2, # Give bwrap itself a bit more time to clean up
-                check=False # Don't raise an exception for non-zero exit codes
-            )
-            stdout = process.stdout.strip()
-            stderr = process.stderr.strip()
-
-            # Truncate output if it exceeds the limit
-            if len(stdout) > MAX_OUTPUT_SIZE_BYTES:
-                stdout = stdout[:MAX_OUTPUT_SIZE_BYTES] + f"\n... (output truncated to {MAX_OUTPUT_SIZE_BYTES} bytes)"
-            if len(stderr) > MAX_OUTPUT_SIZE_BYTES:
-                stderr = stderr[:MAX_OUTPUT_SIZE_BYTES] + f"\n... (output truncated to {MAX_OUTPUT_SIZE_BYTES} bytes)"
-
-
-            if process.returncode != 0:
-                error_message = f"Execution failed with exit code {process.returncode}.\n"
-                if stdout:
-                    error_message += f"Program Output (stdout):\n{stdout}\n"
-                if stderr:
-                    error_message += f"Error Output (stderr):\n{stderr}\n"
-                if not stdout and not stderr:
-                    error_message += "No output or errors captured.\n"
-                return CodeExecutionResult(False, stdout, stderr, error_message.strip())
-
-            if stdout == expected_output.strip():
-                return CodeExecutionResult(True, stdout, stderr, "")
-            else:
-                error_message = f"Output mismatch.\n" \
-                                f"Expected Output:\n'{expected_output.strip()}'\n\n" \
-                                f"Actual Program Output (stdout):\n'{stdout}'\n"
-                if stderr:
-                    error_message += f"\nError Output (stderr):\n{stderr}\n"
-                return CodeExecutionResult(False, stdout, stderr, error_message.strip())
-
-        except subprocess.TimeoutExpired as e:
-            # The process was terminated because it exceeded the timeout
-            stdout_output = e.stdout.strip() if e.stdout else ""
-            stderr_output = e.stderr.strip() if e.stderr else ""
-            return CodeExecutionResult(False, stdout_output, stderr_output, "Execution timed out.", is_timeout=True)
+            returncode = wait(process, timeout=max(0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            stop_reason = _STOPPED_TIMEOUT
+    if stop_reason:
+        # Like subprocess.run, only wait for bwrap itself: --die-with-parent tears down the sandbox
+        process.kill()
+        returncode = wait(process)
+    _close_pipes(process)
+
+    stdout = stdout_monitor.stdout()
+    stderr = stderr_bytes.decode('utf-8', errors='replace')
+    return returncode, stdout, stderr, stop_reason
+
+# Exit codes of a sandbox whose program was killed for exceeding RLIMIT_CPU
+_CPU_LIMIT_EXIT_CODES = (-signal.SIGXCPU, 128 + signal.SIGXCPU)
+
+def _run_streamed(process, input_bytes, expected_output, sandbox_run):
+    """
+    Streams a started sandbox process to completion and turns the outcome into a CodeExecutionResult
+    carrying the resources the run used.
+    """
+    stdout_monitor = _StdoutMonitor(expected_output)
+    try:
+        sandbox_run.mark_started()
+        returncode, _, stderr, stop_reason = _stream_process(
+            process, input_bytes, expected_output,
+            timeout=EXECUTION_TIMEOUT_SECONDS + 2, # Give bwrap itself a bit more time to clean up
+            sandbox_run=sandbox_run, stdout_monitor=stdout_monitor
+        )
+        return _streamed_result(returncode, stdout_monitor, stderr, stop_reason, expected_output, sandbox_run)
+    finally:
+        stdout_monitor.close()
+
+def _streamed_result(returncode, stdout_monitor, stderr, stop_reason, expected_output, sandbox_run):
+    """
+    Turns the outcome of a streamed run into a CodeExecutionResult carrying the resources the run used.
+    """
+    stdout = _truncate_output(stdout_monitor.stdout().strip())
+    stderr = _truncate_output(stderr.strip())
+
+    if stop_reason == _STOPPED_TIMEOUT:
+        result = CodeExecutionResult(False, stdout, stderr, "Execution timed out.", is_timeout=True)
+    elif stop_reason == _STOPPED_OUTPUT_LIMIT:
+        result = CodeExecutionResult(False, stdout, stderr, f"Output exceeded the limit of {MAX_OUTPUT_SIZE_BYTES} bytes.")
+    elif stop_reason == _STOPPED_MISMATCH:
+        # The program was stopped once its output diverged, so report the mismatch regardless of exit code
+        result = _evaluate_execution(0, stdout, stderr, expected_output, output_matches=False)
+    elif returncode in _CPU_LIMIT_EXIT_CODES:
+        result = CodeExecutionResult(False, stdout, stderr, f"CPU time limit of {sandbox_run.limits.cpu_time_limit_seconds} seconds exceeded.", is_timeout=True)
+    else:
+        result = _evaluate_execution(returncode, stdout, stderr, expected_output, output_matches=returncode == 0 and stdout_monitor.matches())
+
+    result.cpu_time_seconds = sandbox_run.cpu_time_seconds
+    result.peak_memory_kb = sandbox_run.peak_memory_kb
+    result.wall_time_seconds = sandbox_run.wall_time_seconds
+    return result
+
+def _open_test_case_input(test_case_input):
+    """
+    Returns (stdin, input_bytes) for starting a sandbox process and streaming its input.
+    A blob input is opened as the process's stdin, so the sandbox reads it straight from the
+    file instead of through this process; the caller closes the returned file.
+    """
+    if isinstance(test_case_input, TestCaseBlob):
+        return test_case_input.open_binary(), b""
+    return subprocess.PIPE, (test_case_input or "").encode('utf-8')
+
+def _execute_in_warm_interpreter(process, sandbox_run, code, expected_output, test_case_input=None):
+    """
+    Runs a submission in an interpreter taken from the warm pool.
+    The process exits after this single run and is never returned to the pool.
+    """
+    try:
+        with _get_sandbox_slots():
+            return _run_streamed(process, encode_submission(code, test_case_input), expected_output, sandbox_run)
+    except Exception as e:
+        process.kill()
+        _close_pipes(process)
+        return CodeExecutionResult(False, "", "", f"An unexpected error occurred during execution: {e}")
+    finally:
+        sandbox_run.close()
+
+def execute_code_in_sandbox(language, code, expected_output, setup_code=None, test_case_input=None):
+    """
+    Executes user-provided code in a sandbox (see SANDBOX_BACKEND) and compares its output.
+
+    Args:
+        language (str): The programming language (e.g., 'python3', 'nodejs').
+        code (str): The user's submitted code.
+        expected_output (str or TestCaseBlob): The expected STDOUT from the code.
+        setup_code (str, optional): Code/commands to run before user's code.
+        test_case_input (str or TestCaseBlob, optional): Input to be fed to the user's code via stdin.
+
+    Returns:
+        CodeExecutionResult: An object containing success status, stdout, stderr, and error message.
+    """
+    rejection = _check_submission(language, code)
+    if rejection:
+        return rejection
+
+    # Setup scripts run in the shell before the interpreter starts, so those runs always start cold;
+    # warm interpreters receive their input after the code on the same pipe, so blob inputs do too
+    if not setup_code and not isinstance(test_case_input, TestCaseBlob):
+        warm_interpreter = warm_interpreter_pool.acquire(language)
+        if warm_interpreter is not None:
+            warm_process, sandbox_run = warm_interpreter
+            return _execute_in_warm_interpreter(warm_process, sandbox_run, code, expected_output, test_case_input)
+
+    runtime_host_path, file_extension, execute_cmd_template, language_binds_config = LANGUAGE_CONFIGS[language]
+
+    # Plain runs pass the code to bwrap in memory; setup scripts and build steps need a host directory
+    temp_host_dir = None
+    code_fd = None
+    if not setup_code and language not in LANGUAGE_BUILD_CONFIGS and _supports_data_binds():
+        code_fd = _create_code_memfd(code)
+        code_bind_args = ['--ro-bind-data', str(code_fd), f'/sandbox/user_code{file_extension}']
+    else:
+        # Create temporary directory for user code and setup script
+        temp_host_dir, code_bind_args = _create_sandbox_dir(code, file_extension, setup_code)
+
+    try:
+        # Languages with a build step run the compiled artifact instead of the source
+        build_bind_args, build_cmd_template, build_failure = _prepare_build(language, code, temp_host_dir)
+        if build_failure:
+            return build_failure
+        if build_bind_args:
+            code_bind_args += build_bind_args
+            execute_cmd_template = build_cmd_template
+
+        bwrap_args = _build_bwrap_args(language) + code_bind_args
+
+        # Command to execute inside the sandbox. Always use bash -c for execute_cmd_template
+        command_to_execute_in_sandbox = ['bash', '-c', _build_run_command(execute_cmd_template, setup_code)]
+
+        bwrap_cmd = bwrap_args + ['--'] + command_to_execute_in_sandbox # Use -- to separate bwrap args from inner command
+
+        # Execute the bwrap command under the configured resource limits, reading its output as it is produced
+        process = None
+        stdin, input_bytes = _open_test_case_input(test_case_input)
+        sandbox_run = _get_sandbox_limits().start_run(language)
+        sandbox = _get_sandbox_backend().prepare(language, bwrap_cmd)
+        try:
+            with _get_sandbox_slots():
+                sandbox_run.mark_started()
+                process = subprocess.Popen(
+                    sandbox_run.wrap_command(sandbox.argv), stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                    pass_fds=() if code_fd is None else (code_fd,),
+                    **sandbox.popen_kwargs()
+                )
+                return _run_streamed(process, input_bytes, expected_output, sandbox_run)
         except FileNotFoundError:
             # bwrap itself or the runtime executable was not found
             return CodeExecutionResult(False, "", "", f"bwrap or runtime not found. Check paths: {BWRAP_PATH}, {runtime_host_path}")
         except Exception as e:
-            # Catch other unexpected errors during subprocess.run setup or execution
-            # Try to capture stdout/stderr if the process object was created before the exception
-            stdout_output = process.stdout.strip() if 'process' in locals() and process.stdout else ""
-            stderr_output = process.stderr.strip() if 'process' in locals() and process.stderr else ""
-            return CodeExecutionResult(False, stdout_output, stderr_output, f"An unexpected error occurred during execution: {e}")
+            # Catch other unexpected errors during process setup or execution
+            if process is not None:
+                process.kill()
+                _close_pipes(process)
+            return CodeExecutionResult(False, "", "", f"An unexpected error occurred during execution: {e}")
+        finally:
+            if stdin is not subprocess.PIPE:
+                stdin.close()
+            sandbox_run.close()
+            sandbox.cleanup(process)
 
     finally:
+        if code_fd is not None:
+            os.close(code_fd)
         # Clean up temporary directory on the host
+        if temp_host_dir and os.path.exists(temp_host_dir):
+            shutil.rmtree(temp_host_dir)
+
+# Exit codes reported by the batch harness for a test case
+_TIMEOUT_EXIT_CODES = (124, 137) # coreutils `timeout` expired (TERM, then KILL after the grace period)
+_OUTPUT_LIMIT_EXIT_CODE = 128 + 25 # SIGXFSZ: the case wrote more than the output file size limit
+
+def _batch_output_limit_blocks(test_cases):
+    """
+    Returns the size limit of the output files, in 1 KB blocks: room for the largest expected
+    output plus twice the reported output size; anything beyond is truncated anyway.
+    """
+    largest_expected_output = max(_expected_output_size(expected_output) for _, expected_output in test_cases)
+    return (largest_expected_output + 2 * MAX_OUTPUT_SIZE_BYTES) // 1024 + 1
+
+def _build_batch_harness(case_count, run_command, output_limit_blocks, fail_fast=False):
+    """
+    Returns the bash script that runs every test case inside a single sandbox.
+
+    Each case gets its own interpreter process with stdin redirected from /sandbox/cases/<i>.in,
+    a per-case time limit, and its stdout/stderr/exit code written to /sandbox/out/<i>.*, each
+    file limited to output_limit_blocks 1 KB blocks.
+    With fail_fast, the harness stops after the first case exiting with an error or timing out;
+    output mismatches are only detected afterwards, on the host.
+    """
+    stop_on_error = "    [ \"$rc\" -eq 0 ] || break\n" if fail_fast else ""
+    return f"""#!/bin/bash
+ulimit -f {output_limit_blocks}
+for ((i = 0; i < {case_count}; i++)); do
+    timeout -k 1 {EXECUTION_TIMEOUT_SECONDS} bash -c {shlex.quote(run_command)} < /sandbox/cases/$i.in > /sandbox/out/$i.out 2> /sandbox/out/$i.err
+    rc=$?
+    echo $rc > /sandbox/out/$i.rc
+{stop_on_error}done
+"""
+
+def _read_batch_output(path):
+    if not os.path.exists(path):
+        return ""
+    with open(path, 'r', errors='replace') as f:
+        return f.read(2 * MAX_OUTPUT_SIZE_BYTES)
+
+def _match_batch_output(path, expected_output):
+    """
+    Compares a test case's output file to the expected output chunk by chunk.
+
+    Returns:
+        tuple: (stdout, output_matches) with the beginning of the output, for display.
+    """
+    stdout_monitor = _StdoutMonitor(expected_output)
+    try:
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                while True:
+                    data = f.read(_READ_CHUNK_BYTES)
+                    if not data or stdout_monitor.feed(data):
+                        break
+        return stdout_monitor.stdout(), stdout_monitor.matches()
+    finally:
+        stdout_monitor.close()
+
+def _read_batch_exit_code(path):
+    """
+    Returns the exit code recorded by the harness for a test case, or None if the case never finished.
+    """
+    exit_code = _read_batch_output(path).strip()
+    return int(exit_code) if exit_code.isdigit() else None
+
+def execute_test_cases_in_sandbox(language, code, test_cases, setup_code=None, fail_fast=False):
+    """
+    Executes user-provided code against several test cases within a single bwrap sandbox launch.
+
+    The sandbox, its binds and the temporary directory are set up once; a harness script then
+    runs the code once per test case with a per-case time limit of EXECUTION_TIMEOUT_SECONDS.
+    Unlike execute_code_in_sandbox, files written by one test case are visible to later ones.
+
+    Args:
+        language (str): The programming language (e.g., 'python3', 'nodejs').
+        code (str): The user's submitted code.
+        test_cases (list): (input_data, expected_output) tuples of strings or TestCaseBlobs, in execution order.
+        setup_code (str, optional): Code/commands to run before the user's code for each test case.
+        fail_fast (bool, optional): Stop at the first failed test case and mark the rest as skipped.
+
+    Returns:
+        list: One CodeExecutionResult per test case, in the same order as test_cases.
+    """
+    rejection = _check_submission(language, code)
+    if rejection:
+        return [rejection for _ in test_cases]
+    if not test_cases:
+        return []
+
+    runtime_host_path, file_extension, execute_cmd_template, language_binds_config = LANGUAGE_CONFIGS[language]
+
+    temp_host_dir, code_bind_args = _create_sandbox_dir(code, file_extension, setup_code)
+
+    try:
+        build_bind_args, build_cmd_template, build_failure = _prepare_build(language, code, temp_host_dir)
+        if build_failure:
+            return [build_failure for _ in test_cases]
+        if build_bind_args:
+            code_bind_args += build_bind_args
+            execute_cmd_template = build_cmd_template
+
+        cases_dir = os.path.join(temp_host_dir, 'cases')
+        out_dir = os.path.join(temp_host_dir, 'out')
+        os.makedirs(cases_dir)
+        os.makedirs(out_dir)
+        for i, (input_data, _) in enumerate(test_cases):
+            if isinstance(input_data, TestCaseBlob):
+                input_data.link_to(os.path.join(cases_dir, f"{i}.in"))
+                continue
+            with open(os.path.join(cases_dir, f"{i}.in"), 'w') as f:
+                f.write(input_data or "")
+
+        # The harness is passed on the command line, so sandbox backends can adapt its paths
+        output_limit_blocks = _batch_output_limit_blocks(test_cases)
+        harness = _build_batch_harness(len(test_cases), _build_run_command(execute_cmd_template, setup_code), output_limit_blocks, fail_fast=fail_fast)
+        bwrap_cmd = _build_bwrap_args(language) + code_bind_args + [
+            '--ro-bind', cases_dir, '/sandbox/cases',
+            '--bind', out_dir, '/sandbox/out',
+            '--', 'bash', '-c', harness
+        ]
+
+        # Every case may use its full time limit plus the kill grace period
+        batch_timeout = len(test_cases) * (EXECUTION_TIMEOUT_SECONDS + 1) + 2
+        # The limits apply to the batch as a whole, so per-case usage is not recorded in this mode
+        sandbox_limits = _get_sandbox_limits()
+        sandbox_limits.cpu_time_limit_seconds *= len(test_cases)
+        sandbox_run = sandbox_limits.start_run(language)
+        try:
+            with _get_sandbox_slots():
+                _run_to_completion(_get_sandbox_backend().prepare(language, bwrap_cmd), sandbox_run, batch_timeout)
+        except subprocess.TimeoutExpired:
+            pass # Cases without an exit code are reported as timed out below
+        except FileNotFoundError:
+            message = f"bwrap or runtime not found. Check paths: {BWRAP_PATH}, {runtime_host_path}"
+            return [CodeExecutionResult(False, "", "", message) for _ in test_cases]
+        finally:
+            sandbox_run.close()
+
+        results = []
+        for i, (_, expected_output) in enumerate(test_cases):
+            stdout_path = os.path.join(out_dir, f"{i}.out")
+            stdout, output_matches = _match_batch_output(stdout_path, expected_output)
+            stdout = stdout.strip()
+            stderr = _read_batch_output(os.path.join(out_dir, f"{i}.err")).strip()
+            returncode = _read_batch_exit_code(os.path.join(out_dir, f"{i}.rc"))
+            # Some runtimes (e.g. Python) ignore SIGXFSZ and fail with a write error instead
+            output_limit_hit = os.path.exists(stdout_path) and os.path.getsize(stdout_path) >= output_limit_blocks * 1024
+
+            if returncode is None or returncode in _TIMEOUT_EXIT_CODES:
+                results.append(CodeExecutionResult(False, _truncate_output(stdout), _truncate_output(stderr), "Execution timed out.", is_timeout=True))
+            elif returncode == _OUTPUT_LIMIT_EXIT_CODE or output_limit_hit:
+                results.append(CodeExecutionResult(False, _truncate_output(stdout), _truncate_output(stderr), f"Output exceeded the limit of {MAX_OUTPUT_SIZE_BYTES} bytes."))
+            else:
+                results.append(_evaluate_execution(returncode, _truncate_output(stdout), _truncate_output(stderr), expected_output, output_matches=output_matches))
+        return _skip_after_first_failure(results) if fail_fast else results
+
+    finally:
         if os.path.exists(temp_host_dir):
             shutil.rmtree(temp_host_dir)
 
+def execute_test_cases_in_parallel(language, code, test_cases, setup_code=None, fail_fast=False, on_result=None):
+    """
+    Executes user-provided code against several test cases, one isolated sandbox per test case,
+    spread over a pool of up to CODE_EXECUTION_MAX_PARALLEL threads.
+
+    Sandboxes still count against the global CODE_EXECUTION_MAX_SANDBOXES cap, so a submission
+    with many test cases waits for free slots instead of occupying every core.
+    With fail_fast, test cases not yet started when one fails are skipped; running ones finish.
+    on_result(index, result) is called from the pool threads as each test case finishes.
+
+    Returns:
+        list: One CodeExecutionResult per test case, in the same order as test_cases.
+    """
+    if not test_cases:
+        return []
+
+    max_parallel = current_app.config.get('CODE_EXECUTION_MAX_PARALLEL') or os.cpu_count() or 1
+    worker_count = max(1, min(int(max_parallel), len(test_cases)))
+    app = current_app._get_current_object()
+    _get_sandbox_slots() # Size the global cap while the application context is available
+    failed = threading.Event()
+
+    def run_case(index):
+        if failed.is_set():
+            result = _skipped_result()
+        else:
+            input_data, expected_output = test_cases[index]
+            with app.app_context():
+                result = execute_code_in_sandbox(language, code, expected_output, setup_code=setup_code, test_case_input=input_data)
+            if fail_fast and not result.success:
+                failed.set()
+        if on_result:
+            on_result(index, result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix='sandbox') as executor:
+        # map() yields results in submission order regardless of completion order
+        results = list(executor.map(run_case, range(len(test_cases))))
+    # Cases after the first failure that were already running when it happened are skipped too
+    return _skip_after_first_failure(results) if fail_fast else results
+
+def execute_test_cases(language, code, test_cases, setup_code=None, fail_fast=False, on_result=None):
+    """
+    Runs code against a list of test cases in this process, using the execution mode configured in
+    CODE_EXECUTION_MODE and bypassing the result cache. Sandbox executors serve requests with this.
+
+    With fail_fast, the test cases following the first failed one are not run (or, when they
+    were already running, not reported) and their results have `skipped` set.
+    If given, on_result(index, result) is called as soon as each test case's result is known
+    (in 'batch' mode, once the whole batch has run); the returned list is authoritative.
+
+    Returns:
+        list: One CodeExecutionResult per test case, in the same order as test_cases.
+    """
+    if len(test_cases) > 1 and language in LANGUAGE_SYNTAX_CHECKS and current_app.config.get('SYNTAX_PRECHECK_SANDBOXED', False):
+        # One parse-only sandbox instead of one failing run per test case; fail-fast runs
+        # already stop after the first failing case
+        syntax_failure = None if fail_fast else _check_syntax_in_sandbox(language, code)
+        if syntax_failure:
+            return _report_results([syntax_failure for _ in test_cases], on_result)
+
+    mode = current_app.config.get('CODE_EXECUTION_MODE', 'sequential')
+    if mode == 'batch':
+        return _report_results(execute_test_cases_in_sandbox(language, code, test_cases, setup_code=setup_code, fail_fast=fail_fast), on_result)
+    if mode == 'parallel':
+        return execute_test_cases_in_parallel(language, code, test_cases, setup_code=setup_code, fail_fast=fail_fast, on_result=on_result)
+
+    results = []
+    for input_data, expected_output in test_cases:
+        if fail_fast and results and not results[-1].success:
+            result = _skipped_result()
+        else:
+            result = execute_code_in_sandbox(language, code, expected_output, setup_code=setup_code, test_case_input=input_data)
+        results.append(result)
+        _report_results([result], on_result, indices=[len(results) - 1])
+    return results
+
+def _run_test_cases_uncached(language, code, test_cases, setup_code=None, user_id=None, priority=PRIORITY_NORMAL, challenge_id=None, fail_fast=False, on_result=None):
+    """
+    Runs test cases once the fair-share scheduler admits the submission, in-process or on a
+    sandbox executor when SANDBOX_EXECUTOR_ADDRESSES is configured.
+    """
+    supersede_key = (user_id, challenge_id) if user_id is not None and challenge_id is not None else None
+    with execution_scheduler.admit(user_id, cost=len(test_cases), priority=priority, supersede_key=supersede_key) as ticket:
+        if ticket is not None and ticket.superseded:
+            superseded = CodeExecutionResult(False, "", "", SUPERSEDED_MESSAGE)
+            superseded.superseded = True
+            return _report_results([superseded for _ in test_cases], on_result)
+        return sandbox_executor.run_test_cases(language, code, test_cases, setup_code=setup_code, fail_fast=fail_fast, on_result=on_result)
+
+def run_test_cases(language, code, test_cases, setup_code=None, challenge_id=None, user_id=None, priority=PRIORITY_NORMAL, fail_fast=False, on_result=None):
+    """
+    Runs code against a list of test cases using the execution mode configured in CODE_EXECUTION_MODE.
+
+    'sequential' starts one sandbox per test case; 'batch' runs all test cases inside one sandbox launch;
+    'parallel' runs one sandbox per test case concurrently across a bounded pool.
+    Results of earlier identical runs are served from the execution result cache, and the remaining
+    test cases wait for the fair-share scheduler, then run on a sandbox executor if
+    SANDBOX_EXECUTOR_ADDRESSES is configured.
+
+    Args:
+        test_cases (list): (input_data, expected_output) tuples of strings or TestCaseBlobs, in execution order.
+        challenge_id (int, optional): The challenge the test cases belong to, used to invalidate cached results.
+        user_id (int, optional): The submitting user, whose runs are scheduled fairly against other users'.
+            A still-waiting earlier run by the same user for the same challenge is superseded.
+        priority (str, optional): PRIORITY_NORMAL, or PRIORITY_LOW for background work such as verification.
+        fail_fast (bool, optional): Stop at the first failed test case; the results of the test
+            cases after it have `skipped` set. A failed cached result skips every uncached test case.
+        on_result (callable, optional): Called as on_result(index, result), possibly from another
+            thread, as soon as the result of the test case at that index is known: immediately for
+            cached results, otherwise as the runs finish. Fail-fast runs may still replace a
+            reported result with a skipped one in the returned list.
+
+    Returns:
+        list: One CodeExecutionResult per test case, in the same order as test_cases.
+            If a newer submission superseded this one, every result has `superseded` set.
+    """
+    # Checked before the cache so that disabled languages and oversized code are always rejected
+    rejection = _check_submission(language, code)
+    if rejection:
+        return _report_results([rejection for _ in test_cases], on_result)
+
+    scheduling = {'user_id': user_id, 'priority': priority, 'challenge_id': challenge_id, 'fail_fast': fail_fast}
+    if not execution_result_cache.enabled:
+        return _run_test_cases_uncached(language, code, test_cases, setup_code=setup_code, on_result=on_result, **scheduling)
+
+    runtime_host_path = LANGUAGE_CONFIGS[language][0]
+    cache_keys = [
+        make_cache_key(language, runtime_host_path, code, setup_code, input_data, expected_output, EXECUTION_TIMEOUT_SECONDS)
+        for input_data, expected_output in test_cases
+    ]
+    results = [execution_result_cache.get(key) for key in cache_keys]
+    cached = [i for i, result in enumerate(results) if result is not None]
+    _report_results([results[i] for i in cached], on_result, indices=cached)
+
+    pending = [i for i, result in enumerate(results) if result is None]
+    if pending and fail_fast and any(result is not None and not result.success for result in results):
+        # The verdict is already decided by a cached failure
+        for i in pending:
+            results[i] = _skipped_result()
+        _report_results([results[i] for i in pending], on_result, indices=pending)
+        return _skip_after_first_failure(results)
+
+    if pending:
+        report_pending = (lambda j, result: on_result(pending[j], result)) if on_result else None
+        fresh_results = _run_test_cases_uncached(language, code, [test_cases[i] for i in pending], setup_code=setup_code, on_result=report_pending, **scheduling)
+        for i, result in zip(pending, fresh_results):
+            results[i] = result
+            if not result.superseded and not result.skipped:
+                execution_result_cache.put(cache_keys[i], result, challenge_id=challenge_id)
+    return _skip_after_first_failure(results) if fail_fast else results
+
 if __name__ == '__main__':
     print("--- Python Test ---")
     python_code = "print('Hello, Python!')"
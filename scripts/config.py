@@ -46,6 +46,92 @@ class Config:
     ENABLE_BASH = os.environ.get('ENABLE_BASH', 'True').lower() == 'true'
     ENABLE_DART = os.environ.get('ENABLE_DART', 'True').lower() == 'true'
 
+    # Code Execution Mode for multi test case submissions
+    # 'sequential' starts one sandbox per test case, 'batch' runs all test cases inside one sandbox launch
+    # 'parallel' starts one sandbox per test case and runs them concurrently
+    CODE_EXECUTION_MODE = os.environ.get('CODE_EXECUTION_MODE', 'sequential').lower()
+    # Maximum sandboxes a single submission runs at once in 'parallel' mode (defaults to the CPU count)
+    CODE_EXECUTION_MAX_PARALLEL = int(os.environ.get('CODE_EXECUTION_MAX_PARALLEL', os.cpu_count() or 1))
+    # Maximum sandboxes running at once across all submissions in this process (defaults to the CPU count)
+    CODE_EXECUTION_MAX_SANDBOXES = int(os.environ.get('CODE_EXECUTION_MAX_SANDBOXES', os.cpu_count() or 1))
+    # Stop running a submission's test cases once one has failed, reporting the rest as skipped
+    CODE_EXECUTION_FAIL_FAST = os.environ.get('CODE_EXECUTION_FAIL_FAST', 'False').lower() == 'true'
+    # With fail-fast, run the test cases that earlier submissions failed most often first
+    CODE_EXECUTION_ORDER_BY_FAILURE_RATE = os.environ.get('CODE_EXECUTION_ORDER_BY_FAILURE_RATE', 'False').lower() == 'true'
+    # Reject python3 code with syntax errors on the host, without starting a sandbox
+    SYNTAX_PRECHECK = os.environ.get('SYNTAX_PRECHECK', 'True').lower() == 'true'
+    # Check nodejs, php and bash code with a parse-only sandbox run before running several test cases
+    SYNTAX_PRECHECK_SANDBOXED = os.environ.get('SYNTAX_PRECHECK_SANDBOXED', 'False').lower() == 'true'
+
+    # Per-run sandbox resource limits (0 disables a limit)
+    SANDBOX_MEMORY_LIMIT_MB = int(os.environ.get('SANDBOX_MEMORY_LIMIT_MB', 256))
+    SANDBOX_CPU_TIME_LIMIT_SECONDS = int(os.environ.get('SANDBOX_CPU_TIME_LIMIT_SECONDS', 5))
+    SANDBOX_MAX_PROCESSES = int(os.environ.get('SANDBOX_MAX_PROCESSES', 256))
+    # Also apply SANDBOX_MAX_PROCESSES as RLIMIT_NPROC when there is no cgroup; it counts every process of the user
+    SANDBOX_NPROC_RLIMIT = os.environ.get('SANDBOX_NPROC_RLIMIT', 'False').lower() == 'true'
+    # Delegated cgroup v2 directory in which every run gets its own cgroup (optional)
+    SANDBOX_CGROUP_ROOT = os.environ.get('SANDBOX_CGROUP_ROOT')
+    # Directory with a prepared root filesystem per language (<dir>/<language>), see build_sandbox_rootfs.py (optional)
+    SANDBOX_ROOTFS_DIR = os.environ.get('SANDBOX_ROOTFS_DIR')
+    # How sandbox processes are started: 'bwrap', 'rlimit' (no isolation) or 'fake' (for load tests), see scripts/sandbox_backends.py
+    SANDBOX_BACKEND = os.environ.get('SANDBOX_BACKEND', 'bwrap').lower()
+    # Time every run takes with the 'fake' sandbox backend
+    SANDBOX_FAKE_LATENCY_MS = int(os.environ.get('SANDBOX_FAKE_LATENCY_MS', 50))
+
+    # Idle pre-sandboxed interpreters kept per language for python3 and nodejs (0 disables the warm pool)
+    WARM_POOL_SIZE = int(os.environ.get('WARM_POOL_SIZE', 0))
+
+    # Maximum number of cached test case results (0 disables the execution result cache)
+    EXECUTION_CACHE_SIZE = int(os.environ.get('EXECUTION_CACHE_SIZE', 1024))
+
+    # Maximum number of cached compiled artifacts for languages with a build step (0 disables the build cache)
+    BUILD_CACHE_SIZE = int(os.environ.get('BUILD_CACHE_SIZE', 256))
+    # Directory in which the build cache keeps its artifacts (defaults to the system temporary directory)
+    BUILD_CACHE_DIR = os.environ.get('BUILD_CACHE_DIR')
+
+    # Test case inputs and expected outputs of this size or more are stored as files instead of in the database (0 disables)
+    TEST_CASE_BLOB_THRESHOLD_BYTES = int(os.environ.get('TEST_CASE_BLOB_THRESHOLD_BYTES', 64 * 1024))
+    # Directory of the content-addressed test case files, shared with sandbox executors
+    TEST_CASE_BLOB_DIR = os.environ.get('TEST_CASE_BLOB_DIR', os.path.join(basedir, 'instance', 'test_case_blobs'))
+
+    # Sandbox executor service: comma-separated Unix socket paths or host:port addresses of executors
+    # started with `python -m scripts.executor_service` (empty runs sandboxes in the web process)
+    SANDBOX_EXECUTOR_ADDRESSES = os.environ.get('SANDBOX_EXECUTOR_ADDRESSES', '')
+    # Shared secret executors require from clients (required for executors listening on TCP)
+    SANDBOX_EXECUTOR_TOKEN = os.environ.get('SANDBOX_EXECUTOR_TOKEN')
+
+    # Code Execution Queue
+    # When enabled, coding submissions are queued and processed by a pool of sandbox workers
+    ENABLE_EXECUTION_QUEUE = os.environ.get('ENABLE_EXECUTION_QUEUE', 'False').lower() == 'true'
+    EXECUTION_QUEUE_WORKERS = int(os.environ.get('EXECUTION_QUEUE_WORKERS', 4))
+
+    # Fair-share scheduling of submissions, see scripts/execution_scheduler.py
+    # Submissions running at once in this process (0 disables the scheduler)
+    EXECUTION_MAX_CONCURRENT_SUBMISSIONS = int(os.environ.get('EXECUTION_MAX_CONCURRENT_SUBMISSIONS', CODE_EXECUTION_MAX_SANDBOXES))
+    # Submissions of a single user running at once
+    EXECUTION_USER_MAX_CONCURRENT = int(os.environ.get('EXECUTION_USER_MAX_CONCURRENT', 1))
+    # Share of the sandboxes given to reference solution verification while players are waiting
+    EXECUTION_LOW_PRIORITY_WEIGHT = float(os.environ.get('EXECUTION_LOW_PRIORITY_WEIGHT', 0.1))
+    # Challenges verified at once by bulk verification (0 uses CODE_EXECUTION_MAX_SANDBOXES), see scripts/solution_verification.py
+    VERIFICATION_MAX_PARALLEL = int(os.environ.get('VERIFICATION_MAX_PARALLEL', 0))
+
+    # Seconds after which the in-memory scoreboard is rebuilt from the database (0 never), see scripts/scoreboard_cache.py
+    SCOREBOARD_CACHE_MAX_AGE_SECONDS = int(os.environ.get('SCOREBOARD_CACHE_MAX_AGE_SECONDS', 60))
+    # Seconds after which the data version behind ETags and scoreboard deltas changes even without changes
+    # committed in this process (0 never), see scripts/data_version.py
+    DATA_VERSION_MAX_AGE_SECONDS = int(os.environ.get('DATA_VERSION_MAX_AGE_SECONDS', 60))
+    # Points per score history series sent to charts unless a client asks for ?points=N (0 sends every point),
+    # see chart_data_utils.lttb_indices
+    CHART_POINTS_PER_SERIES = int(os.environ.get('CHART_POINTS_PER_SERIES', 500))
+    # Embed the profile charts' time series in the compact encoding, see chart_data_utils.compact_series
+    COMPACT_CHART_DATA = os.environ.get('COMPACT_CHART_DATA', 'False').lower() == 'true'
+    # Live scoreboard connections, see scripts/scoreboard_events.py; each one holds a request thread for
+    # as long as it is open, so it is off (0) unless sized for the server's worker class and thread count
+    LIVE_SCOREBOARD_MAX_CLIENTS = int(os.environ.get('LIVE_SCOREBOARD_MAX_CLIENTS', 0))
+    # Events waiting to be sent to a single connection before it is told to re-fetch the scoreboard instead
+    LIVE_SCOREBOARD_CLIENT_BUFFER_BYTES = int(os.environ.get('LIVE_SCOREBOARD_CLIENT_BUFFER_BYTES', 64 * 1024))
+    LIVE_SCOREBOARD_KEEPALIVE_SECONDS = int(os.environ.get('LIVE_SCOREBOARD_KEEPALIVE_SECONDS', 15))
+
     # Switchboard Integration
     ENABLE_SWITCHBOARD = os.environ.get('ENABLE_SWITCHBOARD', 'False').lower() == 'true'
 
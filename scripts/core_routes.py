@@ -7,18 +7,22 @@ import os
 import json
 import mimetypes
 from datetime import datetime, UTC, timedelta
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, current_app, session, make_response, send_from_directory
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, current_app, session, make_response, send_from_directory, Response
 from flask_login import login_user, current_user, logout_user, login_required
 from sqlalchemy import func
 from sqlalchemy.orm import joinedload
 
 from scripts.extensions import db, login_manager, bcrypt, get_setting
-from scripts.models import User, Category, Challenge, Submission, ChallengeFlag, FlagSubmission, Award, AwardCategory, FlagAttempt, Hint, UserHint, ApiKey, ChallengeFile
+from scripts.models import User, Category, Challenge, Submission, ChallengeFlag, FlagSubmission, Award, AwardCategory, FlagAttempt, Hint, UserHint, ApiKey, ChallengeFile, CodeExecutionRecord
 from scripts.forms import RegistrationForm, LoginForm, FlagSubmissionForm, InlineGiveAwardForm, PasswordResetForm
 from scripts.theme_utils import get_active_theme
-from scripts.chart_data_utils import get_profile_points_over_time_data, get_profile_fails_vs_succeeds_data, get_profile_categories_per_score_data, get_profile_challenges_complete_data
+from scripts.chart_data_utils import requested_chart_points, requested_compact_encoding, compact_profile_charts_data, get_profile_points_over_time_data, get_profile_fails_vs_succeeds_data, get_profile_categories_per_score_data, get_profile_challenges_complete_data
 from scripts.utils import generate_usernames, make_datetime_timezone_aware
-from scripts.code_execution import execute_code_in_sandbox
+from scripts.code_execution import run_test_cases
+from scripts.scoreboard_cache import scoreboard_cache
+from scripts.scoreboard_events import scoreboard_events
+from scripts.data_version import data_version, conditional_response
+from scripts.execution_queue import execution_queue, register_job_handler, job_to_dict
 
 core_bp = Blueprint('core', __name__)
 
@@ -182,20 +186,20 @@ def user_profile(username):
         func.rank().over(order_by=User.score.desc()).label('rank')
     ).filter(User.hidden == False).subquery()
 
-    user_rank_data = db.session.query(ranked_users.c.rank)
+    user_rank_data = (db.session.query(ranked_users.c.rank)
                                .filter(ranked_users.c.id == target_user.id)
-                               .first()
+                               .first())
     user_rank = user_rank_data.rank if user_rank_data else None
 
-    user_submissions = Submission.query.filter_by(user_id=target_user.id)
+    user_submissions = (Submission.query.filter_by(user_id=target_user.id)
                                        .options(joinedload(Submission.challenge_rel).joinedload(Challenge.category))
                                        .order_by(Submission.timestamp.desc())
-                                       .all()
+                                       .all())
 
-    flag_attempts = FlagAttempt.query.filter_by(user_id=target_user.id)
+    flag_attempts = (FlagAttempt.query.filter_by(user_id=target_user.id)
                                    .options(joinedload(FlagAttempt.challenge).joinedload(Challenge.category))
                                    .order_by(FlagAttempt.timestamp.desc())
-                                   .all()
+                                   .all())
 
     give_award_form = None
     if current_user.is_admin:
@@ -231,6 +235,9 @@ def user_profile(username):
         target_user, Submission, UTC, timedelta, get_setting
     ))
 
+    if current_app.config.get('COMPACT_CHART_DATA', False):
+        profile_charts_data = compact_profile_charts_data(profile_charts_data)
+
     return render_template('profile.html', title=f"{target_user.username}'s Profile",
                            user=target_user, submissions=user_submissions, user_rank=user_rank,
                            give_award_form=give_award_form, flag_attempts=flag_attempts,
@@ -308,6 +315,62 @@ def download_challenge_file(file_id):
     directory = os.path.join(current_app.config['UPLOAD_FOLDER'], 'challenge_files')
     return send_from_directory(directory, file.storage_filename, as_attachment=True, download_name=file.filename)
 
+def _grade_coding_flag_submission(challenge, user, user_code):
+    """
+    Runs code submitted through the flag form for a coding challenge and records the attempt.
+
+    Returns:
+        dict: The JSON response payload for the submission.
+    """
+    execution_result = run_test_cases(
+        challenge.language,
+        user_code,
+        [(challenge.test_case_input, challenge.expected_output)],
+        setup_code=challenge.setup_code,
+        challenge_id=challenge.id,
+        user_id=user.id
+    )[0]
+    if execution_result.superseded:
+        # A newer submission of the user replaced this one while it was waiting for a sandbox
+        return {'success': False, 'superseded': True, 'message': execution_result.error_message}
+
+    new_flag_attempt = FlagAttempt(
+        user_id=user.id,
+        challenge_id=challenge.id,
+        submitted_flag=user_code,
+        is_correct=execution_result.success,
+        timestamp=datetime.now(UTC)
+    )
+    db.session.add(new_flag_attempt)
+    db.session.flush() # Assigns the attempt ID the usage record refers to
+    execution_record = CodeExecutionRecord.from_result(execution_result, user.id, challenge, flag_attempt_id=new_flag_attempt.id)
+    if execution_record:
+        db.session.add(execution_record)
+    db.session.commit()
+
+    if execution_result.success:
+        points_awarded = challenge.calculated_points
+        new_submission = Submission(user_id=user.id, challenge_id=challenge.id, timestamp=datetime.now(UTC), score_at_submission=user.score + points_awarded)
+        db.session.add(new_submission)
+        user.score += points_awarded
+        db.session.commit()
+        challenge.update_stripe_status()
+        return {'success': True, 'message': f'Coding challenge solved! You earned {points_awarded} points!', 'stdout': execution_result.stdout, 'stderr': execution_result.stderr}
+    else:
+        message = execution_result.error_message
+        if execution_result.is_timeout:
+            message = "Your code timed out. " + message
+        return {'success': False, 'message': f'Coding challenge failed: {message}', 'stdout': execution_result.stdout, 'stderr': execution_result.stderr}
+
+@register_job_handler('SUBMIT_FLAG')
+def _process_submit_flag_job(job):
+    """
+    Execution queue handler for code submitted through the flag submission form.
+    """
+    if Submission.query.filter_by(user_id=job.user_id, challenge_id=job.challenge_id).first():
+        return {'success': False, 'message': 'You have already solved this challenge!'}
+    return _grade_coding_flag_submission(job.challenge, job.user, job.code)
+
 @core_bp.route('/submit_flag/<int:challenge_id>', methods=['POST'])
 @login_required
 def submit_flag(challenge_id):
@@ -345,38 +408,14 @@ def submit_flag(challenge_id):
             is_safe, static_analysis_message = _static_code_analysis(challenge.language, user_code)
             if not is_safe:
                 return jsonify({'success': False, 'message': f'Security check failed: {static_analysis_message}'})
-            
-            execution_result = execute_code_in_sandbox(
-                challenge.language,
-                user_code,
-                challenge.expected_output,
-                challenge.setup_code,
-                challenge.test_case_input
-            )
 
-            new_flag_attempt = FlagAttempt(
-                user_id=current_user.id,
-                challenge_id=challenge.id,
-                submitted_flag=user_code,
-                is_correct=execution_result.success,
-                timestamp=datetime.now(UTC)
-            )
-            db.session.add(new_flag_attempt)
-            db.session.commit()
+            if execution_queue.enabled:
+                job = execution_queue.submit('SUBMIT_FLAG', current_user.id, challenge.id, user_code)
+                response_data = job_to_dict(job)
+                response_data.update({'success': True, 'message': 'Your code has been queued for execution.'})
+                return jsonify(response_data), 202
 
-            if execution_result.success:
-                points_awarded = challenge.calculated_points
-                new_submission = Submission(user_id=current_user.id, challenge_id=challenge.id, timestamp=datetime.now(UTC), score_at_submission=current_user.score + points_awarded)
-                db.session.add(new_submission)
-                current_user.score += points_awarded
-                db.session.commit()
-                challenge.update_stripe_status()
-                return jsonify({'success': True, 'message': f'Coding challenge solved! You earned {points_awarded} points!', 'stdout': execution_result.stdout, 'stderr': execution_result.stderr})
-            else:
-                message = execution_result.error_message
-                if execution_result.is_timeout:
-                    message = "Your code timed out. " + message
-                return jsonify({'success': False, 'message': f'Coding challenge failed: {message}', 'stdout': execution_result.stdout, 'stderr': execution_result.stderr})
+            return jsonify(_grade_coding_flag_submission(challenge, current_user, user_code))
 
         else:
             correct_flag_found = None
@@ -473,51 +512,53 @@ def reveal_hint(hint_id):
 def scoreboard_data():
     """
     Provides JSON data for the scoreboard.
+    Unchanged scoreboards are answered with 304 Not Modified, and with ?since=<version> (the
+    'version' of an earlier response) only the score history points added since are sent.
+    ?points=N sets the number of points per score history (default CHART_POINTS_PER_SERIES, 0 for all),
+    and ?format=compact sends the compact encoding (see ScoreboardCache.get_scoreboard).
     """
+    since = data_version.parse_token(request.args.get('since'))
     try:
-        top_x = int(get_setting('TOP_X_SCOREBOARD', '10'))
-
-        all_players_ranked_query = db.session.query(
-            User.username,
-            func.coalesce(func.sum(Challenge.points), 0).label('score'),
-            func.max(Submission.timestamp).label('last_submission')
-        ).outerjoin(Submission, User.id == Submission.user_id)
-         .outerjoin(Challenge, Submission.challenge_id == Challenge.id)
-         .filter(User.hidden == False)
-         .group_by(User.id, User.username)
-         .order_by(func.coalesce(func.sum(Challenge.points), 0).desc(), func.max(Submission.timestamp).asc())
-         .all()
-        
-        all_players_ranked = [{'username': user_data.username, 'score': user_data.score} for user_data in all_players_ranked_query]
-
-        top_users_query = User.query.filter_by(hidden=False).order_by(User.score.desc()).limit(top_x).all()
-        top_players_history = {}
-        
-        for user in top_users_query:
-            user_history_list = []
-            user_submissions = Submission.query.filter_by(user_id=user.id).order_by(Submission.timestamp.asc()).all()
-
-            if user_submissions:
-                initial_timestamp = user_submissions[0].timestamp - timedelta(microseconds=1)
-                user_history_list.append({'x': initial_timestamp.isoformat(), 'y': 0})
-            else:
-                user_history_list.append({'x': datetime.now(UTC).isoformat(), 'y': 0})
-
-            for submission in user_submissions:
-                user_history_list.append({'x': submission.timestamp.isoformat(), 'y': submission.score_at_submission})
-            
-            top_players_history[user.username] = user_history_list
-
-        graph_type = get_setting('SCOREBOARD_GRAPH_TYPE', 'line')
-
-        return jsonify({
-            'top_players_history': top_players_history,
-            'all_players_ranked': all_players_ranked,
-            'graph_type': graph_type
-        })
-    except Exception as e:
-        current_app.logger.error(f"Error fetching scoreboard data: {e}")
-        return jsonify({'error': 'Internal server error', 'message': str(e)}), 500
+        # Every player's score history is down-sampled to this many points, see chart_data_utils.lttb_indices
+        max_points = requested_chart_points()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    compact = requested_compact_encoding()
+    etag = f"scoreboard-{data_version.token()}-{since if since is not None else 'all'}-{max_points or 'all'}-{'compact' if compact else 'json'}"
+
+    def build_response():
+        try:
+            top_x = int(get_setting('TOP_X_SCOREBOARD', '10'))
+            # Ranked in memory and updated incrementally, see scripts/scoreboard_cache.py
+            response_data = scoreboard_cache.get_scoreboard(top_x, since=since, max_points=max_points, compact=compact)
+
+            response_data.update({
+                'graph_type': get_setting('SCOREBOARD_GRAPH_TYPE', 'line'),
+                'top_x': top_x,
+                # Scoreboards poll while the live stream is disabled
+                'live_updates': scoreboard_events.enabled and get_setting('ENABLE_LIVE_SCORE_GRAPH', 'True').lower() == 'true',
+                'version': data_version.token(response_data['version']) if response_data['version'] is not None else None
+            })
+            return jsonify(response_data)
+        except Exception as e:
+            current_app.logger.error(f"Error fetching scoreboard data: {e}")
+            return jsonify({'error': 'Internal server error', 'message': str(e)}), 500
+
+    return conditional_response(etag, build_response)
+
+@core_bp.route('/api/scoreboard_events')
+@login_required
+def scoreboard_events_stream():
+    """
+    Streams score changes to the scoreboard as Server-Sent Events, see scripts/scoreboard_events.py.
+    """
+    if not scoreboard_events.enabled or get_setting('ENABLE_LIVE_SCORE_GRAPH', 'True').lower() != 'true':
+        return jsonify({'message': 'The live scoreboard is disabled.'}), 404
+    subscription = scoreboard_events.subscribe()
+    if subscription is None:
+        return jsonify({'message': 'Too many live scoreboard connections.'}), 503
+    # Proxies must not buffer the stream, or the events would be delayed
+    return Response(scoreboard_events.stream(subscription), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @core_bp.route('/api/challenge/<int:challenge_id>/solvers')
 @login_required
@@ -0,0 +1,143 @@
+"""
+This module keeps the global data version, a counter bumped whenever a transaction changing scores
+or challenges commits: solves, awards, hint reveals and admin edits of challenges, categories,
+users or settings. Polled endpoints derive their ETag from it, so unchanged polls are answered
+with 304 Not Modified without building the response, and the scoreboard tags score history points
+with the version that added them, so that clients can ask for the points added since the version
+they have (see scoreboard_data).
+
+Versions are only comparable within a process: they are handed out as "<epoch>.<counter>", with an
+epoch chosen at start-up. Only commits made in this process are seen, so the version is also
+bumped every DATA_VERSION_MAX_AGE_SECONDS; with several application processes this bounds how long
+a poll can be told that nothing changed after another process committed a change.
+"""
+import secrets
+import threading
+import time
+
+from flask import request, make_response
+from sqlalchemy import event, inspect
+
+# Key of the flag set in session.info when the transaction changed versioned data
+_DATA_CHANGED = 'data_version_changed'
+
+# Models whose rows never appear in versioned responses
+_UNVERSIONED_MODELS = {'ApiKey', 'CodeExecutionJob', 'CodeExecutionRecord', 'FlagAttempt'}
+# User columns that do not appear in versioned responses
+_UNVERSIONED_USER_ATTRIBUTES = {'email', 'password_hash', 'password_reset_required', 'last_seen'}
+
+def _is_versioned(obj):
+    model = type(obj).__name__
+    if model in _UNVERSIONED_MODELS:
+        return False
+    if model == 'User':
+        state = inspect(obj)
+        if not (state.pending or state.deleted or state.was_deleted):
+            return any(attr.history.has_changes() for attr in state.attrs if attr.key not in _UNVERSIONED_USER_ATTRIBUTES)
+    return True
+
+class DataVersion:
+    """
+    The global data version, see the module documentation.
+    """
+    def __init__(self):
+        self.epoch = secrets.token_hex(4)
+        self._counter = 0
+        self._bumped_at = time.monotonic()
+        self._max_age_seconds = 0
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        """
+        Reads DATA_VERSION_MAX_AGE_SECONDS (0 only bumps the version on changes) and starts
+        listening to the session's events.
+        """
+        app.extensions['data_version'] = self
+        self._max_age_seconds = max(0, int(app.config.get('DATA_VERSION_MAX_AGE_SECONDS', 60)))
+        self.bump()
+        if not self._listening:
+            from scripts.extensions import db
+            event.listen(db.session, 'after_flush', self._collect_changes)
+            event.listen(db.session, 'do_orm_execute', self._collect_bulk_changes)
+            event.listen(db.session, 'after_commit', self._apply_changes)
+            event.listen(db.session, 'after_rollback', self._discard_changes)
+            self._listening = True
+
+    @property
+    def current(self):
+        """
+        The current version number.
+        """
+        with self._lock:
+            if self._max_age_seconds and time.monotonic() - self._bumped_at >= self._max_age_seconds:
+                self._bump()
+            return self._counter
+
+    def _bump(self):
+        self._counter += 1
+        self._bumped_at = time.monotonic()
+        return self._counter
+
+    def bump(self):
+        """
+        Moves to a new version and returns its number.
+        """
+        with self._lock:
+            return self._bump()
+
+    def token(self, version=None):
+        """
+        Returns a version as handed out to clients.
+        """
+        return f"{self.epoch}.{self.current if version is None else version}"
+
+    def parse_token(self, token):
+        """
+        Returns the version number of a token handed out by this process, or None.
+        """
+        epoch, _, counter = (token or '').partition('.')
+        if epoch != self.epoch or not counter.isdigit():
+            return None
+        return int(counter)
+
+    def _collect_changes(self, session, flush_context):
+        if any(_is_versioned(obj) for obj in (*session.new, *session.dirty, *session.deleted)):
+            session.info[_DATA_CHANGED] = True
+
+    def _collect_bulk_changes(self, orm_execute_state):
+        if orm_execute_state.is_update or orm_execute_state.is_delete:
+            mapper = orm_execute_state.bind_mapper
+            if mapper is None or mapper.class_.__name__ not in _UNVERSIONED_MODELS:
+                orm_execute_state.session.info[_DATA_CHANGED] = True
+
+    def _apply_changes(self, session):
+        if session.info.pop(_DATA_CHANGED, False):
+            self.bump()
+
+    def _discard_changes(self, session):
+        # A rolled back savepoint may belong to a transaction that still commits
+        if session.info.pop(_DATA_CHANGED, False):
+            self.bump()
+
+def conditional_response(etag, build_response):
+    """
+    Answers with 304 Not Modified if the client already has the response tagged etag, and
+    builds the response otherwise. Must be called within a request.
+
+    Args:
+        etag (str): Identifies the response; include data_version.token() and whatever else it depends on.
+        build_response (callable): Returns the response (anything a view may return).
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(build_response())
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag, weak=True)
+    # Browsers keep the response but revalidate it on every request
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+data_version = DataVersion()
@@ -0,0 +1,144 @@
+"""
+This module provides a content-addressed cache for code execution results.
+
+Players often resubmit identical code and administrators re-verify reference solutions,
+so results are stored under a hash of everything that determines the outcome of a run:
+language, code, setup code, test input, expected output and the runtime version.
+Entries are evicted least-recently-used and can be dropped per challenge when its
+test cases or setup code change.
+"""
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Error messages produced by infrastructure failures rather than by the submitted code
+_INFRASTRUCTURE_ERROR_PREFIXES = ("bwrap or runtime not found", "An unexpected error occurred")
+
+def _runtime_version(runtime_path):
+    """
+    Identifies the installed runtime binary, so that upgrading it invalidates earlier results.
+    """
+    try:
+        stat = os.stat(os.path.realpath(runtime_path))
+        return f"{os.path.realpath(runtime_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        return runtime_path
+
+def _test_case_data_key(data):
+    # Test case data kept in the blob store is identified by its digest instead of being read
+    digest = getattr(data, 'digest', None)
+    return ['blob', digest] if digest else (data or "")
+
+def make_cache_key(language, runtime_path, code, setup_code, input_data, expected_output, timeout_seconds):
+    """
+    Returns the SHA-256 key identifying a single test case run.
+    """
+    payload = json.dumps(
+        [language, _runtime_version(runtime_path), code, setup_code or "", _test_case_data_key(input_data), _test_case_data_key(expected_output), timeout_seconds],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def is_infrastructure_error(result):
+    """
+    Whether a result reports a failure of the sandbox or executors rather than a verdict on the code.
+    """
+    return result.error_message.startswith(_INFRASTRUCTURE_ERROR_PREFIXES)
+
+def is_cacheable(result):
+    """
+    Only deterministic verdicts are cached; timeouts and sandbox failures may not repeat.
+    """
+    return not result.is_timeout and not is_infrastructure_error(result)
+
+class ExecutionResultCache:
+    """
+    A bounded, thread-safe LRU cache of CodeExecutionResult objects.
+    """
+    def __init__(self, max_entries=1024):
+        self._max_entries = max_entries
+        self._entries = OrderedDict() # key -> (result, set of challenge IDs)
+        self._keys_by_challenge = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """
+        Sizes the cache from EXECUTION_CACHE_SIZE (0 disables caching).
+        """
+        app.extensions['execution_result_cache'] = self
+        with self._lock:
+            self._max_entries = max(0, int(app.config.get('EXECUTION_CACHE_SIZE', 1024)))
+            self._clear()
+
+    @property
+    def enabled(self):
+        return self._max_entries > 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Marked as cached so that callers do not account the original run's resource usage twice
+        result = copy.copy(entry[0])
+        result.cached = True
+        return result
+
+    def put(self, key, result, challenge_id=None):
+        if not self.enabled or not is_cacheable(result):
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                challenge_ids = self._entries[key][1]
+            else:
+                challenge_ids = set()
+            self._entries[key] = (result, challenge_ids)
+            if challenge_id is not None:
+                challenge_ids.add(challenge_id)
+                self._keys_by_challenge.setdefault(challenge_id, set()).add(key)
+
+            while len(self._entries) > self._max_entries:
+                evicted_key, (_, evicted_challenge_ids) = self._entries.popitem(last=False)
+                self._unindex(evicted_key, evicted_challenge_ids)
+
+    def invalidate_challenge(self, challenge_id):
+        """
+        Drops every cached result recorded for the given challenge.
+        """
+        with self._lock:
+            for key in self._keys_by_challenge.pop(challenge_id, set()):
+                entry = self._entries.pop(key, None)
+                if entry:
+                    self._unindex(key, entry[1] - {challenge_id})
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._keys_by_challenge.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _unindex(self, key, challenge_ids):
+        for challenge_id in challenge_ids:
+            keys = self._keys_by_challenge.get(challenge_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_challenge[challenge_id]
+
+    def __len__(self):
+        return len(self._entries)
+
+execution_result_cache = ExecutionResultCache()
@@ -0,0 +1,272 @@
+"""
+This module provides the asynchronous execution queue for coding challenge submissions.
+
+Submissions are persisted as `CodeExecutionJob` rows and handed to a pool of sandbox
+worker threads, so web workers can return a job ID immediately instead of blocking
+on `execute_code_in_sandbox`. Clients poll the job until its verdict is available.
+
+Jobs reach the workers in the order chosen by the fair-share scheduler
+(scripts/execution_scheduler.py), and a new job supersedes the same user's still-queued
+job for the same challenge.
+"""
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, UTC
+
+from flask import url_for
+
+from scripts.execution_scheduler import execution_scheduler
+from scripts.extensions import db
+from scripts.utils import make_datetime_timezone_aware
+
+# Maps a job kind (e.g. 'SUBMIT_CODE') to the function that processes it.
+# Handlers receive the CodeExecutionJob and return the JSON-serialisable result payload.
+_job_handlers = {}
+
+# Number of recent jobs kept for the wait/run time statistics
+_STATS_WINDOW = 500
+
+SUPERSEDED_JOB_RESULT = {'success': False, 'superseded': True, 'message': 'Superseded by a newer submission for this challenge.'}
+
+def register_job_handler(kind):
+    """
+    Decorator registering the function that processes jobs of the given kind.
+    """
+    def decorator(f):
+        _job_handlers[kind] = f
+        return f
+    return decorator
+
+def job_to_dict(job):
+    """
+    Serialises a CodeExecutionJob for API responses and the polling endpoint.
+    """
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('api.get_code_job', job_id=job.id),
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'result': job.result
+    }
+
+def _percentile(values, percentile):
+    """
+    Returns the given percentile (0-100) of a list of numbers, or 0.0 if it is empty.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round((percentile / 100.0) * (len(ordered) - 1))))
+    return ordered[index]
+
+class ExecutionQueue:
+    """
+    A durable job queue backed by the database and processed by a pool of worker threads.
+    """
+    def __init__(self):
+        self._app = None
+        self._queue = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._started_at = None
+        self._busy_workers = 0
+        self._busy_seconds = 0.0
+        self._jobs_completed = 0
+        self._jobs_failed = 0
+        self._jobs_superseded = 0
+        self._wait_times = deque(maxlen=_STATS_WINDOW)
+        self._run_times = deque(maxlen=_STATS_WINDOW)
+
+    def init_app(self, app):
+        """
+        Binds the queue to the application and resumes any jobs left over from a previous run.
+        """
+        self._app = app
+        app.extensions['execution_queue'] = self
+        if not app.config.get('ENABLE_EXECUTION_QUEUE', False):
+            return
+
+        from scripts.models import CodeExecutionJob
+        with app.app_context():
+            # Jobs that were running when the process stopped never produced a verdict
+            CodeExecutionJob.query.filter_by(status='RUNNING').update({'status': 'QUEUED', 'started_at': None})
+            db.session.commit()
+            pending_jobs = (db.session.query(CodeExecutionJob.id, CodeExecutionJob.user_id, CodeExecutionJob.challenge_id)
+                            .filter_by(status='QUEUED')
+                            .order_by(CodeExecutionJob.created_at.asc())
+                            .all())
+            pending_jobs = [(job_id, user_id, challenge_id, self._job_cost(challenge_id))
+                            for job_id, user_id, challenge_id in pending_jobs]
+
+        if pending_jobs:
+            app.logger.info(f"Resuming {len(pending_jobs)} queued code execution job(s).")
+            self.start()
+            for job_id, user_id, challenge_id, cost in pending_jobs:
+                self._schedule(job_id, user_id, challenge_id, cost)
+
+    @property
+    def enabled(self):
+        return self._app is not None and self._app.config.get('ENABLE_EXECUTION_QUEUE', False)
+
+    @property
+    def worker_count(self):
+        return len(self._workers)
+
+    def start(self):
+        """
+        Starts the worker threads if they are not already running.
+        """
+        with self._lock:
+            if self._workers:
+                return
+            self._started_at = time.monotonic()
+            worker_count = max(1, int(self._app.config.get('EXECUTION_QUEUE_WORKERS', 4)))
+            for i in range(worker_count):
+                worker = threading.Thread(target=self._worker_loop, name=f"execution-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    @staticmethod
+    def _job_cost(challenge_id):
+        """
+        Returns the scheduling cost of a job: the number of test cases it will run.
+        """
+        from scripts.models import TestCase
+        return TestCase.query.filter_by(challenge_id=challenge_id).count() or 1
+
+    def _schedule(self, job_id, user_id, challenge_id, cost):
+        """
+        Hands a job to the scheduler, which puts it on the worker queue once it may run.
+
+        Returns:
+            list: The scheduler tickets the job superseded.
+        """
+        _, superseded = execution_scheduler.submit(
+            user_id, cost=cost, supersede_key=(user_id, challenge_id),
+            on_dispatch=lambda ticket: self._queue.put((job_id, ticket))
+        )
+        return superseded
+
+    def submit(self, kind, user_id, challenge_id, code):
+        """
+        Persists a new job and queues it for execution, superseding the user's jobs for the same
+        challenge that are still queued.
+
+        Returns:
+            CodeExecutionJob: The newly created job.
+        """
+        from scripts.models import CodeExecutionJob
+        if kind not in _job_handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+
+        job = CodeExecutionJob(kind=kind, user_id=user_id, challenge_id=challenge_id, code=code, status='QUEUED')
+        db.session.add(job)
+        db.session.flush()
+        # Jobs already handed to a worker lose the claim in _run_job, so no verdict is ever lost
+        superseded_count = CodeExecutionJob.query.filter(
+            CodeExecutionJob.user_id == user_id,
+            CodeExecutionJob.challenge_id == challenge_id,
+            CodeExecutionJob.status == 'QUEUED',
+            CodeExecutionJob.id != job.id
+        ).update(
+            {'status': 'SUPERSEDED', 'result': SUPERSEDED_JOB_RESULT, 'finished_at': datetime.now(UTC)},
+            synchronize_session=False
+        )
+        db.session.commit()
+        if superseded_count:
+            with self._lock:
+                self._jobs_superseded += superseded_count
+
+        self.start()
+        self._schedule(job.id, user_id, challenge_id, self._job_cost(challenge_id))
+        return job
+
+    def _worker_loop(self):
+        while True:
+            job_id, ticket = self._queue.get()
+            try:
+                with self._app.app_context(), execution_scheduler.running(ticket):
+                    self._run_job(job_id)
+            except Exception as e:
+                self._app.logger.exception(f"Execution worker crashed while processing job {job_id}: {e}")
+            finally:
+                # Released before task_done, so the next dispatched job is queued before join() can return
+                execution_scheduler.release(ticket)
+                self._queue.task_done()
+
+    def _run_job(self, job_id):
+        from scripts.models import CodeExecutionJob
+
+        # Claim the job atomically so that several processes sharing the database never run it twice
+        claimed = CodeExecutionJob.query.filter_by(id=job_id, status='QUEUED').update(
+            {'status': 'RUNNING', 'started_at': datetime.now(UTC)}
+        )
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(CodeExecutionJob, job_id)
+        wait_seconds = (make_datetime_timezone_aware(job.started_at) - make_datetime_timezone_aware(job.created_at)).total_seconds()
+
+        with self._lock:
+            self._busy_workers += 1
+            self._wait_times.append(wait_seconds)
+        run_started = time.monotonic()
+
+        try:
+            result = _job_handlers[job.kind](job)
+            job.result = result
+            job.status = 'DONE'
+        except Exception as e:
+            db.session.rollback()
+            self._app.logger.exception(f"Code execution job {job_id} failed: {e}")
+            job = db.session.get(CodeExecutionJob, job_id)
+            job.result = {'success': False, 'message': f'An unexpected error occurred while processing your submission: {e}'}
+            job.status = 'FAILED'
+        finally:
+            run_seconds = time.monotonic() - run_started
+            with self._lock:
+                self._busy_workers -= 1
+                self._busy_seconds += run_seconds
+                self._run_times.append(run_seconds)
+                if job.status == 'DONE':
+                    self._jobs_completed += 1
+                else:
+                    self._jobs_failed += 1
+
+        job.finished_at = datetime.now(UTC)
+        db.session.commit()
+
+    def get_stats(self):
+        """
+        Returns queue depth, wait time and worker utilisation figures for sizing the worker pool.
+        """
+        with self._lock:
+            worker_count = len(self._workers)
+            uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+            capacity_seconds = uptime * worker_count
+            wait_times = list(self._wait_times)
+            run_times = list(self._run_times)
+            # Jobs wait in the scheduler until they may run, and only then reach the worker queue
+            queue_depth = self._queue.qsize() + execution_scheduler.waiting_dispatch_count()
+            return {
+                'enabled': self.enabled,
+                'workers': worker_count,
+                'busy_workers': self._busy_workers,
+                'queue_depth': queue_depth,
+                'jobs_completed': self._jobs_completed,
+                'jobs_failed': self._jobs_failed,
+                'jobs_superseded': self._jobs_superseded,
+                'utilisation': round(self._busy_seconds / capacity_seconds, 4) if capacity_seconds else 0.0,
+                'wait_seconds_avg': round(sum(wait_times) / len(wait_times), 4) if wait_times else 0.0,
+                'wait_seconds_p95': round(_percentile(wait_times, 95), 4),
+                'run_seconds_avg': round(sum(run_times) / len(run_times), 4) if run_times else 0.0,
+                'run_seconds_p95': round(_percentile(run_times, 95), 4),
+                'scheduler': execution_scheduler.get_stats(),
+            }
+
+execution_queue = ExecutionQueue()
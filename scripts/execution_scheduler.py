@@ -0,0 +1,237 @@
+"""
+This module provides the fair-share scheduler admitting coding submissions to the sandboxes.
+
+Every uncached run of a submission's test cases, whether it runs in the web request or in an
+execution queue worker, first obtains a ticket from `execution_scheduler`:
+
+- At most EXECUTION_MAX_CONCURRENT_SUBMISSIONS tickets run at once in this process, and at most
+  EXECUTION_USER_MAX_CONCURRENT of them belong to the same user.
+- Waiting tickets are dispatched by weighted fair queueing between flows, one flow per user and
+  priority class: every ticket gets a virtual finish time from its flow's weight and its cost
+  (the number of test cases), and the earliest one runs next. A user submitting in a tight loop
+  therefore only delays their own submissions.
+- Reference solution verification runs in the low-priority class, whose flow has the weight
+  EXECUTION_LOW_PRIORITY_WEIGHT: it yields to players under load but is never starved.
+- A new submission from a user supersedes their still-waiting earlier submission to the same
+  challenge, which is answered without running.
+"""
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+PRIORITY_NORMAL = 'normal'
+PRIORITY_LOW = 'low'
+
+# Ticket states
+WAITING = 'waiting'
+RUNNING = 'running'
+SUPERSEDED = 'superseded'
+DONE = 'done'
+
+class SchedulerTicket:
+    """
+    A submission waiting for or holding one of the scheduler's slots.
+    """
+    def __init__(self, user_id, cost, priority, supersede_key, on_dispatch, sequence):
+        self.user_id = user_id
+        self.cost = cost
+        self.priority = priority
+        self.supersede_key = supersede_key
+        self.on_dispatch = on_dispatch
+        self.sequence = sequence
+        self.start_tag = 0.0
+        self.finish_tag = 0.0
+        self.state = WAITING
+        self.event = threading.Event()
+
+    @property
+    def flow(self):
+        return (self.user_id, self.priority)
+
+    @property
+    def superseded(self):
+        return self.state == SUPERSEDED
+
+class FairShareScheduler:
+    """
+    Admits submissions to sandbox execution in a fair order, see the module documentation.
+    """
+    def __init__(self):
+        self._capacity = 0
+        self._user_limit = 1
+        self._weights = {PRIORITY_NORMAL: 1.0, PRIORITY_LOW: 0.1}
+        self._waiting = {} # flow -> deque of waiting tickets, in submission order
+        self._finish_tags = {} # flow -> finish tag of the flow's last submitted ticket
+        self._running_by_user = {}
+        self._running = 0
+        self._virtual_time = 0.0
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._dispatched = 0
+        self._superseded = 0
+
+    def init_app(self, app):
+        """
+        Reads EXECUTION_MAX_CONCURRENT_SUBMISSIONS (0 disables the scheduler, including the per-user limit),
+        EXECUTION_USER_MAX_CONCURRENT and EXECUTION_LOW_PRIORITY_WEIGHT.
+        """
+        app.extensions['execution_scheduler'] = self
+        capacity = app.config.get('EXECUTION_MAX_CONCURRENT_SUBMISSIONS')
+        if capacity is None:
+            capacity = app.config.get('CODE_EXECUTION_MAX_SANDBOXES') or 1
+        with self._lock:
+            self._capacity = max(0, int(capacity))
+            self._user_limit = max(1, int(app.config.get('EXECUTION_USER_MAX_CONCURRENT', 1)))
+            self._weights[PRIORITY_LOW] = max(0.001, float(app.config.get('EXECUTION_LOW_PRIORITY_WEIGHT', 0.1)))
+        self._dispatch()
+
+    @property
+    def enabled(self):
+        return self._capacity > 0
+
+    def submit(self, user_id, cost=1, priority=PRIORITY_NORMAL, supersede_key=None, on_dispatch=None):
+        """
+        Queues a ticket. `on_dispatch(ticket)` is called (under no lock) once it may run; the
+        ticket must then be released with `release()`.
+
+        Returns:
+            tuple: (ticket, superseded) where superseded lists the waiting tickets with the same
+                supersede_key that the new ticket replaces.
+        """
+        ticket = SchedulerTicket(user_id, max(1, int(cost)), priority, supersede_key, on_dispatch, next(self._sequence))
+        superseded = []
+        with self._lock:
+            if supersede_key is not None:
+                for waiting in self._waiting.values():
+                    for earlier in [t for t in waiting if t.supersede_key == supersede_key]:
+                        waiting.remove(earlier)
+                        earlier.state = SUPERSEDED
+                        superseded.append(earlier)
+                self._superseded += len(superseded)
+
+            # A flow that was idle starts at the current virtual time, a busy one after its last ticket
+            ticket.start_tag = max(self._virtual_time, self._finish_tags.get(ticket.flow, 0.0))
+            ticket.finish_tag = ticket.start_tag + ticket.cost / self._weights[priority]
+            self._finish_tags[ticket.flow] = ticket.finish_tag
+            self._waiting.setdefault(ticket.flow, deque()).append(ticket)
+
+        for earlier in superseded:
+            earlier.event.set()
+        self._dispatch()
+        return ticket, superseded
+
+    def release(self, ticket):
+        """
+        Frees the slot of a running ticket, or withdraws a waiting one.
+        """
+        with self._lock:
+            if ticket.state == RUNNING:
+                self._running -= 1
+                self._running_by_user[ticket.user_id] -= 1
+                if not self._running_by_user[ticket.user_id]:
+                    del self._running_by_user[ticket.user_id]
+            elif ticket.state == WAITING:
+                waiting = self._waiting.get(ticket.flow)
+                if waiting and ticket in waiting:
+                    waiting.remove(ticket)
+            ticket.state = DONE
+        self._dispatch()
+
+    def _next_ticket(self):
+        """
+        Returns the waiting ticket with the earliest finish tag among flows whose user may run
+        another submission, or None. Must be called with the lock held.
+        A disabled scheduler does not limit the submissions of a user either.
+        """
+        best = None
+        for flow, waiting in list(self._waiting.items()):
+            if not waiting:
+                del self._waiting[flow]
+                continue
+            candidate = waiting[0]
+            if self.enabled and self._running_by_user.get(candidate.user_id, 0) >= self._user_limit:
+                continue
+            if best is None or (candidate.finish_tag, candidate.sequence) < (best.finish_tag, best.sequence):
+                best = candidate
+        return best
+
+    def _dispatch(self):
+        dispatched = []
+        with self._lock:
+            while not self.enabled or self._running < self._capacity:
+                ticket = self._next_ticket()
+                if ticket is None:
+                    break
+                self._waiting[ticket.flow].popleft()
+                ticket.state = RUNNING
+                self._running += 1
+                self._running_by_user[ticket.user_id] = self._running_by_user.get(ticket.user_id, 0) + 1
+                self._virtual_time = max(self._virtual_time, ticket.start_tag)
+                self._dispatched += 1
+                dispatched.append(ticket)
+            if not any(self._waiting.values()):
+                # Nothing is waiting, so no flow can be behind: forget the tags of idle flows
+                self._finish_tags.clear()
+        for ticket in dispatched:
+            ticket.event.set()
+            if ticket.on_dispatch:
+                ticket.on_dispatch(ticket)
+
+    @contextmanager
+    def running(self, ticket):
+        """
+        Marks a dispatched ticket as the one the current thread runs under, so that nested
+        `admit()` calls (e.g. from an execution queue job) do not queue a second time.
+        """
+        previous = getattr(self._local, 'ticket', None)
+        self._local.ticket = ticket
+        try:
+            yield ticket
+        finally:
+            self._local.ticket = previous
+
+    @contextmanager
+    def admit(self, user_id, cost=1, priority=PRIORITY_NORMAL, supersede_key=None):
+        """
+        Blocks until the submission may run, then yields its ticket and releases it on exit.
+        Check `ticket.superseded` first: a superseded submission must not be run.
+        Yields None if the scheduler is disabled or the thread already runs under a ticket.
+        """
+        if not self.enabled or getattr(self._local, 'ticket', None) is not None:
+            yield None
+            return
+
+        ticket, _ = self.submit(user_id, cost=cost, priority=priority, supersede_key=supersede_key)
+        try:
+            ticket.event.wait()
+            with self.running(ticket):
+                yield ticket
+        finally:
+            self.release(ticket)
+
+    def waiting_dispatch_count(self):
+        """
+        Returns the number of waiting tickets that are handed over by their on_dispatch callback,
+        i.e. execution queue jobs, as opposed to submissions blocked in admit().
+        """
+        with self._lock:
+            return sum(1 for queue in self._waiting.values() for ticket in queue if ticket.on_dispatch)
+
+    def get_stats(self):
+        with self._lock:
+            waiting = [ticket for queue in self._waiting.values() for ticket in queue]
+            return {
+                'enabled': self.enabled,
+                'capacity': self._capacity,
+                'user_limit': self._user_limit,
+                'running': self._running,
+                'waiting': len(waiting),
+                'waiting_low_priority': sum(1 for ticket in waiting if ticket.priority == PRIORITY_LOW),
+                'waiting_users': len({ticket.user_id for ticket in waiting}),
+                'dispatched': self._dispatched,
+                'superseded': self._superseded,
+            }
+
+execution_scheduler = FairShareScheduler()
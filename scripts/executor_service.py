@@ -0,0 +1,350 @@
+"""
+This module lets sandbox execution run in dedicated executor processes instead of the web workers.
+
+An executor is a small daemon holding no database connection: it accepts newline-delimited JSON
+requests on a Unix or TCP socket, runs the test cases in its own sandboxes (with its own warm
+interpreter pool, build cache and sandbox cap) and answers with the results. The web application
+talks to one or more executors through `sandbox_executor`, configured by SANDBOX_EXECUTOR_ADDRESSES;
+without addresses it runs everything in-process as before. Executors can live on other machines,
+so execution capacity scales independently of the web workers.
+
+Start an executor with:
+    python -m scripts.executor_service --listen /run/windflag/executor.sock
+    SANDBOX_EXECUTOR_TOKEN=<secret> python -m scripts.executor_service --listen 10.0.0.5:7000
+
+An executor runs any code it is sent, so it only listens on TCP when SANDBOX_EXECUTOR_TOKEN is
+set; a Unix socket is protected by its file permissions and may be used without a token.
+"""
+import argparse
+import hmac
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+
+# Seconds an executor that could not be reached is skipped before it is tried again
+_UNAVAILABLE_RETRY_SECONDS = 10
+
+# Time allowed on top of the sandbox time limits, e.g. for waiting on the executor's sandbox slots
+_RESPONSE_GRACE_SECONDS = 60
+
+def result_to_dict(result):
+    """
+    Serialises a CodeExecutionResult for the wire.
+    """
+    return {
+        'success': result.success,
+        'stdout': result.stdout,
+        'stderr': result.stderr,
+        'error_message': result.error_message,
+        'is_timeout': result.is_timeout,
+        'cpu_time_seconds': result.cpu_time_seconds,
+        'peak_memory_kb': result.peak_memory_kb,
+        'wall_time_seconds': result.wall_time_seconds,
+        'skipped': result.skipped,
+    }
+
+def result_from_dict(data):
+    from scripts.code_execution import CodeExecutionResult
+    result = CodeExecutionResult(data['success'], data['stdout'], data['stderr'], data['error_message'], is_timeout=data['is_timeout'])
+    result.cpu_time_seconds = data.get('cpu_time_seconds')
+    result.peak_memory_kb = data.get('peak_memory_kb')
+    result.wall_time_seconds = data.get('wall_time_seconds')
+    result.skipped = data.get('skipped', False)
+    return result
+
+def test_case_data_to_wire(data):
+    """
+    Serialises test case data: blobs are sent by digest, so executors must share TEST_CASE_BLOB_DIR.
+    """
+    from scripts.test_case_blobs import TestCaseBlob
+    return {'blob': data.digest} if isinstance(data, TestCaseBlob) else data
+
+def test_case_data_from_wire(data):
+    """
+    Deserialises test case data; blob digests are validated by the store, so a client can only
+    refer to files inside TEST_CASE_BLOB_DIR.
+    """
+    from scripts.test_case_blobs import test_case_blob_store
+    return test_case_blob_store.get(data['blob']) if isinstance(data, dict) else data
+
+def parse_address(address):
+    """
+    Returns (socket family, address) for a Unix socket path or a host:port string.
+    """
+    address = address.strip()
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+    if '/' in address:
+        return socket.AF_UNIX, address
+    host, _, port = address.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+def _response_timeout(test_case_count):
+    from scripts.code_execution import EXECUTION_TIMEOUT_SECONDS, BUILD_TIMEOUT_SECONDS
+    return test_case_count * (EXECUTION_TIMEOUT_SECONDS + 2) + BUILD_TIMEOUT_SECONDS + _RESPONSE_GRACE_SECONDS
+
+class ExecutorUnavailable(Exception):
+    """
+    Raised when no executor could be reached.
+    """
+
+class SandboxExecutorClient:
+    """
+    Runs test cases in-process, or on the executors listed in SANDBOX_EXECUTOR_ADDRESSES.
+
+    Requests go to the executor with the fewest requests in flight from this process; an executor
+    that cannot be reached is skipped for a few seconds and its requests are retried on the others.
+    """
+    def __init__(self):
+        self._addresses = []
+        self._token = None
+        self._in_flight = {}
+        self._unavailable_until = {}
+        self._next_index = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Reads SANDBOX_EXECUTOR_ADDRESSES (comma-separated) and SANDBOX_EXECUTOR_TOKEN.
+        """
+        app.extensions['sandbox_executor'] = self
+        addresses = app.config.get('SANDBOX_EXECUTOR_ADDRESSES') or ''
+        with self._lock:
+            self._addresses = [address.strip() for address in addresses.split(',') if address.strip()]
+            self._token = app.config.get('SANDBOX_EXECUTOR_TOKEN')
+            self._in_flight = {address: 0 for address in self._addresses}
+            self._unavailable_until = {}
+
+    @property
+    def remote(self):
+        return bool(self._addresses)
+
+    def run_test_cases(self, language, code, test_cases, setup_code=None, fail_fast=False, on_result=None):
+        """
+        Runs test cases without the result cache, either here or on an executor.
+        See execute_test_cases for fail_fast and on_result; executors report all results at once.
+
+        Returns:
+            list: One CodeExecutionResult per test case, in the same order as test_cases.
+        """
+        if not self._addresses:
+            from scripts.code_execution import execute_test_cases
+            return execute_test_cases(language, code, test_cases, setup_code=setup_code, fail_fast=fail_fast, on_result=on_result)
+
+        request_data = {
+            'op': 'run_test_cases',
+            'token': self._token,
+            'language': language,
+            'code': code,
+            'test_cases': [[test_case_data_to_wire(input_data), test_case_data_to_wire(expected_output)] for input_data, expected_output in test_cases],
+            'setup_code': setup_code,
+            'fail_fast': fail_fast,
+        }
+        from scripts.code_execution import CodeExecutionResult, _report_results
+        try:
+            response = self._request(request_data, _response_timeout(len(test_cases)))
+        except ExecutorUnavailable as e:
+            results = [CodeExecutionResult(False, "", "", f"An unexpected error occurred during execution: {e}") for _ in test_cases]
+        else:
+            results = [result_from_dict(result) for result in response['results']]
+        return _report_results(results, on_result)
+
+    def ping(self, address):
+        """
+        Returns the status reported by one executor (its address, languages and sandbox cap).
+        """
+        return _send_request(address, {'op': 'ping', 'token': self._token}, timeout=5)
+
+    def _pick_addresses(self):
+        """
+        Returns the addresses in the order they should be tried: available ones by load, then the rest.
+        """
+        with self._lock:
+            now = time.monotonic()
+            # Rotate the starting point so equally loaded executors share the work
+            rotation = self._addresses[self._next_index:] + self._addresses[:self._next_index]
+            self._next_index = (self._next_index + 1) % len(self._addresses)
+            available = [address for address in rotation if self._unavailable_until.get(address, 0) <= now]
+            unavailable = [address for address in rotation if address not in available]
+            return sorted(available, key=lambda address: self._in_flight[address]) + unavailable
+
+    def _request(self, request_data, timeout):
+        errors = []
+        for address in self._pick_addresses():
+            with self._lock:
+                self._in_flight[address] += 1
+            try:
+                response = _send_request(address, request_data, timeout)
+                with self._lock:
+                    self._unavailable_until.pop(address, None)
+                return response
+            except (OSError, ValueError) as e:
+                # Connection failures and broken responses; timeouts are not retried elsewhere
+                errors.append(f"{address}: {e}")
+                if isinstance(e, socket.timeout):
+                    break
+                with self._lock:
+                    self._unavailable_until[address] = time.monotonic() + _UNAVAILABLE_RETRY_SECONDS
+            finally:
+                with self._lock:
+                    self._in_flight[address] -= 1
+        raise ExecutorUnavailable(f"no sandbox executor could run the code ({'; '.join(errors)})")
+
+def _send_request(address, request_data, timeout):
+    family, socket_address = parse_address(address)
+    with socket.socket(family, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(socket_address)
+        connection.sendall(json.dumps(request_data).encode('utf-8') + b'\n')
+        with connection.makefile('rb') as reader:
+            line = reader.readline()
+    if not line:
+        raise ValueError("the executor closed the connection without a response")
+    response = json.loads(line)
+    if 'error' in response:
+        raise ValueError(response['error'])
+    return response
+
+class _ExecutorRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # One connection may carry several requests
+        for line in self.rfile:
+            try:
+                response = self.server.executor.handle_request(json.loads(line))
+            except Exception as e:
+                self.server.executor.app.logger.exception(f"Executor request failed: {e}")
+                response = {'error': str(e)}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+class _ThreadingUnixStreamServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class ExecutorServer:
+    """
+    Serves sandbox execution requests for an application created by create_executor_app().
+    """
+    def __init__(self, app, address):
+        self.app = app
+        self.address = address
+        self._token = app.config.get('SANDBOX_EXECUTOR_TOKEN')
+        family, socket_address = parse_address(address)
+        if family == socket.AF_INET and not self._token:
+            raise ValueError(f"Refusing to listen on {address} without SANDBOX_EXECUTOR_TOKEN; set a token or use a Unix socket")
+        if family == socket.AF_UNIX:
+            if os.path.exists(socket_address):
+                os.remove(socket_address) # Left behind by a previous executor
+            self._server = _ThreadingUnixStreamServer(socket_address, _ExecutorRequestHandler)
+            os.chmod(socket_address, 0o660)
+        else:
+            self._server = _ThreadingTCPServer(socket_address, _ExecutorRequestHandler)
+        self._server.executor = self
+        self._thread = None
+
+    def handle_request(self, request_data):
+        if self._token and not hmac.compare_digest(str(request_data.get('token') or ''), self._token):
+            return {'error': 'invalid executor token'}
+
+        with self.app.app_context():
+            if request_data.get('op') == 'ping':
+                from scripts.config import get_enabled_language_configs
+                return {
+                    'address': self.address,
+                    'languages': sorted(get_enabled_language_configs()),
+                    'max_sandboxes': self.app.config.get('CODE_EXECUTION_MAX_SANDBOXES'),
+                }
+            if request_data.get('op') == 'run_test_cases':
+                from scripts.code_execution import execute_test_cases
+                results = execute_test_cases(
+                    request_data['language'],
+                    request_data['code'],
+                    [tuple(test_case_data_from_wire(data) for data in test_case) for test_case in request_data['test_cases']],
+                    setup_code=request_data.get('setup_code'),
+                    fail_fast=bool(request_data.get('fail_fast'))
+                )
+                return {'results': [result_to_dict(result) for result in results]}
+        return {'error': f"unknown operation {request_data.get('op')!r}"}
+
+    def serve_forever(self):
+        self.app.logger.info(f"Sandbox executor listening on {self.address}")
+        self._server.serve_forever()
+
+    def start(self):
+        """
+        Serves requests from a background thread.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name="sandbox-executor", daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        family, socket_address = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(socket_address):
+            os.remove(socket_address)
+
+def create_executor_app(config_class=None):
+    """
+    Creates the minimal application an executor runs in: configuration, launch profiles,
+    build cache, warm interpreter pool and test case blob store, but no database or routes.
+    """
+    from flask import Flask
+    from scripts.config import Config, get_enabled_language_configs
+    from scripts.build_cache import build_artifact_cache
+    from scripts.code_execution import prepare_launch_profiles
+    from scripts.test_case_blobs import test_case_blob_store
+    from scripts.warm_pool import warm_interpreter_pool
+
+    app = Flask('windflag_executor')
+    app.config.from_object(config_class or Config)
+    build_artifact_cache.init_app(app)
+    test_case_blob_store.init_app(app)
+    with app.app_context():
+        prepare_launch_profiles(get_enabled_language_configs(), rootfs_dir=app.config.get('SANDBOX_ROOTFS_DIR'))
+    warm_interpreter_pool.init_app(app)
+    return app
+
+def start_local_executor(app, address=None):
+    """
+    Starts an executor serving from a background thread of this process, e.g. for tests.
+
+    Returns:
+        ExecutorServer: The running server; its `address` can be used in SANDBOX_EXECUTOR_ADDRESSES.
+    """
+    if address is None:
+        address = os.path.join(tempfile.mkdtemp(prefix='windflag_executor_'), 'executor.sock')
+    return ExecutorServer(app, address).start()
+
+sandbox_executor = SandboxExecutorClient()
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs a WindFlag sandbox executor.")
+    parser.add_argument('--listen', required=True, help="Unix socket path or host:port to listen on")
+    args = parser.parse_args()
+
+    # Same .env as the web application, loaded before scripts.config reads the environment
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
+    app = create_executor_app()
+    try:
+        server = ExecutorServer(app, args.listen)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -6,8 +6,11 @@ awards, and other related entities.
 """
 from datetime import datetime, UTC
 from .extensions import db, login_manager, bcrypt # Added bcrypt
+from .test_case_blobs import test_case_blob_store, TestCaseBlob
 from flask_login import UserMixin
 from sqlalchemy.dialects.postgresql import ENUM as PG_ENUM # For PostgreSQL, if needed, but using String for now
+from sqlalchemy import event, inspect as sa_inspect, text
+from sqlalchemy.orm import validates
 import hashlib # Added for dynamic flag API key hashing
 import secrets # Added for generating dynamic flag API keys
 
@@ -665,12 +668,97 @@ class TestCase(db.Model):
     input_data = db.Column(db.Text, nullable=True)
     expected_output = db.Column(db.Text, nullable=False)
     order = db.Column(db.Integer, nullable=False, default=0) # To define execution order
+    # SHA-256 digests of data moved to the test case blob store (see scripts/test_case_blobs.py)
+    input_data_blob = db.Column(db.String(64), nullable=True)
+    expected_output_blob = db.Column(db.String(64), nullable=True)
 
     challenge = db.relationship('Challenge', backref=db.backref('test_cases', lazy=True, cascade="all, delete-orphan"))
 
+    @validates('input_data', 'expected_output')
+    def _store_large_data(self, key, value):
+        """
+        Moves data of TEST_CASE_BLOB_THRESHOLD_BYTES or more to the test case blob store,
+        leaving only its digest in the row. The blob file is written when the test case is
+        flushed (see write_pending_blobs), so a rolled back assignment writes nothing.
+        """
+        digest = test_case_blob_store.digest_if_large(value)
+        setattr(self, f'{key}_blob', digest)
+        if digest is None:
+            return value
+        if getattr(self, '_pending_blobs', None) is None:
+            self._pending_blobs = {}
+        self._pending_blobs[digest] = value
+        return None if key == 'input_data' else ''
+
+    def write_pending_blobs(self):
+        """
+        Writes the data assigned since the last flush to the blob store, skipping data
+        that was replaced or rolled back since.
+        """
+        pending = getattr(self, '_pending_blobs', None)
+        while pending:
+            digest, value = pending.popitem()
+            if digest in (self.input_data_blob, self.expected_output_blob):
+                test_case_blob_store.put(value)
+
+    def _blob_source(self, digest):
+        # Data assigned but not flushed yet is served from memory
+        pending = getattr(self, '_pending_blobs', None)
+        if pending and digest in pending:
+            return pending[digest]
+        return test_case_blob_store.get(digest)
+
+    def input_source(self):
+        """
+        Returns the input to run the test case with: a string, a TestCaseBlob or None.
+        """
+        return self._blob_source(self.input_data_blob) if self.input_data_blob else self.input_data
+
+    def expected_output_source(self):
+        """
+        Returns the expected output to compare runs against: a string or a TestCaseBlob.
+        """
+        return self._blob_source(self.expected_output_blob) if self.expected_output_blob else self.expected_output
+
+    def read_input_data(self):
+        """
+        Returns the full input, loading it from the blob store if needed.
+        """
+        source = self.input_source()
+        return source.read_text() if isinstance(source, TestCaseBlob) else source
+
+    def read_expected_output(self):
+        """
+        Returns the full expected output, loading it from the blob store if needed.
+        """
+        source = self.expected_output_source()
+        return source.read_text() if isinstance(source, TestCaseBlob) else source
+
     def __repr__(self):
         return f"TestCase(Challenge ID: {self.challenge_id}, Order: {self.order})"
 
+def _write_pending_test_case_blobs(session, flush_context, instances):
+    # Blob files exist before the rows referencing them are written
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, TestCase):
+            obj.write_pending_blobs()
+
+event.listen(db.session, 'before_flush', _write_pending_test_case_blobs)
+
+def collect_test_case_blobs():
+    """
+    Removes test case blob files no longer referenced by any TestCase.
+
+    Returns:
+        int: The number of files removed.
+    """
+    referenced = set()
+    for input_digest, expected_output_digest in db.session.query(TestCase.input_data_blob, TestCase.expected_output_blob).filter(
+            db.or_(TestCase.input_data_blob.isnot(None), TestCase.expected_output_blob.isnot(None))):
+        referenced.update((input_digest, expected_output_digest))
+    referenced.discard(None)
+    return test_case_blob_store.collect_garbage(referenced)
+
 class Submission(db.Model):
     """
     Records a successful submission of a challenge by a user.
@@ -752,6 +840,123 @@ class FlagAttempt(db.Model):
     def __repr__(self):
         return f"FlagAttempt(User: {self.user_id}, Challenge: {self.challenge_id}, Correct: {self.is_correct})"
 
+class CodeExecutionJob(db.Model):
+    """
+    Records a coding challenge submission waiting for (or processed by) the execution queue.
+
+    Jobs are persisted before they are handed to a sandbox worker, so queued work
+    survives an application restart.
+
+    Attributes:
+        id (str): Primary key, a random hex job ID returned to the client.
+        kind (str): Type of job ('SUBMIT_CODE' or 'SUBMIT_FLAG').
+        user_id (int): Foreign key to the User model (submitter).
+        challenge_id (int): Foreign key to the Challenge model.
+        code (str): The submitted code.
+        status (str): Current status ('QUEUED', 'RUNNING', 'DONE', 'FAILED', or 'SUPERSEDED' when a newer
+                      job of the user for the same challenge replaced it before it ran).
+        result (dict): The response payload produced by the job once finished.
+        created_at (datetime): The time the job was queued.
+        started_at (datetime): The time a worker picked the job up.
+        finished_at (datetime): The time the job finished.
+    """
+    id = db.Column(db.String(32), primary_key=True, default=lambda: secrets.token_hex(16))
+    kind = db.Column(db.String(20), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('challenge.id'), nullable=False)
+    code = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='QUEUED')
+    result = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(UTC))
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    user = db.relationship('User', backref=db.backref('code_execution_jobs', cascade="all, delete-orphan"))
+    challenge = db.relationship('Challenge', backref=db.backref('code_execution_jobs', cascade="all, delete-orphan"))
+
+    def __repr__(self):
+        return f"CodeExecutionJob('{self.id}', Kind: {self.kind}, Status: {self.status})"
+
+class CodeExecutionRecord(db.Model):
+    """
+    Records the resources used by one sandbox run of a coding challenge submission.
+
+    One record is stored per executed test case (or per run for challenges graded through
+    the flag form), so costly challenges and users can be identified when planning capacity.
+
+    Attributes:
+        id (int): Primary key.
+        user_id (int): Foreign key to the User model (submitter).
+        challenge_id (int): Foreign key to the Challenge model.
+        test_case_id (int): Foreign key to the TestCase model, None for single-run challenges.
+        flag_attempt_id (int): Foreign key to the FlagAttempt recorded for the same submission, if any.
+        language (str): The language the code ran in.
+        success (bool): Whether the run produced the expected output.
+        is_timeout (bool): Whether the run hit the time limit.
+        cpu_time_seconds (float): User plus system CPU time of the sandbox.
+        peak_memory_kb (int): Peak resident memory of the sandbox in kilobytes.
+        wall_time_seconds (float): Wall-clock time of the run.
+        timestamp (datetime): The time the run finished.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('challenge.id'), nullable=False)
+    test_case_id = db.Column(db.Integer, db.ForeignKey('test_case.id', ondelete='SET NULL'), nullable=True)
+    flag_attempt_id = db.Column(db.Integer, db.ForeignKey('flag_attempt.id', ondelete='SET NULL'), nullable=True)
+    language = db.Column(db.String(50), nullable=True)
+    success = db.Column(db.Boolean, nullable=False, default=False)
+    is_timeout = db.Column(db.Boolean, nullable=False, default=False)
+    cpu_time_seconds = db.Column(db.Float, nullable=True)
+    peak_memory_kb = db.Column(db.Integer, nullable=True)
+    wall_time_seconds = db.Column(db.Float, nullable=True)
+    timestamp = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(UTC))
+
+    user = db.relationship('User', backref=db.backref('code_execution_records', cascade="all, delete-orphan"))
+    challenge = db.relationship('Challenge', backref=db.backref('code_execution_records', cascade="all, delete-orphan"))
+
+    @classmethod
+    def from_result(cls, execution_result, user_id, challenge, test_case_id=None, flag_attempt_id=None):
+        """
+        Builds a record from a CodeExecutionResult, or returns None for results served from the
+        execution result cache, whose usage was already recorded by the run that produced them,
+        and for superseded submissions and skipped test cases, which never ran.
+        """
+        if execution_result.cached or execution_result.superseded or execution_result.skipped:
+            return None
+        return cls(
+            user_id=user_id,
+            challenge_id=challenge.id,
+            test_case_id=test_case_id,
+            flag_attempt_id=flag_attempt_id,
+            language=challenge.language,
+            success=execution_result.success,
+            is_timeout=execution_result.is_timeout,
+            cpu_time_seconds=execution_result.cpu_time_seconds,
+            peak_memory_kb=execution_result.peak_memory_kb,
+            wall_time_seconds=execution_result.wall_time_seconds
+        )
+
+    @classmethod
+    def failure_rates(cls, challenge_id):
+        """
+        Returns the share of recorded runs that failed, per test case of a challenge.
+
+        Returns:
+            dict: test_case_id -> failure rate between 0.0 and 1.0, for test cases with recorded runs.
+        """
+        rows = db.session.query(
+            cls.test_case_id,
+            db.func.count(cls.id),
+            db.func.sum(db.case((cls.success == False, 1), else_=0)) # noqa: E712
+        ).filter(
+            cls.challenge_id == challenge_id,
+            cls.test_case_id.isnot(None)
+        ).group_by(cls.test_case_id).all()
+        return {test_case_id: (failures or 0) / runs for test_case_id, runs, failures in rows}
+
+    def __repr__(self):
+        return f"CodeExecutionRecord(User ID: {self.user_id}, Challenge ID: {self.challenge_id}, CPU: {self.cpu_time_seconds}s)"
+
 class Setting(db.Model):
     """
     Stores application-wide settings as key-value pairs.
@@ -863,3 +1068,30 @@ class UserHint(db.Model):
         return f"UserHint(User: {self.user_id}, Hint: {self.hint_id})"
 
 
+# Nullable columns added to tables that existing databases already have. db.create_all() only
+# creates missing tables, so upgrade_schema() adds these columns where they are missing.
+_ADDED_COLUMNS = {
+    TestCase: ('input_data_blob', 'expected_output_blob'),
+}
+
+def upgrade_schema():
+    """
+    Adds the columns listed in _ADDED_COLUMNS to existing tables that lack them.
+    Safe to run on every start-up; must be called within an application context, after db.create_all().
+    """
+    inspector = sa_inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    with db.engine.begin() as connection:
+        for model, column_names in _ADDED_COLUMNS.items():
+            table = model.__table__
+            if not inspector.has_table(table.name):
+                continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for name in column_names:
+                if name in existing_columns:
+                    continue
+                column = table.c[name]
+                connection.execute(text(
+                    f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} "
+                    f"{column.type.compile(dialect=db.engine.dialect)}"
+                ))
@@ -0,0 +1,215 @@
+"""
+This module provides the backends that start sandbox processes, selected with SANDBOX_BACKEND.
+
+Runs are always described as a bwrap command line: launch profile, binds into /sandbox, and the
+command to run after '--'. The backend turns that description into the process that is started:
+
+- 'bwrap' (default) runs it as is, isolating the run in its own namespaces.
+- 'rlimit' runs the command directly on the host under the same rlimits and cgroup, in a fresh
+  working directory standing in for /sandbox. It provides no isolation and is meant for development
+  and for machines without bwrap; setup scripts and code must use paths relative to /sandbox.
+- 'fake' is the 'rlimit' backend with every language runtime replaced by a deterministic stand-in
+  that waits SANDBOX_FAKE_LATENCY_MS and then echoes its input, so queueing, caching and result
+  handling can be load-tested without any runtime installed. Code containing FAKE_ERROR exits with
+  an error, code containing FAKE_TIMEOUT never finishes and code containing FAKE_SYNTAX_ERROR fails
+  sandboxed syntax checks.
+"""
+import os
+import re
+import shutil
+import signal
+import tempfile
+import threading
+
+SANDBOX_DIR = '/sandbox'
+
+# Number of values taken by the bwrap options used in launch profiles and run arguments
+_BWRAP_OPTION_ARITY = {
+    '--unshare-pid': 0, '--unshare-net': 0, '--unshare-all': 0, '--die-with-parent': 0, '--new-session': 0, '--clearenv': 0,
+    '--proc': 1, '--dev': 1, '--tmpfs': 1, '--dir': 1, '--chdir': 1, '--remount-ro': 1, '--unsetenv': 1,
+    '--ro-bind': 2, '--bind': 2, '--ro-bind-try': 2, '--bind-try': 2, '--dev-bind': 2, '--setenv': 2,
+    '--ro-bind-data': 2, '--bind-data': 2, '--file': 2, '--symlink': 2,
+}
+
+_BIND_OPTIONS = ('--ro-bind', '--bind', '--ro-bind-try', '--bind-try', '--dev-bind')
+
+# '/sandbox' as a whole path component, e.g. in 'python3 /sandbox/user_code.py' or sys.path[0] = '/sandbox'
+_SANDBOX_PATH_PATTERN = re.compile(re.escape(SANDBOX_DIR) + r'(?=/|\b|$)')
+
+class PreparedSandbox:
+    """
+    A sandbox process ready to be started: pass `argv` (wrapped by SandboxRun.wrap_command) and
+    `popen_kwargs()` to subprocess.Popen and call `cleanup()` once the process has exited.
+    """
+    def __init__(self, argv, cwd=None, env=None, workdir=None):
+        self.argv = argv
+        self.cwd = cwd
+        self.env = env
+        self.workdir = workdir
+
+    def popen_kwargs(self):
+        if self.workdir is None:
+            return {}
+        # Without a PID namespace, a new session lets cleanup() kill whatever the run left behind
+        return {'cwd': self.cwd, 'env': self.env, 'start_new_session': True}
+
+    def kill(self, process):
+        """
+        Kills a started sandbox. Outside of bwrap, everything the run started is killed with it.
+        """
+        try:
+            if self.workdir is None:
+                process.kill()
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass # Already exited (asyncio processes raise this instead of ignoring the kill)
+
+    def cleanup(self, process=None):
+        if self.workdir is None:
+            return
+        if process is not None:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+class SandboxBackend:
+    """
+    Base class of the sandbox backends.
+    """
+    name = None
+    # Whether runs can be started ahead of time by the warm interpreter pool
+    supports_warm_pool = False
+    # Whether --ro-bind-data (code passed in memory) can be used instead of a temporary directory
+    supports_data_binds = False
+
+    def prepare(self, language, bwrap_cmd):
+        """
+        Turns a bwrap command line for a run of the given language into a PreparedSandbox.
+        """
+        raise NotImplementedError
+
+class BwrapBackend(SandboxBackend):
+    name = 'bwrap'
+    supports_warm_pool = True
+    supports_data_binds = True # If the installed bwrap has --ro-bind-data, see _supports_data_binds()
+
+    def prepare(self, language, bwrap_cmd):
+        return PreparedSandbox(bwrap_cmd)
+
+class RlimitBackend(SandboxBackend):
+    name = 'rlimit'
+
+    def prepare(self, language, bwrap_cmd):
+        workdir = tempfile.mkdtemp(prefix='sandbox_rlimit_')
+        try:
+            env = {'HOME': workdir, 'LANG': 'C.UTF-8'}
+            i = 1 # Skip the bwrap path
+            while i < len(bwrap_cmd) and bwrap_cmd[i] != '--':
+                option = bwrap_cmd[i]
+                if option not in _BWRAP_OPTION_ARITY:
+                    raise ValueError(f"Unsupported bwrap option for the {self.name} sandbox backend: {option}")
+                values = bwrap_cmd[i + 1:i + 1 + _BWRAP_OPTION_ARITY[option]]
+                if option in _BIND_OPTIONS:
+                    self._link_into_workdir(workdir, *values)
+                elif option == '--setenv':
+                    env[values[0]] = values[1]
+                elif option in ('--ro-bind-data', '--bind-data', '--file'):
+                    raise ValueError(f"The {self.name} sandbox backend cannot bind data from file descriptors")
+                i += 1 + len(values)
+
+            command = self._command(language, bwrap_cmd[i + 1:])
+            argv = [_SANDBOX_PATH_PATTERN.sub(workdir, arg) for arg in command]
+        except Exception:
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise
+        return PreparedSandbox(argv, cwd=workdir, env=env, workdir=workdir)
+
+    def _link_into_workdir(self, workdir, host_path, sandbox_path):
+        # Only paths below /sandbox differ from the host; system binds are already in place
+        if not _SANDBOX_PATH_PATTERN.match(sandbox_path) or not os.path.exists(host_path):
+            return
+        target = _SANDBOX_PATH_PATTERN.sub(workdir, sandbox_path, count=1)
+        if os.path.lexists(target):
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.symlink(host_path, target)
+
+    def _command(self, language, command):
+        """
+        Returns the command to run, still using /sandbox paths.
+        """
+        return command
+
+class FakeBackend(RlimitBackend):
+    name = 'fake'
+
+    def __init__(self, latency_ms=50):
+        self.latency_ms = latency_ms
+
+    def _fake_run_command(self, file_extension):
+        # Double quotes only, as run commands are embedded in single-quoted strings by the batch harness
+        code_path = f"{SANDBOX_DIR}/user_code{file_extension}"
+        return (
+            f"sleep {self.latency_ms / 1000:.3f}; "
+            f"if grep -q FAKE_TIMEOUT {code_path}; then sleep 3600; fi; "
+            f"if grep -q FAKE_ERROR {code_path}; then echo \"fake runtime error\" >&2; exit 1; fi; "
+            f"exec cat"
+        )
+
+    def _command(self, language, command):
+        from scripts.code_execution import LANGUAGE_CONFIGS, LANGUAGE_BUILD_CONFIGS, LANGUAGE_SYNTAX_CHECKS
+        runtime_host_path, file_extension, execute_cmd_template, language_binds_config = LANGUAGE_CONFIGS[language]
+        fake_run_command = self._fake_run_command(file_extension)
+        replacements = [(execute_cmd_template, fake_run_command)]
+        if language in LANGUAGE_SYNTAX_CHECKS:
+            code_path = f"{SANDBOX_DIR}/user_code{file_extension}"
+            replacements.append((
+                LANGUAGE_SYNTAX_CHECKS[language].format(runtime=runtime_host_path),
+                f"if grep -q FAKE_SYNTAX_ERROR {code_path}; then echo \"fake syntax error\" >&2; exit 2; fi"
+            ))
+        if language in LANGUAGE_BUILD_CONFIGS:
+            build_command, artifact_name, build_execute_cmd_template = LANGUAGE_BUILD_CONFIGS[language]
+            replacements += [
+                (build_command, f"touch {SANDBOX_DIR}/build/{artifact_name}"),
+                (build_execute_cmd_template, fake_run_command),
+            ]
+
+        fake_command = []
+        for arg in command:
+            for runtime_command, replacement in replacements:
+                arg = arg.replace(runtime_command, replacement)
+            fake_command.append(arg)
+        return fake_command
+
+SANDBOX_BACKENDS = {
+    'bwrap': BwrapBackend,
+    'rlimit': RlimitBackend,
+    'fake': FakeBackend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_sandbox_backend(config):
+    """
+    Returns the backend configured by SANDBOX_BACKEND (and SANDBOX_FAKE_LATENCY_MS for 'fake').
+    Unknown backends fall back to bwrap with a warning, so a typo never disables isolation silently.
+    """
+    name = (config.get('SANDBOX_BACKEND') or 'bwrap').lower()
+    latency_ms = int(config.get('SANDBOX_FAKE_LATENCY_MS', 50)) if name == 'fake' else None
+
+    with _backends_lock:
+        backend = _backends.get((name, latency_ms))
+        if backend is None:
+            if name == 'fake':
+                backend = FakeBackend(latency_ms)
+            elif name in SANDBOX_BACKENDS:
+                backend = SANDBOX_BACKENDS[name]()
+            else:
+                print(f"Warning: Unknown SANDBOX_BACKEND '{name}'. Using bwrap.")
+                backend = BwrapBackend()
+            _backends[(name, latency_ms)] = backend
+        return backend
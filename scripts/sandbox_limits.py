@@ -0,0 +1,214 @@
+"""
+This module applies hard resource limits to sandbox runs and measures what each run used.
+
+Limits are set with rlimits on the bwrap process right before it executes, so they are
+inherited by everything started inside the sandbox. When SANDBOX_CGROUP_ROOT points to a
+cgroup v2 directory delegated to the application, every run additionally gets its own
+child cgroup: memory.max and pids.max then cap the whole process tree, and the cgroup's
+counters are used for accounting instead of the rusage reported by wait4().
+
+Sandboxes are started from many threads, where running Python code in the forked child
+(Popen's preexec_fn) can deadlock. The limits are therefore applied by small programs the
+command is wrapped in (see SandboxRun.wrap_command), which exec the sandbox in the same process.
+"""
+import os
+import shutil
+import secrets
+import subprocess
+import time
+
+# util-linux prlimit(1), which sets rlimits on itself and then executes the command
+PRLIMIT_PATH = shutil.which('prlimit') or '/usr/bin/prlimit'
+
+# Moves the shell into the cgroup whose cgroup.procs file is $0, then replaces it with the command
+_ENTER_CGROUP_SCRIPT = 'echo $$ > "$0" && exec "$@"'
+
+# Runtimes reserving large amounts of virtual memory up front, which RLIMIT_AS would break.
+# Their memory is only limited through the cgroup, when one is configured.
+ADDRESS_SPACE_EXEMPT_LANGUAGES = ('nodejs', 'dart')
+
+class SandboxLimits:
+    """
+    The per-run resource limits configured for the application.
+    """
+    def __init__(self, memory_limit_mb=256, cpu_time_limit_seconds=5, max_processes=256, cgroup_root=None, nproc_rlimit=False):
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_time_limit_seconds = cpu_time_limit_seconds
+        self.max_processes = max_processes
+        self.cgroup_root = cgroup_root
+        # RLIMIT_NPROC counts every process of the user, not just the sandbox's, so without
+        # a cgroup max_processes is only applied as RLIMIT_NPROC when explicitly enabled
+        self.nproc_rlimit = nproc_rlimit
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            memory_limit_mb=int(config.get('SANDBOX_MEMORY_LIMIT_MB', 256)),
+            cpu_time_limit_seconds=int(config.get('SANDBOX_CPU_TIME_LIMIT_SECONDS', 5)),
+            max_processes=int(config.get('SANDBOX_MAX_PROCESSES', 256)),
+            cgroup_root=config.get('SANDBOX_CGROUP_ROOT') or None,
+            nproc_rlimit=bool(config.get('SANDBOX_NPROC_RLIMIT', False))
+        )
+
+    def start_run(self, language):
+        """
+        Returns the SandboxRun used to limit and account a single sandbox process.
+        """
+        return SandboxRun(self, language)
+
+class SandboxRun:
+    """
+    Limits and resource accounting for one sandbox process and everything it starts.
+
+    Start the command returned by `wrap_command()`, reap the process with `wait()` and call
+    `close()` once it has exited. Usage is available afterwards as `cpu_time_seconds`, `peak_memory_kb`
+    and `wall_time_seconds` (None when it could not be measured).
+    """
+    def __init__(self, limits, language):
+        self.limits = limits
+        self.language = language
+        self.cgroup_path = None
+        self.cpu_time_seconds = None
+        self.peak_memory_kb = None
+        self.wall_time_seconds = None
+        self._started_at = None
+
+        if limits.cgroup_root:
+            self.cgroup_path = self._create_cgroup()
+
+    def _create_cgroup(self):
+        path = os.path.join(self.limits.cgroup_root, f"run-{secrets.token_hex(8)}")
+        try:
+            os.mkdir(path)
+        except OSError as e:
+            print(f"Warning: Could not create sandbox cgroup in {self.limits.cgroup_root}: {e}. Using rlimits only.")
+            return None
+
+        # Controllers that are not enabled for the delegated subtree have no interface files
+        for filename, value in [
+            ('memory.max', self.limits.memory_limit_mb * 1024 * 1024 if self.limits.memory_limit_mb else 'max'),
+            ('memory.swap.max', 0),
+            ('pids.max', self.limits.max_processes or 'max'),
+        ]:
+            interface_path = os.path.join(path, filename)
+            if os.path.exists(interface_path):
+                with open(interface_path, 'w') as f:
+                    f.write(str(value))
+        return path
+
+    def wrap_command(self, argv):
+        """
+        Returns the command line that runs argv under the run's limits: prlimit sets the rlimits
+        and, with a cgroup, a shell first moves itself into it. Both exec the next program, so
+        the started process is the sandbox and no Python code runs between fork and exec.
+        """
+        rlimits = []
+        if self.limits.cpu_time_limit_seconds:
+            # SIGXCPU at the soft limit, SIGKILL one second later
+            rlimits.append(f"--cpu={self.limits.cpu_time_limit_seconds}:{self.limits.cpu_time_limit_seconds + 1}")
+        if self.limits.memory_limit_mb and self.language not in ADDRESS_SPACE_EXEMPT_LANGUAGES:
+            rlimits.append(f"--as={self.limits.memory_limit_mb * 1024 * 1024}")
+        if self.limits.max_processes and self.limits.nproc_rlimit and not self.cgroup_path:
+            rlimits.append(f"--nproc={self.limits.max_processes}")
+
+        command = list(argv)
+        if rlimits:
+            command = [PRLIMIT_PATH] + rlimits + ['--'] + command
+        if self.cgroup_path:
+            command = ['/bin/sh', '-c', _ENTER_CGROUP_SCRIPT, os.path.join(self.cgroup_path, 'cgroup.procs')] + command
+        return command
+
+    def mark_started(self):
+        """
+        Starts the wall clock, unless it is already running.
+        """
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+
+    def wait(self, process, timeout=None):
+        """
+        Reaps the process like Popen.wait(), but through os.wait4() to collect the resource usage
+        of the process and every process it waited for, i.e. the whole sandbox.
+
+        Raises:
+            subprocess.TimeoutExpired: If the process is still running after `timeout` seconds.
+        """
+        if process.returncode is not None:
+            return process.returncode
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 0.0005
+        while True:
+            try:
+                pid, status, rusage = os.wait4(process.pid, 0 if deadline is None else os.WNOHANG)
+            except ChildProcessError:
+                # Already reaped elsewhere; Popen reports what it knows about the exit status
+                return process.poll()
+            if pid:
+                process.returncode = os.waitstatus_to_exitcode(status)
+                self._record_usage(rusage)
+                return process.returncode
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(process.args, timeout)
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+
+    def record_exit(self):
+        """
+        Records the usage of a process reaped elsewhere, e.g. by asyncio. Without the rusage of
+        wait4() only the wall time and, if the run has a cgroup, its counters are available.
+        """
+        self._record_usage(None)
+
+    def _record_usage(self, rusage):
+        if self._started_at is not None:
+            self.wall_time_seconds = round(time.monotonic() - self._started_at, 4)
+        if rusage is not None:
+            self.cpu_time_seconds = round(rusage.ru_utime + rusage.ru_stime, 4)
+            self.peak_memory_kb = rusage.ru_maxrss # Kilobytes on Linux
+
+        if self.cgroup_path:
+            cpu_usage_usec = _read_cgroup_value(self.cgroup_path, 'cpu.stat', 'usage_usec')
+            if cpu_usage_usec is not None:
+                self.cpu_time_seconds = round(cpu_usage_usec / 1_000_000, 4)
+            memory_peak = _read_cgroup_value(self.cgroup_path, 'memory.peak')
+            if memory_peak is not None:
+                self.peak_memory_kb = memory_peak // 1024
+
+    def close(self):
+        """
+        Removes the run's cgroup once the sandbox has exited.
+        """
+        if not self.cgroup_path:
+            return
+        # The sandbox's processes are torn down asynchronously after bwrap exits
+        for _ in range(20):
+            try:
+                os.rmdir(self.cgroup_path)
+                break
+            except FileNotFoundError:
+                break
+            except OSError:
+                time.sleep(0.05)
+        else:
+            print(f"Warning: Could not remove sandbox cgroup {self.cgroup_path}.")
+        self.cgroup_path = None
+
+def _read_cgroup_value(cgroup_path, filename, key=None):
+    """
+    Reads a single integer from a cgroup interface file, or the value of `key` from a flat-keyed file.
+    """
+    try:
+        with open(os.path.join(cgroup_path, filename)) as f:
+            content = f.read()
+    except OSError:
+        return None
+    if key is None:
+        return int(content.strip()) if content.strip().isdigit() else None
+    for line in content.splitlines():
+        name, _, value = line.partition(' ')
+        if name == key and value.strip().isdigit():
+            return int(value)
+    return None
@@ -0,0 +1,357 @@
+"""
+This module keeps a materialised, ranked scoreboard in memory for the scoreboard endpoints.
+
+The scoreboard is built from the database once and then updated incrementally from SQLAlchemy
+session events as transactions commit:
+- a new Submission adds the challenge's points to the solver's total, moves them in the ranking
+  and appends a point to their score history;
+- a change of User.score (solves, awards, hint reveals) reorders the top players;
+- a new User or Challenge is added to it.
+Changes the cache does not apply incrementally (users being renamed, hidden or deleted,
+submissions or challenges being deleted, challenge points being edited, bulk UPDATE or DELETE
+statements on these tables, rolled back transactions) drop it, and the next request rebuilds it.
+Applied changes are broadcast to live scoreboards through scripts/scoreboard_events.py.
+
+Only commits made in this process are seen. When several application processes serve the
+scoreboard, SCOREBOARD_CACHE_MAX_AGE_SECONDS bounds how long one of them can miss another's changes.
+"""
+import bisect
+import threading
+import time
+from datetime import datetime, UTC, timedelta
+
+from sqlalchemy import event, inspect
+
+from scripts.chart_data_utils import lttb_indices, epoch_ms
+from scripts.data_version import data_version
+from scripts.scoreboard_events import scoreboard_events, SOLVE, AWARD
+
+# Key of the changes collected in session.info until the transaction commits
+_PENDING_CHANGES = 'scoreboard_cache_changes'
+
+# Marks the cache as stale instead of updating it
+_INVALIDATE = ('invalidate',)
+
+# Score history timestamps are naive UTC
+_EPOCH = datetime(1970, 1, 1)
+
+def _naive_utc(timestamp):
+    """
+    Returns timestamps the way the database hands them back, so that new and loaded ones compare.
+    """
+    if timestamp is not None and timestamp.tzinfo is not None:
+        return timestamp.astimezone(UTC).replace(tzinfo=None)
+    return timestamp
+
+class _Player:
+    __slots__ = ('user_id', 'username', 'score', 'solved_points', 'last_submission', 'history')
+
+    def __init__(self, user_id, username, score):
+        self.user_id = user_id
+        self.username = username
+        self.score = score or 0 # User.score, including awards and hint costs
+        self.solved_points = 0 # Sum of the points of the solved challenges
+        self.last_submission = None
+        self.history = [] # (timestamp, score_at_submission, data version that added it), oldest first
+
+    @property
+    def rank_key(self):
+        # Most points first, then the earliest last submission, then the oldest account. Players
+        # without submissions come last among equal scores (NULLS LAST), whatever the database
+        return (-self.solved_points, self.last_submission is None, self.last_submission or datetime.min, self.user_id)
+
+    @property
+    def score_key(self):
+        return (-self.score, self.user_id)
+
+class _Scoreboard:
+    """
+    The ranked players of one build of the cache.
+    """
+    def __init__(self, players, challenge_points):
+        self.players = players # user_id -> _Player, visible users only
+        self.challenge_points = challenge_points # challenge_id -> points
+        self.ranking = sorted(player.rank_key for player in players.values())
+        self.by_score = sorted(player.score_key for player in players.values())
+        self.built_at = time.monotonic()
+        self.base_version = 0 # Data version of the database state the scoreboard was built from
+
+    def _move(self, keys, old_key, new_key):
+        del keys[bisect.bisect_left(keys, old_key)]
+        bisect.insort(keys, new_key)
+
+    def add_player(self, user_id, username, score):
+        player = _Player(user_id, username, score)
+        self.players[user_id] = player
+        bisect.insort(self.ranking, player.rank_key)
+        bisect.insort(self.by_score, player.score_key)
+
+    def add_submission(self, user_id, challenge_id, timestamp, score_at_submission, version):
+        """
+        Returns the points the solve added, or None if the user is not on the scoreboard.
+        """
+        player = self.players.get(user_id)
+        if player is None:
+            return None # Hidden users are not on the scoreboard
+        old_key = player.rank_key
+        points = self.challenge_points.get(challenge_id) or 0
+        player.solved_points += points
+        if player.last_submission is None or timestamp > player.last_submission:
+            player.last_submission = timestamp
+        self._move(self.ranking, old_key, player.rank_key)
+        bisect.insort(player.history, (timestamp, score_at_submission, version))
+        return points
+
+    def set_score(self, user_id, score):
+        """
+        Returns the change of the user's score, or None if the user is not on the scoreboard.
+        """
+        player = self.players.get(user_id)
+        if player is None:
+            return None
+        old_key = player.score_key
+        delta = (score or 0) - player.score
+        player.score = score or 0
+        self._move(self.by_score, old_key, player.score_key)
+        return delta
+
+    def event_data(self, user_id, delta, timestamp):
+        """
+        Returns the data of a live scoreboard event about a player, see scripts/scoreboard_events.py.
+        """
+        player = self.players[user_id]
+        return {
+            'user': player.username,
+            'delta': delta,
+            'score': player.solved_points,
+            'rank': bisect.bisect_left(self.ranking, player.rank_key) + 1,
+            'graph_rank': bisect.bisect_left(self.by_score, player.score_key) + 1,
+            'timestamp': timestamp.isoformat(),
+        }
+
+class ScoreboardCache:
+    """
+    An in-memory scoreboard kept up to date from committed transactions, see the module documentation.
+    """
+    def __init__(self):
+        self._scoreboard = None
+        self._generation = 0 # Bumped by every committed change, so rebuilds racing with one are discarded
+        self._max_age_seconds = 0
+        self._lock = threading.Lock()
+        self._listening = False
+        self.rebuilds = 0
+
+    def init_app(self, app):
+        """
+        Reads SCOREBOARD_CACHE_MAX_AGE_SECONDS (0 never rebuilds an up-to-date scoreboard) and
+        starts listening to the session's events.
+        """
+        app.extensions['scoreboard_cache'] = self
+        self._max_age_seconds = max(0, int(app.config.get('SCOREBOARD_CACHE_MAX_AGE_SECONDS', 60)))
+        self.invalidate()
+        if not self._listening:
+            from scripts.extensions import db
+            event.listen(db.session, 'after_flush', self._collect_changes)
+            event.listen(db.session, 'do_orm_execute', self._collect_bulk_changes)
+            event.listen(db.session, 'after_commit', self._apply_changes)
+            event.listen(db.session, 'after_rollback', self._discard_changes)
+            self._listening = True
+
+    def invalidate(self):
+        with self._lock:
+            self._scoreboard = None
+            self._generation += 1
+
+    def _collect_changes(self, session, flush_context):
+        from scripts.models import Challenge, Submission, User
+        changes = session.info.setdefault(_PENDING_CHANGES, [])
+        for obj in session.new:
+            if isinstance(obj, Submission):
+                changes.append(('submission', obj.user_id, obj.challenge_id, _naive_utc(obj.timestamp), obj.score_at_submission))
+            elif isinstance(obj, Challenge):
+                changes.append(('challenge', obj.id, obj.points))
+            elif isinstance(obj, User):
+                changes.append(('user', obj.id, obj.username, obj.score, obj.hidden))
+        for obj in session.dirty:
+            if isinstance(obj, User):
+                attrs = inspect(obj).attrs
+                if attrs.username.history.has_changes() or attrs.hidden.history.has_changes():
+                    changes.append(_INVALIDATE)
+                elif attrs.score.history.has_changes():
+                    changes.append(('score', obj.id, obj.score))
+            elif isinstance(obj, Challenge) and inspect(obj).attrs.points.history.has_changes():
+                changes.append(_INVALIDATE)
+            elif isinstance(obj, Submission) and session.is_modified(obj):
+                changes.append(_INVALIDATE)
+        if any(isinstance(obj, (Challenge, Submission, User)) for obj in session.deleted):
+            changes.append(_INVALIDATE)
+
+    def _collect_bulk_changes(self, orm_execute_state):
+        from scripts.models import Challenge, Submission, User
+        if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ in (Challenge, Submission, User):
+            orm_execute_state.session.info.setdefault(_PENDING_CHANGES, []).append(_INVALIDATE)
+
+    def _apply_changes(self, session):
+        changes = session.info.pop(_PENDING_CHANGES, None)
+        if not changes:
+            return
+        with self._lock:
+            self._generation += 1
+            scoreboard = self._scoreboard
+            if scoreboard is None or _INVALIDATE in changes:
+                self._scoreboard = None
+                scoreboard_events.reset()
+                return
+            solves, awards = [], {}
+            # Bumped under the lock, so that the versions of points and of the payloads built from them agree
+            version = data_version.bump()
+            for change in changes:
+                if change[0] == 'submission':
+                    _, user_id, challenge_id, timestamp, score_at_submission = change
+                    points = scoreboard.add_submission(user_id, challenge_id, timestamp, score_at_submission, version)
+                    if points is not None:
+                        solves.append((user_id, points, timestamp, score_at_submission))
+                elif change[0] == 'score':
+                    delta = scoreboard.set_score(change[1], change[2])
+                    if delta:
+                        awards[change[1]] = awards.get(change[1], 0) + delta
+                elif change[0] == 'challenge':
+                    scoreboard.challenge_points[change[1]] = change[2]
+                elif change[0] == 'user' and not change[4]:
+                    scoreboard.add_player(*change[1:4])
+
+            # Published once everything is applied, so that ranks are final. The score change
+            # that comes with a solve is part of its solve event; others are awards or hint reveals.
+            token = data_version.token(version)
+            for user_id, points, timestamp, score_at_submission in solves:
+                awards.pop(user_id, None)
+                scoreboard_events.publish(SOLVE, dict(scoreboard.event_data(user_id, points, timestamp), y=score_at_submission, version=token))
+            now = datetime.now(UTC)
+            for user_id, delta in awards.items():
+                scoreboard_events.publish(AWARD, dict(scoreboard.event_data(user_id, delta, now), version=token))
+
+    def _discard_changes(self, session):
+        if session.info.pop(_PENDING_CHANGES, None):
+            # A rolled back savepoint may have carried changes of a transaction that still commits
+            self.invalidate()
+
+    def _build(self):
+        from scripts.extensions import db
+        from scripts.models import Challenge, Submission, User
+        players = {
+            user_id: _Player(user_id, username, score)
+            for user_id, username, score in db.session.query(User.id, User.username, User.score).filter(User.hidden == False)
+        }
+        challenge_points = dict(db.session.query(Challenge.id, Challenge.points))
+        for user_id, challenge_id, timestamp, score_at_submission in db.session.query(
+            Submission.user_id, Submission.challenge_id, Submission.timestamp, Submission.score_at_submission
+        ).order_by(Submission.timestamp.asc(), Submission.id.asc()):
+            player = players.get(user_id)
+            if player is None:
+                continue
+            timestamp = _naive_utc(timestamp)
+            player.solved_points += challenge_points.get(challenge_id) or 0
+            player.last_submission = timestamp
+            player.history.append((timestamp, score_at_submission, 0))
+        return _Scoreboard(players, challenge_points)
+
+    def _get(self):
+        """
+        Returns the current scoreboard, building it if needed, and whether it is the cached one.
+        The database is queried without holding the lock, so commits are never blocked by a rebuild.
+        """
+        with self._lock:
+            scoreboard = self._scoreboard
+            if scoreboard is not None and (not self._max_age_seconds or time.monotonic() - scoreboard.built_at < self._max_age_seconds):
+                return scoreboard, True
+            generation = self._generation
+        scoreboard = self._build()
+        with self._lock:
+            self.rebuilds += 1
+            # A change committed meanwhile may or may not be part of this build, so it is not kept
+            if self._generation != generation:
+                return scoreboard, False
+            if self._scoreboard is None:
+                # Whatever dropped the previous scoreboard committed a new version already
+                scoreboard.base_version = data_version.current
+            else:
+                # Deltas from the expired scoreboard's versions would miss changes committed by other processes
+                scoreboard.base_version = data_version.bump()
+            self._scoreboard = scoreboard
+        return scoreboard, True
+
+    def get_scoreboard(self, top_x, since=None, max_points=None, compact=False):
+        """
+        Returns the scoreboard payload: the score history of the top_x players by score and all
+        visible players ranked by the points of their solved challenges.
+
+        Args:
+            top_x (int): Number of players whose score history is included.
+            since (int, optional): A data version the client has the score history of. If it is
+                still known, 'top_players_history' only holds the points added after it, 'delta'
+                is True and 'top_players' lists the players that would be included in full.
+            max_points (int, optional): Down-samples every player's score history to at most this
+                many points (see chart_data_utils.lttb_indices).
+            compact (bool, optional): Returns the compact encoding: usernames in ranking order under
+                'users' and their scores under 'scores' instead of 'all_players_ranked', and every
+                score history as {'u': index in 'users', 't': [epoch milliseconds], 'y': [scores]}.
+
+        Returns:
+            dict: The payload, with the data 'version' it corresponds to (None if it cannot be the
+                base of a later delta).
+        """
+        scoreboard, cached = self._get()
+        with self._lock:
+            version = data_version.current if cached and scoreboard is self._scoreboard else None
+            delta = version is not None and since is not None and scoreboard.base_version <= since <= version
+            ranked_players = [scoreboard.players[key[-1]] for key in scoreboard.ranking]
+            ranked_scores = [-key[0] for key in scoreboard.ranking]
+            top_players = [scoreboard.players[user_id] for _, user_id in scoreboard.by_score[:top_x]]
+            series = {}
+            for player in top_players:
+                points = []
+                if not player.history:
+                    if not delta:
+                        points.append((datetime.now(UTC), 0))
+                elif not delta or player.history[0][2] > since:
+                    points.append((player.history[0][0] - timedelta(microseconds=1), 0))
+                points += [(timestamp, score) for timestamp, score, point_version in player.history if not delta or point_version > since]
+                series[player] = points
+
+        # Down-sampled and serialised without holding the lock
+        for player, points in series.items():
+            if max_points and len(points) > max_points:
+                indices = lttb_indices([(timestamp - _EPOCH).total_seconds() for timestamp, _ in points], [score for _, score in points], max_points)
+                series[player] = [points[i] for i in indices]
+
+        payload = {'version': version, 'delta': delta}
+        if compact:
+            # Usernames are sent once, in ranking order, and referred to by their index
+            index = {player.user_id: i for i, player in enumerate(ranked_players)}
+            payload.update({
+                'encoding': 'compact',
+                'users': [player.username for player in ranked_players],
+                'scores': ranked_scores,
+                'top_players_history': [
+                    {'u': index[player.user_id], 't': [epoch_ms(timestamp) for timestamp, _ in points], 'y': [score for _, score in points]}
+                    for player, points in series.items()
+                ],
+            })
+            if delta:
+                payload['top_players'] = [index[player.user_id] for player in top_players]
+        else:
+            payload.update({
+                'all_players_ranked': [{'username': player.username, 'score': score} for player, score in zip(ranked_players, ranked_scores)],
+                'top_players_history': {
+                    player.username: [{'x': timestamp.isoformat(), 'y': score} for timestamp, score in points]
+                    for player, points in series.items()
+                },
+            })
+            if delta:
+                payload['top_players'] = [player.username for player in top_players]
+        return payload
+
+scoreboard_cache = ScoreboardCache()
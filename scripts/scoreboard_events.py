@@ -0,0 +1,163 @@
+"""
+This module provides the fan-out hub behind the live scoreboard (GET /api/scoreboard_events).
+
+Score changes are published once by the scoreboard cache (see scripts/scoreboard_cache.py) when
+a solve, award or hint reveal is committed. The hub encodes every event once as a Server-Sent
+Event and queues the same bytes for every connected scoreboard, so a change costs one small message
+per client instead of every client re-downloading the whole scoreboard:
+
+    event: solve    data: {"user", "delta", "score", "rank", "graph_rank", "timestamp", "y", "version"}
+    event: award    data: {"user", "delta", "score", "rank", "graph_rank", "timestamp", "version"}
+    event: reset    data: {}   (the scoreboard changed in a way clients must re-fetch)
+
+"rank" is the player's position in the ranking by solved points ("score"), "graph_rank" their
+position by total score, which decides whether they are among the players drawn on the graph.
+"version" is the data version the change made (see scripts/data_version.py), from which a
+client that missed events can catch up with /api/scoreboard_data?since=<version>.
+
+Every connection occupies a request thread of the web server for as long as it is open, so the
+stream is off unless LIVE_SCOREBOARD_MAX_CLIENTS is set; scoreboards poll /api/scoreboard_data instead.
+
+Each connection may have at most LIVE_SCOREBOARD_CLIENT_BUFFER_BYTES of events waiting to be
+sent. A client that falls further behind has its queued events dropped and replaced by a single
+reset event, so slow clients never make the server buffer without bounds.
+"""
+import json
+import threading
+from collections import deque
+
+# Event types
+SOLVE = 'solve'
+AWARD = 'award'
+RESET = 'reset'
+
+_RESET_MESSAGE = f"event: {RESET}\ndata: {{}}\n\n"
+
+class _Subscription:
+    """
+    A connected scoreboard and the events waiting to be sent to it.
+    """
+    def __init__(self):
+        self.messages = deque()
+        self.pending_bytes = 0
+        self.reset_pending = False
+        self.closed = False
+
+class ScoreboardEventHub:
+    """
+    Broadcasts score-change events to all connected scoreboards, see the module documentation.
+    """
+    def __init__(self):
+        self._subscriptions = set()
+        self._condition = threading.Condition()
+        self._next_id = 1
+        self._max_clients = 0
+        self._client_buffer_bytes = 64 * 1024
+        self._keepalive_seconds = 15
+
+    def init_app(self, app):
+        """
+        Reads LIVE_SCOREBOARD_MAX_CLIENTS (0 disables the stream), LIVE_SCOREBOARD_CLIENT_BUFFER_BYTES
+        and LIVE_SCOREBOARD_KEEPALIVE_SECONDS.
+        """
+        app.extensions['scoreboard_events'] = self
+        self._max_clients = max(0, int(app.config.get('LIVE_SCOREBOARD_MAX_CLIENTS', 0)))
+        self._client_buffer_bytes = max(1024, int(app.config.get('LIVE_SCOREBOARD_CLIENT_BUFFER_BYTES', 64 * 1024)))
+        self._keepalive_seconds = max(1, int(app.config.get('LIVE_SCOREBOARD_KEEPALIVE_SECONDS', 15)))
+
+    @property
+    def enabled(self):
+        return self._max_clients > 0
+
+    @property
+    def client_count(self):
+        return len(self._subscriptions)
+
+    def subscribe(self):
+        """
+        Registers a connection.
+
+        Returns:
+            _Subscription: The connection's subscription, or None if LIVE_SCOREBOARD_MAX_CLIENTS are connected.
+        """
+        with self._condition:
+            if len(self._subscriptions) >= self._max_clients:
+                return None
+            subscription = _Subscription()
+            self._subscriptions.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._condition:
+            subscription.closed = True
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event_type, data):
+        """
+        Queues an event for every connected scoreboard.
+        """
+        if not self._subscriptions:
+            return
+        with self._condition:
+            message = f"id: {self._next_id}\nevent: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+            self._next_id += 1
+            for subscription in self._subscriptions:
+                if subscription.reset_pending:
+                    continue # The client re-fetches the scoreboard anyway
+                if event_type == RESET or subscription.pending_bytes + len(message) > self._client_buffer_bytes:
+                    self._reset(subscription)
+                else:
+                    subscription.messages.append(message)
+                    subscription.pending_bytes += len(message)
+            self._condition.notify_all()
+
+    def _reset(self, subscription):
+        subscription.messages.clear()
+        subscription.messages.append(_RESET_MESSAGE)
+        subscription.pending_bytes = len(_RESET_MESSAGE)
+        subscription.reset_pending = True
+
+    def reset(self):
+        """
+        Tells every connected scoreboard to re-fetch the whole scoreboard.
+        """
+        self.publish(RESET, {})
+
+    def disconnect_all(self):
+        """
+        Ends every connection, e.g. once the live scoreboard is disabled.
+        """
+        with self._condition:
+            for subscription in self._subscriptions:
+                subscription.closed = True
+            self._subscriptions.clear()
+            self._condition.notify_all()
+
+    def _take(self, subscription, timeout):
+        """
+        Waits up to timeout seconds for events and returns them, or None once the subscription is closed.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: subscription.messages or subscription.closed, timeout=timeout)
+            if subscription.closed:
+                return None
+            messages = list(subscription.messages)
+            subscription.messages.clear()
+            subscription.pending_bytes = 0
+            subscription.reset_pending = False
+            return messages
+
+    def stream(self, subscription):
+        """
+        Yields the Server-Sent Events of a subscription until it is closed or the client disconnects.
+        """
+        try:
+            # Reconnecting clients wait a few seconds, so that a restart does not see them all at once
+            yield "retry: 5000\n\n"
+            while (messages := self._take(subscription, self._keepalive_seconds)) is not None:
+                # An empty comment keeps proxies from closing idle connections and detects disconnected clients
+                yield "".join(messages) if messages else ": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+scoreboard_events = ScoreboardEventHub()
@@ -0,0 +1,145 @@
+"""
+This module verifies the reference solutions of many coding challenges at once, for
+`python app.py -verify-challenges` and POST /api/admin/verify_coding_challenges.
+
+Challenges are verified concurrently by a pool of up to VERIFICATION_MAX_PARALLEL threads, each
+running one challenge's test cases at a time through run_test_cases: results of unchanged
+challenges come from the execution result cache, and runs are spread over the sandbox executors
+when SANDBOX_EXECUTOR_ADDRESSES is configured. Every thread is its own low-priority flow of the
+fair-share scheduler, so verification yields to player submissions without being serialised
+behind itself. Only the verdict matters, so a challenge's run stops at its first failing test
+case, and solution_verified is updated for all challenges at once at the end. Runs that did not
+reach a verdict (superseded runs and sandbox or executor failures) leave it unchanged.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from scripts.code_execution import run_test_cases
+from scripts.execution_cache import is_infrastructure_error
+from scripts.execution_scheduler import PRIORITY_LOW
+from scripts.extensions import db
+from scripts.models import Challenge
+
+# Verification statuses of a challenge in the report
+VERIFIED = 'verified'
+FAILED = 'failed'
+SKIPPED = 'skipped' # Nothing to verify: no reference solution or no test cases
+ERROR = 'error' # Verification itself failed; solution_verified is left unchanged
+
+def _select_challenges(challenge_ids=None, category_id=None, unverified_only=False):
+    query = Challenge.query.filter_by(challenge_type='CODING')
+    if challenge_ids:
+        query = query.filter(Challenge.id.in_(challenge_ids))
+    if category_id is not None:
+        query = query.filter_by(category_id=category_id)
+    if unverified_only:
+        query = query.filter(Challenge.solution_verified.isnot(True))
+    return query.order_by(Challenge.id).all()
+
+def _verification_job(challenge):
+    """
+    Returns the plain values needed to verify a challenge, so that worker threads never touch the session.
+    """
+    test_cases = sorted(challenge.test_cases, key=lambda tc: tc.order)
+    return {
+        'challenge_id': challenge.id,
+        'name': challenge.name,
+        'language': challenge.language,
+        'reference_solution': challenge.reference_solution,
+        'setup_code': challenge.setup_code,
+        'test_cases': [(tc.input_source(), tc.expected_output_source()) for tc in test_cases],
+    }
+
+def _verify(job, flow):
+    """
+    Runs a challenge's reference solution against its test cases as the given scheduler flow
+    and returns its report entry.
+    """
+    entry = {
+        'challenge_id': job['challenge_id'],
+        'name': job['name'],
+        'test_cases': len(job['test_cases']),
+        'passed': 0,
+        'duration_seconds': 0.0,
+        'message': '',
+    }
+    if not job['reference_solution']:
+        return dict(entry, status=SKIPPED, message='No reference solution defined for this challenge.')
+    if not job['test_cases']:
+        return dict(entry, status=SKIPPED, message='No test cases defined for this coding challenge.')
+
+    started = time.monotonic()
+    try:
+        results = run_test_cases(
+            job['language'], job['reference_solution'], job['test_cases'],
+            setup_code=job['setup_code'],
+            challenge_id=job['challenge_id'],
+            user_id=flow,
+            priority=PRIORITY_LOW,
+            fail_fast=True
+        )
+    except Exception as e:
+        current_app.logger.exception(f"Verification of challenge {job['challenge_id']} failed")
+        return dict(entry, status=ERROR, duration_seconds=round(time.monotonic() - started, 3), message=str(e))
+
+    entry['duration_seconds'] = round(time.monotonic() - started, 3)
+    entry['passed'] = sum(1 for result in results if result.success)
+    failure = next((result for result in results if not result.success), None)
+    if failure is None:
+        return dict(entry, status=VERIFIED)
+    if failure.superseded or is_infrastructure_error(failure):
+        return dict(entry, status=ERROR, message=failure.error_message)
+    return dict(entry, status=FAILED, message=failure.error_message)
+
+def verify_coding_challenges(challenge_ids=None, category_id=None, unverified_only=False, max_parallel=None):
+    """
+    Verifies the reference solutions of the selected coding challenges in parallel and updates
+    their solution_verified flags. Must be called within an application context.
+
+    Args:
+        challenge_ids (list, optional): Only verify these challenges (default: every coding challenge).
+        category_id (int, optional): Only verify challenges of this category.
+        unverified_only (bool, optional): Skip challenges whose solution is already verified.
+        max_parallel (int, optional): Challenges verified at once (default: VERIFICATION_MAX_PARALLEL).
+
+    Returns:
+        dict: The report, with one entry per challenge under 'challenges' (in challenge ID order)
+            and the number of challenges per status.
+    """
+    started = time.monotonic()
+    jobs = [_verification_job(challenge) for challenge in _select_challenges(challenge_ids, category_id, unverified_only)]
+    if max_parallel is None:
+        max_parallel = current_app.config.get('VERIFICATION_MAX_PARALLEL') or current_app.config.get('CODE_EXECUTION_MAX_SANDBOXES') or 1
+    max_parallel = max(1, min(int(max_parallel), len(jobs) or 1))
+
+    app = current_app._get_current_object()
+    # One scheduler flow per pool thread, so that challenges are verified in parallel. Pool threads
+    # are named alike in every run, so the run ID keeps concurrent runs from superseding each other.
+    run_id = uuid.uuid4().hex
+    def verify_in_app_context(job):
+        with app.app_context():
+            return _verify(job, ('verification', run_id, threading.current_thread().name))
+
+    with ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix='verify') as executor:
+        entries = list(executor.map(verify_in_app_context, jobs))
+
+    for status, verified in ((VERIFIED, True), (FAILED, False)):
+        challenge_ids_with_status = [entry['challenge_id'] for entry in entries if entry['status'] == status]
+        if challenge_ids_with_status:
+            Challenge.query.filter(Challenge.id.in_(challenge_ids_with_status)).update(
+                {Challenge.solution_verified: verified}, synchronize_session=False
+            )
+    db.session.commit()
+
+    report = {status: sum(1 for entry in entries if entry['status'] == status) for status in (VERIFIED, FAILED, SKIPPED, ERROR)}
+    report.update({
+        'total': len(entries),
+        'max_parallel': max_parallel,
+        'duration_seconds': round(time.monotonic() - started, 3),
+        'challenges': entries,
+    })
+    return report
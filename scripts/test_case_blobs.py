@@ -0,0 +1,183 @@
+"""
+This module provides the content-addressed store for large test case inputs and expected outputs.
+
+Test case data of TEST_CASE_BLOB_THRESHOLD_BYTES or more is written to a file named after the
+SHA-256 of its content inside TEST_CASE_BLOB_DIR, and the TestCase row only keeps the digest
+(see TestCase.input_source and TestCase.expected_output_source). Runs never load such data into
+memory: inputs are opened as the sandbox's stdin (or hard-linked into batch sandboxes) and
+expected outputs are compared chunk by chunk while the program's output is read.
+Identical data is stored once, and blob files are never modified once written.
+
+Blob files are written when the TestCase is flushed, not when its data is assigned, and files no
+longer referenced by any TestCase are removed by collect_garbage, which runs after admins replace
+or delete test cases (and with `python app.py -collect-test-case-blobs`).
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import time
+
+class TestCaseBlob:
+    """
+    A reference to test case data kept in the blob store.
+    """
+    __test__ = False # Not a pytest test class
+
+    def __init__(self, digest, path):
+        self.digest = digest
+        self.path = path
+
+    @property
+    def size(self):
+        """
+        Size of the data in bytes.
+        """
+        return os.path.getsize(self.path)
+
+    def open_binary(self):
+        return open(self.path, 'rb')
+
+    def open_text(self):
+        # newline='' keeps line endings as stored, like data kept in the database
+        return open(self.path, 'r', encoding='utf-8', errors='replace', newline='')
+
+    def read_text(self, limit=-1):
+        """
+        Returns the data as a string, or its first `limit` characters.
+        """
+        with self.open_text() as f:
+            return f.read(limit)
+
+    def link_to(self, destination_path):
+        """
+        Makes the data available at destination_path, as a hard link if possible.
+        """
+        try:
+            os.link(self.path, destination_path)
+        except OSError:
+            # Hard links do not work across file systems
+            shutil.copyfile(self.path, destination_path)
+
+    def __eq__(self, other):
+        return isinstance(other, TestCaseBlob) and other.digest == self.digest
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __repr__(self):
+        return f"TestCaseBlob({self.digest})"
+
+# Blob file names: lowercase hex SHA-256 digests
+_DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+# Unreferenced blob files younger than this are kept, since they may belong to a
+# transaction that flushed its test cases but has not committed yet
+GC_GRACE_SECONDS = 3600
+
+class TestCaseBlobStore:
+    """
+    Stores test case data in files named after their SHA-256 digest.
+    """
+    __test__ = False
+
+    def __init__(self):
+        self._directory = None
+        self._threshold = 0
+
+    def init_app(self, app):
+        """
+        Reads TEST_CASE_BLOB_DIR and TEST_CASE_BLOB_THRESHOLD_BYTES (0 keeps all test case data in the database).
+        """
+        app.extensions['test_case_blob_store'] = self
+        self._directory = app.config.get('TEST_CASE_BLOB_DIR')
+        self._threshold = max(0, int(app.config.get('TEST_CASE_BLOB_THRESHOLD_BYTES', 64 * 1024)))
+
+    @property
+    def enabled(self):
+        return self._threshold > 0 and bool(self._directory)
+
+    def _path(self, digest):
+        return os.path.join(self._directory, digest[:2], digest)
+
+    def get(self, digest):
+        """
+        Returns the TestCaseBlob stored under a digest.
+
+        Raises:
+            ValueError: If digest is not a SHA-256 hex digest, e.g. a path sent by an executor client.
+        """
+        if not isinstance(digest, str) or not _DIGEST_PATTERN.fullmatch(digest):
+            raise ValueError(f"Invalid test case blob digest: {digest!r}")
+        if not self._directory:
+            raise RuntimeError("The test case blob store is not configured (TEST_CASE_BLOB_DIR)")
+        return TestCaseBlob(digest, self._path(digest))
+
+    def digest_if_large(self, text):
+        """
+        Returns the digest text is stored under if it has TEST_CASE_BLOB_THRESHOLD_BYTES or more,
+        or None if it should stay in the database. Nothing is written; see put.
+        """
+        if not self.enabled or not text:
+            return None
+        data = text.encode('utf-8')
+        if len(data) < self._threshold:
+            return None
+        return hashlib.sha256(data).hexdigest()
+
+    def put(self, text):
+        """
+        Stores text unless it is already stored and returns its digest.
+        """
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        try:
+            # Marks a shared file as in use again, so collect_garbage spares it until the transaction commits
+            os.utime(path)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Written under a temporary name and renamed, so readers never see a partial file
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp_')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.chmod(temp_path, 0o444)
+                os.replace(temp_path, path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+        return digest
+
+    def collect_garbage(self, referenced_digests, grace_seconds=GC_GRACE_SECONDS):
+        """
+        Removes blob files whose digest is not in referenced_digests and that were not written
+        or reused in the last grace_seconds, along with leftover temporary files.
+
+        Returns:
+            int: The number of files removed.
+        """
+        if not self._directory or not os.path.isdir(self._directory):
+            return 0
+        referenced_digests = set(referenced_digests)
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        for prefix in os.listdir(self._directory):
+            prefix_dir = os.path.join(self._directory, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if name in referenced_digests or not (_DIGEST_PATTERN.fullmatch(name) or name.startswith('.tmp_')):
+                    continue
+                path = os.path.join(prefix_dir, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass # Removed concurrently
+        return removed
+
+test_case_blob_store = TestCaseBlobStore()
@@ -0,0 +1,210 @@
+"""
+This module provides an opt-in pool of pre-spawned, already-sandboxed interpreters.
+
+Starting bwrap and the interpreter dominates the wall time of typical short python3 and
+nodejs solutions. Each warm interpreter runs a small bootstrap inside a fresh sandbox and
+blocks on stdin until it is handed a submission: a length-prefixed header with the code,
+followed by the test case input. It writes the code to /sandbox/user_code.<ext>, runs it
+as the main program and exits, so every sandbox still serves exactly one run. Used
+interpreters are replaced in the background.
+"""
+import shlex
+import subprocess
+import threading
+from collections import deque
+
+from scripts.sandbox_limits import SandboxLimits
+from scripts.sandbox_backends import get_sandbox_backend
+
+# Reads the code from stdin without buffering past it, so the remaining stdin is left
+# for the user's program, then runs it the way `python3 /sandbox/user_code.py` would
+_PYTHON_BOOTSTRAP = r'''
+import os, sys
+def _read_exactly(size):
+    data = b''
+    while len(data) < size:
+        chunk = os.read(0, size - len(data))
+        if not chunk:
+            sys.exit(0)
+        data += chunk
+    return data
+header = b''
+while not header.endswith(b'\n'):
+    header += _read_exactly(1)
+path = '/sandbox/user_code.py'
+with open(path, 'wb') as f:
+    f.write(_read_exactly(int(header)))
+import traceback, types
+main = types.ModuleType('__main__')
+main.__file__ = path
+sys.modules['__main__'] = main
+sys.argv = [path]
+sys.path[0] = '/sandbox'
+try:
+    with open(path, 'rb') as f:
+        code = compile(f.read(), path, 'exec')
+    exec(code, main.__dict__)
+except SystemExit:
+    raise
+except BaseException as e:
+    # Drop the bootstrap's own frame so tracebacks look like a normal run
+    traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+    sys.exit(1)
+'''
+
+_NODEJS_BOOTSTRAP = r'''
+const fs = require('fs');
+function readExactly(size) {
+  const buffer = Buffer.alloc(size);
+  let offset = 0;
+  while (offset < size) {
+    let count;
+    try { count = fs.readSync(0, buffer, offset, size - offset, null); }
+    catch (e) { if (e.code === 'EAGAIN') continue; throw e; }
+    if (count === 0) process.exit(0);
+    offset += count;
+  }
+  return buffer;
+}
+let header = '';
+while (!header.endsWith('\n')) header += readExactly(1).toString();
+const path = '/sandbox/user_code.js';
+fs.writeFileSync(path, readExactly(parseInt(header, 10)));
+process.argv[1] = path;
+require('module').runMain();
+'''
+
+# Language -> (interpreter option for inline code, bootstrap source)
+WARM_POOL_BOOTSTRAPS = {
+    'python3': ('-c', _PYTHON_BOOTSTRAP),
+    'nodejs': ('-e', _NODEJS_BOOTSTRAP),
+}
+
+def encode_submission(code, test_case_input=None):
+    """
+    Returns the bytes written to a warm interpreter's stdin: the code header followed by the input.
+    """
+    code_bytes = code.encode('utf-8')
+    return f"{len(code_bytes)}\n".encode('ascii') + code_bytes + (test_case_input or "").encode('utf-8')
+
+def _discard(process, sandbox_run):
+    """
+    Closes the pipes and limits of an interpreter that exited while it was idle.
+    """
+    for pipe in (process.stdin, process.stdout, process.stderr):
+        pipe.close()
+    sandbox_run.close()
+
+class WarmInterpreterPool:
+    """
+    Keeps up to WARM_POOL_SIZE idle sandboxed interpreters per supported language.
+    """
+    def __init__(self):
+        self._app = None
+        self._size = 0
+        self._languages = ()
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._refill_needed = threading.Event()
+        self._refill_thread = None
+
+    def init_app(self, app):
+        """
+        Reads WARM_POOL_SIZE and starts filling the pool for the enabled languages it supports.
+        """
+        from scripts.config import get_enabled_language_configs
+        self._app = app
+        app.extensions['warm_interpreter_pool'] = self
+        self._size = max(0, int(app.config.get('WARM_POOL_SIZE', 0)))
+        if self._size and not get_sandbox_backend(app.config).supports_warm_pool:
+            app.logger.warning(f"The {get_sandbox_backend(app.config).name} sandbox backend does not support the warm interpreter pool. Disabling it.")
+            self._size = 0
+        if not self._size:
+            return
+
+        with app.app_context():
+            enabled_languages = get_enabled_language_configs()
+        self._languages = tuple(language for language in WARM_POOL_BOOTSTRAPS if language in enabled_languages)
+        for language in self._languages:
+            self._idle.setdefault(language, deque())
+        self.start()
+
+    @property
+    def enabled(self):
+        return self._size > 0
+
+    def start(self):
+        with self._lock:
+            if self._refill_thread is not None:
+                return
+            self._refill_thread = threading.Thread(target=self._refill_loop, name="warm-interpreter-pool", daemon=True)
+            self._refill_thread.start()
+        self._refill_needed.set()
+
+    def acquire(self, language):
+        """
+        Takes an idle interpreter for the language out of the pool.
+
+        Returns:
+            tuple: (subprocess.Popen, SandboxRun) for a process waiting for a submission on stdin,
+                or None if none is ready. The caller reaps the process through the SandboxRun.
+        """
+        if language not in self._languages:
+            return None
+
+        interpreter = None
+        with self._lock:
+            idle = self._idle[language]
+            while idle:
+                candidate = idle.popleft()
+                if candidate[0].poll() is None:
+                    interpreter = candidate
+                    break
+                _discard(*candidate)
+        self._refill_needed.set()
+        return interpreter
+
+    def idle_count(self, language):
+        with self._lock:
+            return sum(1 for process, _ in self._idle.get(language, ()) if process.poll() is None)
+
+    def _refill_loop(self):
+        # Interpreters are spawned from this long-lived thread because bwrap's --die-with-parent
+        # kills the sandbox as soon as the thread that started it exits
+        while True:
+            self._refill_needed.wait()
+            self._refill_needed.clear()
+            for language in self._languages:
+                with self._lock:
+                    idle = self._idle[language]
+                    for interpreter in [interpreter for interpreter in idle if interpreter[0].poll() is not None]:
+                        idle.remove(interpreter)
+                        _discard(*interpreter)
+                    missing = self._size - len(idle)
+                # Spawn at most one pool's worth per pass, so a runtime that dies on start-up cannot spin this loop
+                for _ in range(missing):
+                    interpreter = self._spawn(language)
+                    if interpreter is None:
+                        break # Retried on the next acquire
+                    with self._lock:
+                        self._idle[language].append(interpreter)
+
+    def _spawn(self, language):
+        from scripts.code_execution import LANGUAGE_CONFIGS, _build_bwrap_args
+        runtime_host_path, file_extension, execute_cmd_template, language_binds_config = LANGUAGE_CONFIGS[language]
+        inline_option, bootstrap = WARM_POOL_BOOTSTRAPS[language]
+        # The interpreter as invoked by the language's run command, e.g. 'python3'
+        interpreter = shlex.split(execute_cmd_template)[0]
+
+        bwrap_cmd = _build_bwrap_args(language) + ['--', interpreter, inline_option, bootstrap]
+        # CPU time spent idle is negligible, so warm interpreters get the same limits as cold runs
+        sandbox_run = SandboxLimits.from_config(self._app.config).start_run(language)
+        try:
+            process = subprocess.Popen(sandbox_run.wrap_command(bwrap_cmd), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            sandbox_run.close()
+            self._app.logger.error(f"Could not start a warm {language} interpreter: {e}")
+            return None
+        return process, sandbox_run
+
+warm_interpreter_pool = WarmInterpreterPool()
@@ -30,6 +30,27 @@ document.addEventListener('DOMContentLoaded', function() {
     let currentChallengeLanguage = null;
     let codeMirrorEditor = null; // Initialize CodeMirror editor here
     const loadedCodeMirrorModes = {}; // Keep track of loaded modes
+    const CODE_JOB_POLL_INTERVAL_MS = 1000;
+
+    // Polls a queued code execution job until it finishes and resolves with its result payload
+    function waitForCodeJob(job, onProgress) {
+        return new Promise((resolve, reject) => {
+            const poll = () => {
+                fetch(job.status_url)
+                    .then(response => response.json())
+                    .then(jobStatus => {
+                        if (['DONE', 'FAILED', 'SUPERSEDED'].includes(jobStatus.status)) {
+                            resolve(jobStatus.result || { success: false, message: 'Code execution failed.' });
+                            return;
+                        }
+                        if (onProgress) onProgress(jobStatus);
+                        setTimeout(poll, CODE_JOB_POLL_INTERVAL_MS);
+                    })
+                    .catch(reject);
+            };
+            poll();
+        });
+    }
 
     function getCodeMirrorMode(language) {
         const lowerCaseLang = language.toLowerCase();
@@ -338,6 +359,90 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Renders the result of one test case of a coding submission
+    function renderTestCaseResult(result, index) {
+        const testCaseDiv = document.createElement('div');
+        if (result.skipped) {
+            // Not run because an earlier test case already failed
+            testCaseDiv.className = 'p-2 my-2 rounded border';
+            testCaseDiv.innerHTML = `<h5>Test Case ${index + 1}: SKIPPED ⏭️</h5><p>${escapeHtml(result.error_message || '')}</p>`;
+            return testCaseDiv;
+        }
+        testCaseDiv.className = `p-2 my-2 rounded ${result.passed ? 'theme-status-completed' : 'theme-expired-badge'} text-white`;
+
+        let outputDetail = '';
+        if (!result.passed) {
+            outputDetail = `
+                <p><strong>Input:</strong> <pre>${escapeHtml(result.input_data || '')}</pre></p>
+                <p><strong>Expected:</strong> <pre>${escapeHtml(result.expected_output || '')}</pre></p>
+                <p><strong>Actual:</strong> <pre>${escapeHtml(result.actual_output || '')}</pre></p>
+                ${result.stderr ? `<p><strong>Error:</strong> <pre>${escapeHtml(result.stderr)}</pre></p>` : ''}
+                ${result.error_message ? `<p><strong>Message:</strong> ${escapeHtml(result.error_message)}</p>` : ''}
+                ${result.is_timeout ? `<p><strong>Timeout:</strong> Yes</p>` : ''}
+            `;
+        } else {
+            outputDetail = `
+                <p><strong>Input:</strong> <pre>${escapeHtml(result.input_data || '')}</pre></p>
+                <p><strong>Output:</strong> <pre>${escapeHtml(result.actual_output || '')}</pre></p>
+            `;
+        }
+
+        testCaseDiv.innerHTML = `
+            <h5>Test Case ${index + 1}: ${result.passed ? 'PASSED ✅' : 'FAILED ❌'}</h5>
+            ${outputDetail}
+        `;
+        return testCaseDiv;
+    }
+
+    // Reads the NDJSON events of the streaming submit_code endpoint, showing every test case
+    // result as soon as it is available, and resolves with the final response payload
+    function readCodeResultStream(response) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const liveResults = document.createElement('div');
+        liveResults.innerHTML = `<h4>Test Results:</h4>`;
+        codeResult.innerHTML = '';
+        codeResult.appendChild(liveResults);
+        let placeholders = [];
+        let buffer = '';
+        let finalPayload = null;
+
+        const handleEvent = event => {
+            if (event.event === 'start') {
+                placeholders = Array.from({ length: event.test_case_count }, (_, index) => {
+                    const placeholder = document.createElement('div');
+                    placeholder.className = 'p-2 my-2 rounded border';
+                    placeholder.innerHTML = `<h5>Test Case ${index + 1}: Running...</h5>`;
+                    liveResults.appendChild(placeholder);
+                    return placeholder;
+                });
+            } else if (event.event === 'test_case' && placeholders[event.index]) {
+                const rendered = renderTestCaseResult(event.result, event.index);
+                placeholders[event.index].replaceWith(rendered);
+                placeholders[event.index] = rendered;
+            } else if (event.event === 'done') {
+                finalPayload = event.result;
+            } else if (event.event === 'error') {
+                finalPayload = { success: false, message: event.message };
+            }
+        };
+
+        const pump = () => reader.read().then(({ done, value }) => {
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+            let newline;
+            while ((newline = buffer.indexOf('\n')) >= 0) {
+                const line = buffer.slice(0, newline).trim();
+                buffer = buffer.slice(newline + 1);
+                if (line) handleEvent(JSON.parse(line));
+            }
+            if (done) {
+                return finalPayload || { success: false, message: 'The connection was closed before the verdict was received.' };
+            }
+            return pump();
+        });
+        return pump();
+    }
+
     modalRunCodeButton.addEventListener('click', function() {
         if (!codeMirrorEditor) return;
 
@@ -347,7 +452,9 @@ document.addEventListener('DOMContentLoaded', function() {
         codeResult.classList.remove('hidden');
         codeResult.textContent = 'Running code...';
 
-        fetch(`/api/challenges/${currentChallengeId}/submit_code`, { // Fixed URL
+        // Results are streamed as test cases finish where the browser can read response bodies incrementally
+        const canStream = window.ReadableStream && window.TextDecoder;
+        fetch(`/api/challenges/${currentChallengeId}/submit_code${canStream ? '/stream' : ''}`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -366,7 +473,19 @@ document.addEventListener('DOMContentLoaded', function() {
                 showFlashMessage('Code execution failed due to server error.', 'danger');
                 return; // Stop further processing in this then block
             }
-            return response.json();
+            if ((response.headers.get('Content-Type') || '').includes('application/x-ndjson')) {
+                return readCodeResultStream(response);
+            }
+            return response.json(); // Queued jobs are answered with JSON
+        })
+        .then(data => {
+            if (data && data.job_id) {
+                codeResult.textContent = 'Queued for execution...';
+                return waitForCodeJob(data, jobStatus => {
+                    codeResult.textContent = jobStatus.status === 'RUNNING' ? 'Running code...' : 'Queued for execution...';
+                });
+            }
+            return data;
         })
         .then(data => {
             const resultsHtml = document.createElement('div');
@@ -374,31 +493,7 @@ document.addEventListener('DOMContentLoaded', function() {
             
             if (data.test_case_results && data.test_case_results.length > 0) {
                 data.test_case_results.forEach((result, index) => {
-                    const testCaseDiv = document.createElement('div');
-                    testCaseDiv.className = `p-2 my-2 rounded ${result.passed ? 'theme-status-completed' : 'theme-expired-badge'} text-white`;
-                    
-                    let outputDetail = '';
-                    if (!result.passed) {
-                        outputDetail = `
-                            <p><strong>Input:</strong> <pre>${escapeHtml(result.input_data || '')}</pre></p>
-                            <p><strong>Expected:</strong> <pre>${escapeHtml(result.expected_output || '')}</pre></p>
-                            <p><strong>Actual:</strong> <pre>${escapeHtml(result.actual_output || '')}</pre></p>
-                            ${result.stderr ? `<p><strong>Error:</strong> <pre>${escapeHtml(result.stderr)}</pre></p>` : ''}
-                            ${result.error_message ? `<p><strong>Message:</strong> ${escapeHtml(result.error_message)}</p>` : ''}
-                            ${result.is_timeout ? `<p><strong>Timeout:</strong> Yes</p>` : ''}
-                        `;
-                    } else {
-                        outputDetail = `
-                            <p><strong>Input:</strong> <pre>${escapeHtml(result.input_data || '')}</pre></p>
-                            <p><strong>Output:</strong> <pre>${escapeHtml(result.actual_output || '')}</pre></p>
-                        `;
-                    }
-
-                    testCaseDiv.innerHTML = `
-                        <h5>Test Case ${index + 1}: ${result.passed ? 'PASSED ✅' : 'FAILED ❌'}</h5>
-                        ${outputDetail}
-                    `;
-                    resultsHtml.appendChild(testCaseDiv);
+                    resultsHtml.appendChild(renderTestCaseResult(result, index));
                 });
             } else {
                 resultsHtml.innerHTML += `<p>${escapeHtml(data.message || 'No detailed test results available.')}</p>`;
@@ -657,6 +752,7 @@ document.addEventListener('DOMContentLoaded', function() {
             body: formData
         })
         .then(response => response.json())
+        .then(data => data.job_id ? waitForCodeJob(data) : data)
         .then(data => {
             showFlashMessage(data.message, data.success ? 'success' : 'danger');
 
@@ -17,6 +17,21 @@ function getChartColors() {
     ];
 }
 
+// Decodes a series in the compact encoding ({t: [epoch ms], y: [...], interned: {key: [values]}})
+// into {x, y, ...} points; series that are already lists of points are returned as they are
+function decodeCompactSeries(series) {
+    if (!series || Array.isArray(series)) return series;
+    const interned = series.interned || {};
+    const keys = Object.keys(series).filter(key => key !== 't' && key !== 'interned');
+    return series.t.map((t, i) => {
+        const point = {x: t};
+        keys.forEach(key => {
+            point[key] = interned[key] ? interned[key][series[key][i]] : series[key][i];
+        });
+        return point;
+    });
+}
+
 document.addEventListener('DOMContentLoaded', function() {
     const chartTextColor = getCssVariable('--chart-label-color');
     Chart.defaults.color = chartTextColor;
@@ -77,8 +92,8 @@ document.addEventListener('DOMContentLoaded', function() {
         const profileStatsData = profileStatsDataElement ? JSON.parse(profileStatsDataElement.textContent) : {};
         const profileChartsData = profileChartsDataElement ? JSON.parse(profileChartsDataElement.textContent) : {};
 
-        const targetUserScoreHistory = profileChartsData.target_user_score_history;
-        const globalStatsOverTime = profileChartsData.global_stats_over_time;
+        const targetUserScoreHistory = decodeCompactSeries(profileChartsData.target_user_score_history);
+        const globalStatsOverTime = decodeCompactSeries(profileChartsData.global_stats_over_time);
 
         if (targetUserScoreHistory && targetUserScoreHistory.length > 0) {
             const ctx = document.getElementById('pointsOverTimeChart').getContext('2d');
@@ -361,7 +376,7 @@ document.addEventListener('DOMContentLoaded', function() {
     // 4. Challenges Complete Chart
     const challengesCompleteDataElement = document.getElementById('challenges-complete-data');
     if (challengesCompleteDataElement) {
-        const challengesCompleteData = JSON.parse(challengesCompleteDataElement.textContent);
+        const challengesCompleteData = decodeCompactSeries(JSON.parse(challengesCompleteDataElement.textContent));
         if (challengesCompleteData && challengesCompleteData.length > 0) {
             const ctx = document.getElementById('challengesCompleteChart').getContext('2d');
             createChart(ctx, 'line', {
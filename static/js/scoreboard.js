@@ -1,19 +1,128 @@
 document.addEventListener('DOMContentLoaded', function() {
     let scoreboardChart; // Declare chart globally so it can be updated
     let allPlayersRanked = []; // Store the current state of ranked players
-    
+    let topX = 10; // Number of players drawn on the graph
+    let version = null; // Data version of the drawn score history
+    let liveEvents = null; // EventSource of the live score stream
+    let pollTimer = null;
+    let reloadTimer = null;
+    const POLL_INTERVAL_MS = 30000; // Used while live updates are disabled
+
+    // With useDelta, only the score history added since the drawn version is downloaded
+    function loadScoreboard(useDelta) {
+        // About one point per pixel of the graph; the server down-samples longer histories
+        const points = Math.max(100, Math.round(document.getElementById('scoreboardChart').clientWidth || 0));
+        const url = useDelta && version
+            ? `/api/scoreboard_data?format=compact&points=${points}&since=${encodeURIComponent(version)}`
+            : `/api/scoreboard_data?format=compact&points=${points}`;
+        return fetch(url)
+            .then(response => response.json())
+            .then(decodeScoreboard)
+            .then(data => {
+                topX = data.top_x || topX;
+                if (!data.delta) {
+                    renderScoreboardGraph(data.top_players_history, data.graph_type);
+                } else if (!applyHistoryDelta(data)) {
+                    return loadScoreboard(false);
+                }
+                version = data.version;
+                populatePlayerRankings(data.all_players_ranked);
+                allPlayersRanked = data.all_players_ranked; // Initialize the ranked players data
+                if (data.live_updates) {
+                    if (!liveEvents) connectLiveUpdates();
+                } else if (!pollTimer) {
+                    pollTimer = setInterval(() => loadScoreboard(true), POLL_INTERVAL_MS);
+                }
+            })
+            .catch(error => console.error('Error fetching scoreboard data:', error));
+    }
+
+    // Turns the compact encoding (usernames interned to their index in the ranking, score
+    // histories as parallel arrays of epoch milliseconds and scores) into the plain one
+    function decodeScoreboard(data) {
+        if (data.encoding !== 'compact') return data;
+        const topPlayersHistory = {};
+        data.top_players_history.forEach(series => {
+            topPlayersHistory[data.users[series.u]] = series.t.map((t, i) => ({x: t, y: series.y[i]}));
+        });
+        return Object.assign({}, data, {
+            all_players_ranked: data.users.map((username, i) => ({username: username, score: data.scores[i]})),
+            top_players_history: topPlayersHistory,
+            top_players: data.top_players ? data.top_players.map(u => data.users[u]) : undefined
+        });
+    }
+
+    // Returns false if the players drawn on the graph changed, as their history is then needed in full
+    function applyHistoryDelta(data) {
+        const datasets = scoreboardChart ? scoreboardChart.data.datasets : [];
+        const drawnPlayers = datasets.map(dataset => dataset.label);
+        if (drawnPlayers.length !== data.top_players.length || !data.top_players.every(player => drawnPlayers.includes(player))) {
+            return false;
+        }
+        let changed = false;
+        datasets.forEach(dataset => {
+            const points = data.top_players_history[dataset.label] || [];
+            if (points.length) {
+                dataset.data.push(...points);
+                changed = true;
+            }
+        });
+        if (changed) scoreboardChart.update();
+        return true;
+    }
+
+    // Re-fetches the scoreboard at most once per second, however many resets arrive
+    function scheduleReload() {
+        if (reloadTimer) return;
+        reloadTimer = setTimeout(() => {
+            reloadTimer = null;
+            loadScoreboard(true);
+        }, 1000);
+    }
+
+    // Score changes are pushed by the server, so the history is downloaded only once
+    function connectLiveUpdates() {
+        liveEvents = new EventSource('/api/scoreboard_events');
+        liveEvents.addEventListener('solve', event => applyScoreChange(JSON.parse(event.data), true));
+        liveEvents.addEventListener('award', event => applyScoreChange(JSON.parse(event.data), false));
+        liveEvents.addEventListener('reset', scheduleReload);
+        liveEvents.onerror = function() {
+            // Events sent while disconnected are lost, so the missed history is fetched once
+            // EventSource has reconnected on its own
+            if (liveEvents.readyState === EventSource.CLOSED) {
+                // Refused, e.g. because the live scoreboard was disabled: poll instead
+                liveEvents = null;
+                if (!pollTimer) pollTimer = setInterval(() => loadScoreboard(true), POLL_INTERVAL_MS);
+            } else {
+                scheduleReload();
+            }
+        };
+    }
+
+    function applyScoreChange(change, isSolve) {
+        const dataset = scoreboardChart ? scoreboardChart.data.datasets.find(d => d.label === change.user) : null;
+        if (Boolean(dataset) !== (change.graph_rank <= topX)) {
+            // The player joined or left the players drawn on the graph, whose history we do not have
+            scheduleReload();
+            return;
+        }
+        if (dataset && isSolve) {
+            dataset.data.push({x: change.timestamp, y: change.y});
+            scoreboardChart.update();
+        }
+        version = change.version;
+
+        const index = allPlayersRanked.findIndex(player => player.username === change.user);
+        const player = index >= 0 ? allPlayersRanked.splice(index, 1)[0] : {username: change.user};
+        player.score = change.score;
+        allPlayersRanked.splice(change.rank - 1, 0, player);
+        if (isSolve || index < 0) {
+            populatePlayerRankings(allPlayersRanked);
+        }
+    }
+
     // Always fetch initial scoreboard data
-    fetch('/api/scoreboard_data')
-        .then(response => response.json())
-        .then(data => {
-            // Live score graph functionality is removed, so always try to render if data is available
-            renderScoreboardGraph(data.top_players_history, data.graph_type);
-            populatePlayerRankings(data.all_players_ranked);
-            allPlayersRanked = data.all_players_ranked; // Initialize the ranked players data
-        })
-        .catch(error => console.error('Error fetching scoreboard data:', error));
-
-    // Socket.IO integration removed. Live updates will no longer be handled client-side via websockets.
+    loadScoreboard(false);
 
     function renderScoreboardGraph(topPlayersHistory, graphType) {
         const ctx = document.getElementById('scoreboardChart').getContext('2d');
@@ -0,0 +1,29 @@
+import asyncio
+
+from flask import Flask
+
+from scripts.async_execution import execute_code_in_sandbox_async, execute_test_cases_async
+from scripts.config import TestConfig
+
+def _run(coroutine, **config):
+    app = Flask(__name__)
+    app.config.from_object(TestConfig)
+    app.config.update(SANDBOX_FAKE_LATENCY_MS=0, **config)
+    with app.app_context():
+        return asyncio.run(coroutine)
+
+def test_async_runs_match_sync_results():
+    # The fake runtime echoes the input, whatever the code
+    results = _run(execute_test_cases_async('python3', "print('ignored')", [('a', 'a'), ('b', 'c'), ('d', 'd')]), SANDBOX_BACKEND='fake')
+    assert [result.success for result in results] == [True, False, True]
+    assert results[1].error_message.startswith("Output mismatch.")
+    assert results[0].wall_time_seconds is not None
+
+def test_async_run_stops_on_oversized_output():
+    result = _run(execute_code_in_sandbox_async('python3', "print('x')", 'short', test_case_input='y' * 100000), SANDBOX_BACKEND='fake')
+    assert not result.success
+    assert "Output exceeded the limit" in result.error_message
+
+def test_async_run_of_real_code():
+    result = _run(execute_code_in_sandbox_async('python3', "print(input()[::-1])", 'cba', test_case_input='abc'), SANDBOX_BACKEND='rlimit')
+    assert result.success, result.error_message
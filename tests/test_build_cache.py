@@ -0,0 +1,45 @@
+import os
+
+from flask import Flask
+
+from scripts.build_cache import BuildArtifactCache
+from scripts.code_execution import CodeExecutionResult
+
+def _cache(tmp_path, size):
+    app = Flask(__name__)
+    app.config.update(BUILD_CACHE_SIZE=size, BUILD_CACHE_DIR=str(tmp_path))
+    cache = BuildArtifactCache()
+    cache.init_app(app)
+    return cache
+
+def _artifact(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+def test_artifacts_survive_eviction_once_linked(tmp_path):
+    cache = _cache(tmp_path, 1)
+    cache.put('a', _artifact(tmp_path, 'a.dill', b'A'))
+    destination = tmp_path / 'run'
+    destination.mkdir()
+    assert cache.fetch('a', str(destination / 'a.dill')) == (True, None)
+
+    cache.put('b', _artifact(tmp_path, 'b.dill', b'B')) # Evicts 'a'
+    assert cache.fetch('a', str(destination / 'other.dill')) == (False, None)
+    assert (destination / 'a.dill').read_bytes() == b'A'
+    assert len(cache) == 1
+
+def test_only_deterministic_failures_are_cached(tmp_path):
+    cache = _cache(tmp_path, 4)
+    compile_error = CodeExecutionResult(False, "", "error", "Compilation failed with exit code 1.")
+    cache.put_failure('broken', compile_error)
+    cache.put_failure('slow', CodeExecutionResult(False, "", "", "Compilation timed out.", is_timeout=True))
+    assert cache.fetch('broken', str(tmp_path / 'unused')) == (True, compile_error)
+    assert not os.path.exists(tmp_path / 'unused')
+    assert cache.fetch('slow', str(tmp_path / 'unused')) == (False, None)
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = _cache(tmp_path, 0)
+    cache.put('a', _artifact(tmp_path, 'a.dill', b'A'))
+    assert not cache.enabled
+    assert cache.fetch('a', str(tmp_path / 'copy.dill')) == (False, None)
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from scripts.chart_data_utils import lttb_indices, downsample_points, compact_series, compact_profile_charts_data, get_global_score_history_data
+
+def test_lttb_keeps_the_shape_of_a_series():
+    xs = list(range(10000))
+    ys = [0] * 10000
+    ys[4321] = 500 # A single spike must survive down-sampling
+    indices = lttb_indices(xs, ys, 100)
+    assert len(indices) == 100 and indices == sorted(indices)
+    assert indices[0] == 0 and indices[-1] == 9999 and 4321 in indices
+
+    assert lttb_indices(xs[:50], ys[:50], 100) == list(range(50))
+
+def test_downsample_points_of_a_score_history():
+    start = datetime(2026, 1, 1)
+    history = [{'x': (start + timedelta(minutes=i)).isoformat(), 'y': i * 10} for i in range(1000)]
+    sampled = downsample_points(history, 20)
+    assert len(sampled) == 20 and sampled[0] == history[0] and sampled[-1] == history[-1]
+    assert downsample_points(history, None) is history
+
+def test_compact_series_uses_parallel_arrays():
+    points = [
+        {'x': '1970-01-01T00:00:01+00:00', 'y': 10, 'category': 'Web'},
+        {'x': '1970-01-01T00:00:02', 'y': 30, 'category': 'Crypto'},
+        {'x': '1970-01-01T01:00:02+01:00', 'y': 40, 'category': 'Web'},
+    ]
+    assert compact_series(points, ('y',), ('category',)) == {
+        't': [1000, 2000, 2000], 'y': [10, 30, 40], 'category': [0, 1, 0], 'interned': {'category': ['Web', 'Crypto']}
+    }
+    compact = compact_profile_charts_data({'points_over_time': points, 'challenges_complete': []})
+    assert compact['encoding'] == 'compact' and compact['points_over_time']['y'] == [10, 30, 40]
+    assert compact['challenges_complete'] == []
+
+def test_global_score_history_series_share_their_timestamps():
+    from app import create_app
+    from scripts.config import TestConfig
+    from scripts.extensions import db
+    from scripts.models import User, Category, Challenge, Submission
+    app = create_app(config_class=TestConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        users = [User(username=name, email=f'{name}@example.com', password_hash='x') for name in ('alice', 'bob')]
+        category = Category(name='History')
+        db.session.add_all(users + [category])
+        db.session.commit()
+        challenge = Challenge(name='daily', description='d', points=10, category_id=category.id)
+        db.session.add(challenge)
+        db.session.commit()
+        # Solves on 60 days, alternating between the users
+        start = datetime(2026, 1, 1, 12, 0)
+        for day in range(60):
+            db.session.add(Submission(user_id=users[day % 2].id, challenge_id=challenge.id, timestamp=start + timedelta(days=day), score_at_submission=0))
+        db.session.commit()
+
+        full = get_global_score_history_data()
+        sampled = get_global_score_history_data(max_points=20)
+        timestamps = [point['x'] for point in sampled['global_stats_over_time']]
+        assert len(timestamps) == 20 and len(full['global_stats_over_time']) > 20
+        for username in ('alice', 'bob'):
+            assert [point['x'] for point in sampled['user_scores_over_time'][username]] == timestamps
+        # The kept points carry the same values as in the full series
+        full_alice = {point['x']: point['y'] for point in full['user_scores_over_time']['alice']}
+        assert all(full_alice[point['x']] == point['y'] for point in sampled['user_scores_over_time']['alice'])
+        db.drop_all()
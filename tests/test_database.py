@@ -30,3 +30,25 @@ def test_database_connection_and_schema_creation(test_client):
     # We can try to query a model, which would fail if tables weren't created.
     from scripts.models import User
     assert db.session.query(User).first() is None
+
+def test_failure_rates_per_test_case(test_client):
+    """
+    Failure rates are computed from the recorded runs of each test case.
+    """
+    from scripts.models import User, Category, Challenge, TestCase, CodeExecutionRecord
+    user = User(username='rates_user', email='rates@example.com', password_hash='x')
+    category = Category(name='Rates')
+    db.session.add_all([user, category])
+    db.session.commit()
+    challenge = Challenge(name='Rates Challenge', description='d', points=10, category_id=category.id, challenge_type='CODING', language='python3')
+    db.session.add(challenge)
+    db.session.commit()
+    easy, hard = TestCase(challenge_id=challenge.id, expected_output='1', order=0), TestCase(challenge_id=challenge.id, expected_output='2', order=1)
+    db.session.add_all([easy, hard])
+    db.session.commit()
+    for test_case, outcomes in [(easy, [True, True, True, False]), (hard, [False, False])]:
+        for success in outcomes:
+            db.session.add(CodeExecutionRecord(user_id=user.id, challenge_id=challenge.id, test_case_id=test_case.id, success=success))
+    db.session.commit()
+
+    assert CodeExecutionRecord.failure_rates(challenge.id) == {easy.id: 0.25, hard.id: 1.0}
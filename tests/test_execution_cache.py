@@ -0,0 +1,42 @@
+from scripts.code_execution import CodeExecutionResult
+from scripts.execution_cache import ExecutionResultCache, make_cache_key
+
+def _result(success=True, is_timeout=False, error_message=""):
+    return CodeExecutionResult(success, "out", "", error_message, is_timeout=is_timeout)
+
+def test_cache_key_depends_on_every_input():
+    base = ('python3', '/usr/bin/python3', 'print(1)', None, '', '1', 5)
+    key = make_cache_key(*base)
+    assert key == make_cache_key(*base)
+    for i, changed in [(2, 'print(2)'), (3, 'echo hi'), (4, 'x'), (5, '2')]:
+        args = list(base)
+        args[i] = changed
+        assert make_cache_key(*args) != key
+
+def test_lru_eviction():
+    cache = ExecutionResultCache(max_entries=2)
+    cache.put('a', _result())
+    cache.put('b', _result())
+    assert cache.get('a') is not None # 'a' becomes most recently used
+    cache.put('c', _result())
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    assert len(cache) == 2
+
+def test_timeouts_and_sandbox_errors_are_not_cached():
+    cache = ExecutionResultCache(max_entries=10)
+    cache.put('timeout', _result(False, is_timeout=True, error_message="Execution timed out."))
+    cache.put('missing', _result(False, error_message="bwrap or runtime not found. Check paths: x, y"))
+    cache.put('mismatch', _result(False, error_message="Output mismatch."))
+    assert cache.get('timeout') is None
+    assert cache.get('missing') is None
+    assert cache.get('mismatch') is not None
+
+def test_invalidate_challenge():
+    cache = ExecutionResultCache(max_entries=10)
+    cache.put('a', _result(), challenge_id=1)
+    cache.put('b', _result(), challenge_id=2)
+    cache.invalidate_challenge(1)
+    assert cache.get('a') is None
+    assert cache.get('b') is not None
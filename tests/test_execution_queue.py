@@ -0,0 +1,114 @@
+import pytest
+from app import create_app
+from scripts.extensions import db
+from scripts.config import TestConfig
+from scripts.execution_queue import execution_queue, register_job_handler
+
+class QueueTestConfig(TestConfig):
+    ENABLE_EXECUTION_QUEUE = True
+    EXECUTION_QUEUE_WORKERS = 2
+
+@register_job_handler('TEST_ECHO')
+def _echo_job(job):
+    if job.code == 'boom':
+        raise RuntimeError('handler failure')
+    return {'success': True, 'echo': job.code}
+
+@pytest.fixture(scope='module')
+def app():
+    """
+    Provides an application with the execution queue enabled and a user/challenge to attach jobs to.
+    """
+    app = create_app(config_class=QueueTestConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        from scripts.models import User, Category, Challenge
+        user = User(username='queue_user', email='queue@example.com', password_hash='x')
+        category = Category(name='Queue')
+        db.session.add_all([user, category])
+        db.session.commit()
+        challenge = Challenge(name='Queue Challenge', description='d', points=10, category_id=category.id, challenge_type='CODING', language='python3')
+        db.session.add(challenge)
+        db.session.commit()
+        app.config['TEST_USER_ID'] = user.id
+        app.config['TEST_CHALLENGE_ID'] = challenge.id
+        yield app
+        db.drop_all()
+
+def test_submitted_job_is_processed(app):
+    """
+    A submitted job is persisted as QUEUED, then picked up by a worker and its result stored.
+    """
+    from scripts.models import CodeExecutionJob
+    with app.test_request_context():
+        job = execution_queue.submit('TEST_ECHO', app.config['TEST_USER_ID'], app.config['TEST_CHALLENGE_ID'], 'hello')
+        job_id = job.id
+    execution_queue._queue.join()
+
+    with app.app_context():
+        job = db.session.get(CodeExecutionJob, job_id)
+        assert job.status == 'DONE'
+        assert job.result == {'success': True, 'echo': 'hello'}
+        assert job.started_at is not None and job.finished_at is not None
+
+    stats = execution_queue.get_stats()
+    assert stats['workers'] == 2
+    assert stats['queue_depth'] == 0
+    assert stats['jobs_completed'] >= 1
+
+def test_failing_handler_marks_job_failed(app):
+    from scripts.models import CodeExecutionJob
+    with app.test_request_context():
+        job_id = execution_queue.submit('TEST_ECHO', app.config['TEST_USER_ID'], app.config['TEST_CHALLENGE_ID'], 'boom').id
+    execution_queue._queue.join()
+
+    with app.app_context():
+        job = db.session.get(CodeExecutionJob, job_id)
+        assert job.status == 'FAILED'
+        assert job.result['success'] is False
+
+def test_interrupted_jobs_are_resumed(app):
+    """
+    Jobs left RUNNING by a stopped process are requeued and processed when the queue is initialised.
+    """
+    from scripts.models import CodeExecutionJob
+    with app.app_context():
+        job = CodeExecutionJob(kind='TEST_ECHO', user_id=app.config['TEST_USER_ID'], challenge_id=app.config['TEST_CHALLENGE_ID'], code='resumed', status='RUNNING')
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+
+    execution_queue.init_app(app)
+    execution_queue._queue.join()
+
+    with app.app_context():
+        job = db.session.get(CodeExecutionJob, job_id)
+        assert job.status == 'DONE'
+        assert job.result['echo'] == 'resumed'
+
+def test_newer_job_supersedes_queued_job(app):
+    """
+    A job still waiting for the user's running submission to finish is superseded by their next
+    job for the same challenge.
+    """
+    from scripts.models import CodeExecutionJob
+    from scripts.execution_scheduler import execution_scheduler
+    user_id, challenge_id = app.config['TEST_USER_ID'], app.config['TEST_CHALLENGE_ID']
+    running, _ = execution_scheduler.submit(user_id)
+    try:
+        with app.test_request_context():
+            earlier_id = execution_queue.submit('TEST_ECHO', user_id, challenge_id, 'earlier').id
+            newer_id = execution_queue.submit('TEST_ECHO', user_id, challenge_id, 'newer').id
+        # The newer job waits in the scheduler, not on the worker queue, but is part of the backlog
+        assert execution_queue.get_stats()['queue_depth'] == 1
+    finally:
+        execution_scheduler.release(running)
+    execution_queue._queue.join()
+
+    with app.app_context():
+        earlier = db.session.get(CodeExecutionJob, earlier_id)
+        assert earlier.status == 'SUPERSEDED'
+        assert earlier.result['superseded'] is True
+        assert db.session.get(CodeExecutionJob, newer_id).result == {'success': True, 'echo': 'newer'}
+    assert execution_queue.get_stats()['jobs_superseded'] >= 1
@@ -0,0 +1,83 @@
+from flask import Flask
+
+from scripts.execution_scheduler import FairShareScheduler, PRIORITY_LOW
+
+def _scheduler(**config):
+    app = Flask(__name__)
+    app.config.update({'EXECUTION_MAX_CONCURRENT_SUBMISSIONS': 1, 'EXECUTION_USER_MAX_CONCURRENT': 1}, **config)
+    scheduler = FairShareScheduler()
+    scheduler.init_app(app)
+    return scheduler
+
+def _drain(scheduler, order):
+    # Runs the dispatched tickets one after another, as sandbox workers would
+    while order['running']:
+        ticket = order['running'].pop(0)
+        order['dispatched'].append(ticket.user_id)
+        scheduler.release(ticket)
+
+def _recorder():
+    order = {'running': [], 'dispatched': []}
+    return order, order['running'].append
+
+def test_users_are_served_in_turn():
+    scheduler = _scheduler()
+    order, on_dispatch = _recorder()
+    blocker, _ = scheduler.submit('blocker')
+    for _ in range(3):
+        scheduler.submit('alice', on_dispatch=on_dispatch)
+    scheduler.submit('bob', on_dispatch=on_dispatch)
+    scheduler.submit('carol', cost=2, on_dispatch=on_dispatch)
+    scheduler.release(blocker)
+    _drain(scheduler, order)
+    # Carol's submission runs twice as many test cases, so it is charged twice as much
+    assert order['dispatched'] == ['alice', 'bob', 'alice', 'carol', 'alice']
+
+def test_per_user_limit():
+    scheduler = _scheduler(EXECUTION_MAX_CONCURRENT_SUBMISSIONS=3)
+    first, _ = scheduler.submit('alice')
+    second, _ = scheduler.submit('alice')
+    other, _ = scheduler.submit('bob')
+    assert first.event.is_set() and other.event.is_set()
+    assert not second.event.is_set()
+    scheduler.release(first)
+    assert second.event.is_set()
+
+def test_disabled_scheduler_does_not_limit_users():
+    scheduler = _scheduler(EXECUTION_MAX_CONCURRENT_SUBMISSIONS=0)
+    order, on_dispatch = _recorder()
+    for _ in range(3):
+        scheduler.submit('alice', on_dispatch=on_dispatch)
+    assert len(order['running']) == 3
+
+def test_low_priority_yields_to_players():
+    scheduler = _scheduler(EXECUTION_LOW_PRIORITY_WEIGHT=0.5)
+    order, on_dispatch = _recorder()
+    blocker, _ = scheduler.submit('blocker')
+    scheduler.submit('admin', cost=2, priority=PRIORITY_LOW, on_dispatch=on_dispatch)
+    for user in ['alice', 'bob', 'alice', 'bob', 'alice', 'bob']:
+        scheduler.submit(user, cost=2, on_dispatch=on_dispatch)
+    scheduler.release(blocker)
+    _drain(scheduler, order)
+    # Verification waits for a while, but is not starved by the players' later submissions
+    assert order['dispatched'] == ['alice', 'bob', 'admin', 'alice', 'bob', 'alice', 'bob']
+
+def test_waiting_submission_is_superseded():
+    scheduler = _scheduler()
+    blocker, _ = scheduler.submit('blocker')
+    earlier, _ = scheduler.submit('alice', supersede_key=('alice', 1))
+    other, _ = scheduler.submit('alice', supersede_key=('alice', 2))
+    newer, superseded = scheduler.submit('alice', supersede_key=('alice', 1))
+    assert superseded == [earlier]
+    assert earlier.superseded and earlier.event.is_set()
+    assert not other.superseded
+    assert scheduler.get_stats()['waiting'] == 2
+
+def test_admit_is_reentrant():
+    scheduler = _scheduler()
+    with scheduler.admit('alice') as ticket:
+        assert ticket is not None and not ticket.superseded
+        # Nested admissions of the thread (e.g. inside an execution queue job) do not queue again
+        with scheduler.admit('alice') as nested:
+            assert nested is None
+    assert scheduler.get_stats()['running'] == 0
@@ -0,0 +1,63 @@
+import pytest
+from flask import Flask
+
+from scripts import code_execution
+from scripts.code_execution import CodeExecutionResult
+from scripts.config import TestConfig
+from scripts.executor_service import SandboxExecutorClient, ExecutorServer, start_local_executor
+
+class ExecutorTestConfig(TestConfig):
+    SANDBOX_EXECUTOR_TOKEN = 'secret'
+
+def _fake_execute_test_cases(language, code, test_cases, setup_code=None, fail_fast=False):
+    results = []
+    for input_data, expected_output in test_cases:
+        result = CodeExecutionResult(input_data == expected_output, input_data, "", "" if input_data == expected_output else "Output mismatch.")
+        result.cpu_time_seconds = 0.01
+        results.append(result)
+    return results
+
+@pytest.fixture
+def executor(monkeypatch):
+    """
+    Provides an in-process executor whose sandbox runs echo the test case input.
+    """
+    monkeypatch.setattr(code_execution, 'execute_test_cases', _fake_execute_test_cases)
+    app = Flask(__name__)
+    app.config.from_object(ExecutorTestConfig)
+    server = start_local_executor(app)
+    yield app, server
+    server.shutdown()
+
+def _client(app, addresses, token='secret'):
+    client = SandboxExecutorClient()
+    app.config.update(SANDBOX_EXECUTOR_ADDRESSES=addresses, SANDBOX_EXECUTOR_TOKEN=token)
+    client.init_app(app)
+    return client
+
+def test_results_round_trip(executor):
+    app, server = executor
+    client = _client(app, server.address)
+    results = client.run_test_cases('python3', 'print(1)', [('1', '1'), ('2', '3')])
+    assert [result.success for result in results] == [True, False]
+    assert results[1].error_message == "Output mismatch."
+    assert results[0].cpu_time_seconds == 0.01
+    assert 'python3' in client.ping(server.address)['languages']
+
+def test_unreachable_executors_are_skipped(executor, tmp_path):
+    app, server = executor
+    client = _client(app, f"{tmp_path / 'missing.sock'},{server.address}")
+    for _ in range(3):
+        assert client.run_test_cases('python3', 'print(1)', [('1', '1')])[0].success
+
+def test_invalid_token_is_rejected(executor):
+    app, server = executor
+    result = _client(app, server.address, token='wrong').run_test_cases('python3', 'print(1)', [('1', '1')])[0]
+    assert not result.success
+    assert 'invalid executor token' in result.error_message
+
+def test_tcp_executors_require_a_token():
+    app = Flask(__name__)
+    app.config.from_object(TestConfig)
+    with pytest.raises(ValueError, match='SANDBOX_EXECUTOR_TOKEN'):
+        ExecutorServer(app, '127.0.0.1:0')
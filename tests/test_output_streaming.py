@@ -0,0 +1,35 @@
+import subprocess
+import sys
+from scripts.code_execution import _stream_process, MAX_OUTPUT_SIZE_BYTES
+
+def _stream(program, expected_output, input_bytes=b"", timeout=5):
+    process = subprocess.Popen([sys.executable, '-c', program], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return _stream_process(process, input_bytes, expected_output, timeout)
+
+def test_matching_output_runs_to_completion():
+    returncode, stdout, stderr, stop_reason = _stream("print(input()[::-1])\nprint()", "cba", input_bytes=b"abc\n")
+    assert (returncode, stdout.strip(), stop_reason) == (0, "cba", None)
+
+def test_output_split_across_writes_and_whitespace_is_accepted():
+    program = "import sys\nsys.stdout.write('  a'); sys.stdout.flush()\nsys.stdout.write('b \\n'); sys.stdout.flush()\nprint('c')"
+    returncode, stdout, stderr, stop_reason = _stream(program, "ab \nc")
+    assert stop_reason is None and returncode == 0
+
+def test_mismatch_stops_the_program_early():
+    returncode, stdout, stderr, stop_reason = _stream("import time\nprint('wrong', flush=True)\ntime.sleep(30)", "right")
+    assert stop_reason == 'mismatch'
+    assert stdout.strip() == "wrong"
+
+def test_endless_output_is_capped():
+    returncode, stdout, stderr, stop_reason = _stream("while True: print(' ' * 1000)", "")
+    assert stop_reason == 'output_limit'
+    assert len(stdout) <= MAX_OUTPUT_SIZE_BYTES
+
+def test_stderr_is_bounded_but_does_not_fail_the_run():
+    returncode, stdout, stderr, stop_reason = _stream("import sys\nfor i in range(5000): sys.stderr.write('e' * 100)\nprint('ok')", "ok")
+    assert stop_reason is None and returncode == 0
+    assert len(stderr) == MAX_OUTPUT_SIZE_BYTES
+
+def test_timeout():
+    returncode, stdout, stderr, stop_reason = _stream("import time\ntime.sleep(30)", "", timeout=0.5)
+    assert stop_reason == 'timeout'
@@ -0,0 +1,56 @@
+import pytest
+from flask import Flask
+
+from scripts import code_execution
+from scripts.config import TestConfig
+from scripts.sandbox_backends import BwrapBackend, FakeBackend, get_sandbox_backend
+
+def _app(**config):
+    app = Flask(__name__)
+    app.config.from_object(TestConfig)
+    app.config.update(config)
+    return app
+
+@pytest.mark.parametrize('mode', ['sequential', 'batch', 'parallel'])
+def test_fake_backend_runs_the_whole_pipeline(mode):
+    app = _app(SANDBOX_BACKEND='fake', SANDBOX_FAKE_LATENCY_MS=0, CODE_EXECUTION_MODE=mode)
+    with app.app_context():
+        # The fake runtime echoes the input, whatever the code
+        results = code_execution.execute_test_cases('python3', "print('ignored')", [('abc', 'abc'), ('abc', 'xyz')])
+        assert [result.success for result in results] == [True, False]
+        assert results[1].error_message.startswith("Output mismatch.")
+
+        failure = code_execution.execute_test_cases('python3', "print(1) # FAKE_ERROR", [('abc', 'abc')])[0]
+        assert "exit code 1" in failure.error_message
+
+        # Build steps are faked as well
+        assert code_execution.execute_test_cases('dart', "void main() { print('ok'); }", [('ok', 'ok')])[0].success
+
+def test_rlimit_backend_runs_real_code():
+    app = _app(SANDBOX_BACKEND='rlimit', CODE_EXECUTION_MODE='batch')
+    with app.app_context():
+        results = code_execution.execute_test_cases('python3', "print(input()[::-1])", [('abc', 'cba'), ('xy', 'yx')])
+        assert all(result.success for result in results), [result.error_message for result in results]
+
+def test_backend_selection():
+    assert isinstance(get_sandbox_backend({'SANDBOX_BACKEND': 'fake', 'SANDBOX_FAKE_LATENCY_MS': 5}), FakeBackend)
+    assert get_sandbox_backend({'SANDBOX_BACKEND': 'fake', 'SANDBOX_FAKE_LATENCY_MS': 5}).latency_ms == 5
+    # Unknown backends never silently drop isolation
+    assert isinstance(get_sandbox_backend({'SANDBOX_BACKEND': 'nsjail'}), BwrapBackend)
+
+@pytest.mark.parametrize('mode', ['sequential', 'batch', 'parallel'])
+def test_fail_fast_skips_remaining_test_cases(mode):
+    app = _app(SANDBOX_BACKEND='fake', SANDBOX_FAKE_LATENCY_MS=0, CODE_EXECUTION_MODE=mode, CODE_EXECUTION_MAX_PARALLEL=1)
+    with app.app_context():
+        results = code_execution.execute_test_cases('python3', "print(1)", [('a', 'a'), ('b', 'x'), ('c', 'c')], fail_fast=True)
+        assert [result.success for result in results] == [True, False, False]
+        assert [result.skipped for result in results] == [False, False, True]
+        assert results[2].error_message == code_execution.SKIPPED_MESSAGE
+
+def test_sandboxed_syntax_precheck():
+    app = _app(SANDBOX_BACKEND='fake', SANDBOX_FAKE_LATENCY_MS=0, ENABLE_BASH=True, SYNTAX_PRECHECK_SANDBOXED=True)
+    with app.app_context():
+        results = code_execution.execute_test_cases('bash', "echo 1 # FAKE_SYNTAX_ERROR", [('a', 'a'), ('b', 'b')])
+        assert [result.success for result in results] == [False, False]
+        assert "fake syntax error" in results[0].error_message
+        assert all(result.success for result in code_execution.execute_test_cases('bash', "cat", [('a', 'a'), ('b', 'b')]))
@@ -0,0 +1,64 @@
+import subprocess
+import sys
+
+import pytest
+
+from scripts.sandbox_limits import SandboxLimits
+
+
+def _run(limits, code, language='python3'):
+    sandbox_run = limits.start_run(language)
+    sandbox_run.mark_started()
+    process = subprocess.Popen(sandbox_run.wrap_command([sys.executable, '-c', code]), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    process.stdout.read()
+    process.stderr.read()
+    returncode = sandbox_run.wait(process, timeout=30)
+    process.stdout.close()
+    process.stderr.close()
+    sandbox_run.close()
+    return returncode, sandbox_run
+
+
+def test_usage_is_recorded():
+    returncode, sandbox_run = _run(SandboxLimits(), "x = 0\nwhile x < 3 * 10**6: x += 1")
+    assert returncode == 0
+    assert sandbox_run.cpu_time_seconds > 0
+    assert sandbox_run.peak_memory_kb > 0
+    assert sandbox_run.wall_time_seconds >= sandbox_run.cpu_time_seconds * 0.5
+
+
+def test_memory_limit_is_enforced():
+    returncode, _ = _run(SandboxLimits(memory_limit_mb=64), "x = 'a' * (256 * 1024 * 1024)")
+    assert returncode == 1 # MemoryError
+
+
+def test_cpu_time_limit_is_enforced():
+    returncode, sandbox_run = _run(SandboxLimits(cpu_time_limit_seconds=1), "while True: pass")
+    assert returncode in (-24, -9) # SIGXCPU, or SIGKILL at the hard limit
+    assert sandbox_run.cpu_time_seconds >= 0.9
+
+
+def test_wait_times_out():
+    sandbox_run = SandboxLimits().start_run('python3')
+    process = subprocess.Popen(sandbox_run.wrap_command([sys.executable, '-c', "import time; time.sleep(10)"]))
+    with pytest.raises(subprocess.TimeoutExpired):
+        sandbox_run.wait(process, timeout=0.2)
+    process.kill()
+    sandbox_run.wait(process)
+    assert process.returncode == -9
+
+
+def test_process_limit_is_opt_in_without_a_cgroup():
+    assert '--nproc=64' not in SandboxLimits(max_processes=64).start_run('python3').wrap_command(['true'])
+    assert '--nproc=64' in SandboxLimits(max_processes=64, nproc_rlimit=True).start_run('python3').wrap_command(['true'])
+    assert SandboxLimits(0, 0, 0).start_run('python3').wrap_command(['true']) == ['true']
+
+
+def test_cgroup_is_entered_by_the_started_process(tmp_path):
+    limits = SandboxLimits(cgroup_root=str(tmp_path))
+    sandbox_run = limits.start_run('python3')
+    process = subprocess.Popen(sandbox_run.wrap_command([sys.executable, '-c', 'import os; print(os.getpid())']), stdout=subprocess.PIPE)
+    stdout, _ = process.communicate(timeout=30)
+    # A plain directory stands in for the cgroup; the process moved into it is the command itself
+    with open(f"{sandbox_run.cgroup_path}/cgroup.procs") as f:
+        assert int(f.read()) == int(stdout) == process.pid
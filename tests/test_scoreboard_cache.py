@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+
+from app import create_app
+from scripts.extensions import db
+from scripts.config import TestConfig
+from scripts.scoreboard_cache import scoreboard_cache
+
+class ScoreboardTestConfig(TestConfig):
+    SCOREBOARD_CACHE_MAX_AGE_SECONDS = 0
+
+@pytest.fixture
+def app():
+    """
+    Provides an application with three players and two challenges; bob and carol tie on points.
+    """
+    app = create_app(config_class=ScoreboardTestConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        from scripts.models import User, Category, Challenge, Submission
+        category = Category(name='Scoreboard')
+        users = [User(username=name, email=f'{name}@example.com', password_hash='x') for name in ('alice', 'bob', 'carol', 'dave')]
+        users[3].hidden = True
+        db.session.add_all([category] + users)
+        db.session.commit()
+        easy = Challenge(name='easy', description='d', points=10, category_id=category.id)
+        hard = Challenge(name='hard', description='d', points=30, category_id=category.id)
+        db.session.add_all([easy, hard])
+        db.session.commit()
+        start = datetime(2026, 1, 1, 12, 0)
+        for minutes, user, challenge in [(1, users[1], easy), (2, users[2], easy), (3, users[0], hard), (4, users[3], hard)]:
+            user.score += challenge.points
+            db.session.add(Submission(user_id=user.id, challenge_id=challenge.id, timestamp=start + timedelta(minutes=minutes), score_at_submission=user.score))
+        db.session.commit()
+        yield app
+        db.drop_all()
+
+def _ranked_by_database():
+    """
+    The ranking as the scoreboard endpoint used to query it.
+    """
+    from scripts.models import User, Challenge, Submission
+    return [{'username': username, 'score': score} for username, score, _ in db.session.query(
+        User.username,
+        func.coalesce(func.sum(Challenge.points), 0),
+        func.max(Submission.timestamp)
+    ).outerjoin(Submission, User.id == Submission.user_id)
+     .outerjoin(Challenge, Submission.challenge_id == Challenge.id)
+     .filter(User.hidden == False)
+     .group_by(User.id, User.username)
+     .order_by(func.coalesce(func.sum(Challenge.points), 0).desc(), func.max(Submission.timestamp).asc().nullslast(), User.id.asc())
+     .all()]
+
+def test_solves_awards_and_hints_update_the_scoreboard_incrementally(app):
+    from scripts.models import User, Challenge, Submission
+    with app.app_context():
+        scoreboard = scoreboard_cache.get_scoreboard(10)
+        assert scoreboard['all_players_ranked'] == _ranked_by_database()
+        assert [player['username'] for player in scoreboard['all_players_ranked']] == ['alice', 'bob', 'carol']
+        assert [point['y'] for point in scoreboard['top_players_history']['alice']] == [0, 30]
+        rebuilds = scoreboard_cache.rebuilds
+
+        # carol solves hard and overtakes alice, then bob gets an award and reveals a hint
+        carol = User.query.filter_by(username='carol').one()
+        carol.score += 30
+        db.session.add(Submission(user_id=carol.id, challenge_id=Challenge.query.filter_by(name='hard').one().id, score_at_submission=carol.score))
+        db.session.commit()
+        bob = User.query.filter_by(username='bob').one()
+        bob.score += 50
+        db.session.commit()
+        bob.score -= 5
+        db.session.commit()
+
+        scoreboard = scoreboard_cache.get_scoreboard(2)
+        assert scoreboard_cache.rebuilds == rebuilds
+        assert scoreboard['all_players_ranked'] == _ranked_by_database()
+        assert scoreboard['all_players_ranked'][0] == {'username': 'carol', 'score': 40}
+        assert list(scoreboard['top_players_history']) == ['bob', 'carol']
+        assert [point['y'] for point in scoreboard['top_players_history']['carol']] == [0, 10, 40]
+
+        # Hiding a user cannot be applied incrementally and rebuilds the scoreboard
+        carol.hidden = True
+        db.session.commit()
+        assert scoreboard_cache.get_scoreboard(10)['all_players_ranked'] == _ranked_by_database()
+        assert scoreboard_cache.rebuilds == rebuilds + 1
+
+def test_rolled_back_changes_are_not_applied(app):
+    from scripts.models import User
+    with app.app_context():
+        scoreboard_cache.get_scoreboard(10)
+        alice = User.query.filter_by(username='alice').one()
+        alice.score += 100
+        db.session.flush()
+        db.session.rollback()
+        scoreboard = scoreboard_cache.get_scoreboard(1)
+        assert list(scoreboard['top_players_history']) == ['alice']
+        assert scoreboard['all_players_ranked'] == _ranked_by_database()
+
+def test_players_without_submissions_rank_last_among_equal_scores(app):
+    from scripts.models import User, Category, Challenge, Submission
+    with app.app_context():
+        # frank is the older account but has not submitted anything; erin solved a challenge worth nothing
+        frank, erin = (User(username=name, email=f'{name}@example.com', password_hash='x') for name in ('frank', 'erin'))
+        db.session.add_all([frank, erin])
+        db.session.commit()
+        warmup = Challenge(name='warmup', description='d', points=0, category_id=Category.query.first().id)
+        db.session.add(warmup)
+        db.session.commit()
+        db.session.add(Submission(user_id=erin.id, challenge_id=warmup.id, score_at_submission=0))
+        db.session.commit()
+
+        ranked = [player['username'] for player in scoreboard_cache.get_scoreboard(10)['all_players_ranked']]
+        assert ranked == ['alice', 'bob', 'carol', 'erin', 'frank']
+        assert ranked == [player['username'] for player in _ranked_by_database()]
+
+def test_unchanged_polls_and_history_deltas(app):
+    from scripts.models import User, Challenge, Submission
+    client = app.test_client()
+    with app.app_context():
+        carol_id = User.query.filter_by(username='carol').one().id
+        hard_id = Challenge.query.filter_by(name='hard').one().id
+    with client.session_transaction() as session:
+        session['_user_id'] = str(carol_id)
+
+    response = client.get('/api/scoreboard_data')
+    assert response.status_code == 200 and not response.get_json()['delta']
+    version = response.get_json()['version']
+    assert client.get('/api/scoreboard_data', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    challenges = client.get('/api/public/challenges')
+    assert client.get('/api/public/challenges', headers={'If-None-Match': challenges.headers['ETag']}).status_code == 304
+
+    with app.app_context():
+        carol = db.session.get(User, carol_id)
+        carol.score += 30
+        db.session.add(Submission(user_id=carol_id, challenge_id=hard_id, score_at_submission=carol.score))
+        db.session.commit()
+
+    assert client.get('/api/scoreboard_data', headers={'If-None-Match': response.headers['ETag']}).status_code == 200
+    assert client.get('/api/public/challenges', headers={'If-None-Match': challenges.headers['ETag']}).status_code == 200
+    delta = client.get(f'/api/scoreboard_data?since={version}').get_json()
+    assert delta['delta'] and delta['top_players'] == ['carol', 'alice', 'bob']
+    assert [point['y'] for point in delta['top_players_history']['carol']] == [40]
+    assert delta['top_players_history']['alice'] == [] and delta['version'] != version
+    assert client.get('/api/scoreboard_data?points=many').status_code == 400
+    # Versions of another process or from before a rebuild get the full history
+    assert not client.get('/api/scoreboard_data?since=0.1').get_json()['delta']
+
+def test_compact_scoreboard_data(app):
+    from scripts.models import User
+    client = app.test_client()
+    with app.app_context():
+        alice_id = User.query.filter_by(username='alice').one().id
+    with client.session_transaction() as session:
+        session['_user_id'] = str(alice_id)
+
+    plain = client.get('/api/scoreboard_data').get_json()
+    compact = client.get('/api/scoreboard_data?format=compact').get_json()
+    assert compact['encoding'] == 'compact' and compact['users'] == ['alice', 'bob', 'carol']
+    assert [{'username': username, 'score': score} for username, score in zip(compact['users'], compact['scores'])] == plain['all_players_ranked']
+    alice = next(series for series in compact['top_players_history'] if compact['users'][series['u']] == 'alice')
+    assert alice['y'] == [point['y'] for point in plain['top_players_history']['alice']]
+    assert alice['t'][-1] == (datetime(2026, 1, 1, 12, 3) - datetime(1970, 1, 1)) // timedelta(milliseconds=1)
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+from flask import Flask
+
+from app import create_app
+from scripts.extensions import db
+from scripts.config import TestConfig
+from scripts.scoreboard_events import ScoreboardEventHub, scoreboard_events
+
+def _events(messages):
+    """
+    Parses Server-Sent Events into (event type, data) pairs.
+    """
+    events = []
+    for message in "".join(messages).split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines() if not line.startswith(":"))
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+def test_events_fan_out_within_the_connection_budget():
+    app = Flask(__name__)
+    app.config.update(LIVE_SCOREBOARD_MAX_CLIENTS=2, LIVE_SCOREBOARD_CLIENT_BUFFER_BYTES=1024)
+    hub = ScoreboardEventHub()
+    hub.init_app(app)
+    first, second = hub.subscribe(), hub.subscribe()
+    assert hub.subscribe() is None
+
+    hub.publish('award', {'user': 'alice', 'delta': 5})
+    assert _events(hub._take(first, 0)) == [('award', {'user': 'alice', 'delta': 5})]
+
+    # The second client does not read; once its budget is exceeded only a reset is kept
+    received = []
+    for delta in range(100):
+        hub.publish('award', {'user': 'alice', 'delta': delta})
+        received += _events(hub._take(first, 0))
+    assert _events(hub._take(second, 0)) == [('reset', {})]
+    assert [data['delta'] for _, data in received] == list(range(100))
+
+    stream = hub.stream(first)
+    assert next(stream).startswith("retry:")
+    hub.disconnect_all()
+    assert list(stream) == [] and hub.client_count == 0
+
+class LiveScoreboardTestConfig(TestConfig):
+    LIVE_SCOREBOARD_MAX_CLIENTS = 2
+
+@pytest.fixture
+def app():
+    app = create_app(config_class=LiveScoreboardTestConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        from scripts.models import User, Category, Challenge
+        db.session.add_all([User(username=name, email=f'{name}@example.com', password_hash='x') for name in ('alice', 'bob')])
+        db.session.add(Category(name='Live'))
+        db.session.commit()
+        db.session.add(Challenge(name='live', description='d', points=25, category_id=1))
+        db.session.commit()
+        yield app
+        db.drop_all()
+
+def test_committed_solves_are_published(app):
+    from scripts.models import User, Submission
+    from scripts.scoreboard_cache import scoreboard_cache
+    subscription = scoreboard_events.subscribe()
+    try:
+        with app.app_context():
+            scoreboard_cache.get_scoreboard(10)
+            bob = User.query.filter_by(username='bob').one()
+            bob.score += 25
+            db.session.add(Submission(user_id=bob.id, challenge_id=1, score_at_submission=bob.score))
+            db.session.commit()
+            bob.score -= 5
+            db.session.commit()
+        (solve_type, solve), (award_type, award) = _events(scoreboard_events._take(subscription, 0))
+    finally:
+        scoreboard_events.unsubscribe(subscription)
+
+    # The score change of the solve is part of its solve event
+    assert solve_type == 'solve'
+    assert {key: solve[key] for key in ('user', 'delta', 'score', 'rank', 'graph_rank', 'y')} == \
+        {'user': 'bob', 'delta': 25, 'score': 25, 'rank': 1, 'graph_rank': 1, 'y': 25}
+    assert award_type == 'award' and (award['delta'], award['score'], award['rank']) == (-5, 25, 1)
+
+def test_the_stream_is_off_unless_configured():
+    assert not ScoreboardEventHub().enabled
+    app = create_app(config_class=TestConfig)
+    client = app.test_client()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        from scripts.models import User
+        user = User(username='alice', email='alice@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    try:
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+        # Scoreboards are told to poll, and connections are refused
+        assert client.get('/api/scoreboard_data').get_json()['live_updates'] is False
+        assert client.get('/api/scoreboard_events').status_code == 404
+    finally:
+        with app.app_context():
+            db.drop_all()
@@ -0,0 +1,125 @@
+import pytest
+from app import create_app
+from scripts.extensions import db
+from scripts.config import TestConfig
+
+class VerificationTestConfig(TestConfig):
+    SANDBOX_BACKEND = 'fake'
+    SANDBOX_FAKE_LATENCY_MS = 0
+    EXECUTION_CACHE_SIZE = 0
+    ADMIN_API_KEY = 'verification-test-key'
+
+@pytest.fixture(scope='module')
+def app():
+    """
+    Provides an application with a correct, a wrong and an unverifiable coding challenge.
+    The fake runtime echoes the test case input, so a test case passes if its input equals its expected output.
+    """
+    app = create_app(config_class=VerificationTestConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        from scripts.models import User, Category, Challenge, TestCase
+        admin = User(username='verify_admin', email='verify@example.com', password_hash='x', is_admin=True)
+        category = Category(name='Verify')
+        db.session.add_all([admin, category])
+        db.session.commit()
+        challenges = {}
+        for name, solution, test_cases in [
+            ('correct', "print(input())", [('a', 'a'), ('b', 'b')]),
+            ('wrong', "print(input())", [('a', 'a'), ('b', 'x'), ('c', 'c')]),
+            ('unsolved', None, [('a', 'a')]),
+        ]:
+            challenge = Challenge(name=name, description='d', points=10, category_id=category.id, challenge_type='CODING',
+                                  language='python3', reference_solution=solution, solution_verified=(name == 'wrong'))
+            db.session.add(challenge)
+            db.session.commit()
+            db.session.add_all([TestCase(challenge_id=challenge.id, input_data=input_data, expected_output=expected_output, order=i)
+                                for i, (input_data, expected_output) in enumerate(test_cases)])
+            challenges[name] = challenge.id
+        db.session.commit()
+        app.config['TEST_CHALLENGE_IDS'] = challenges
+        yield app
+        db.drop_all()
+
+def test_all_coding_challenges_are_verified(app):
+    client = app.test_client()
+    response = client.post('/api/admin/verify_coding_challenges', json={'max_parallel': 2}, headers={'X-API-KEY': 'verification-test-key'})
+    assert response.status_code == 200
+    report = response.get_json()
+    assert (report['total'], report['verified'], report['failed'], report['skipped']) == (3, 1, 1, 1)
+
+    entries = {entry['name']: entry for entry in report['challenges']}
+    assert entries['correct']['status'] == 'verified' and entries['correct']['passed'] == 2
+    # Verification stops at the first failing test case
+    assert entries['wrong']['status'] == 'failed' and entries['wrong']['passed'] == 1
+    assert entries['wrong']['message'].startswith("Output mismatch.")
+
+    from scripts.models import Challenge
+    with app.app_context():
+        verified = {challenge.name: challenge.solution_verified for challenge in Challenge.query.all()}
+    assert verified == {'correct': True, 'wrong': False, 'unsolved': False}
+
+def test_selection_and_validation(app):
+    client = app.test_client()
+    headers = {'X-API-KEY': 'verification-test-key'}
+    correct_id = app.config['TEST_CHALLENGE_IDS']['correct']
+    report = client.post('/api/admin/verify_coding_challenges', json={'challenge_ids': [correct_id]}, headers=headers).get_json()
+    assert [entry['challenge_id'] for entry in report['challenges']] == [correct_id]
+
+    response = client.post('/api/admin/verify_coding_challenges', json={'challenge_ids': 'all'}, headers=headers)
+    assert response.status_code == 400
+
+def _verified_flags(app):
+    from scripts.models import Challenge
+    with app.app_context():
+        return {challenge.name: challenge.solution_verified for challenge in Challenge.query.all()}
+
+def test_overlapping_verifications_use_their_own_flows(app, monkeypatch):
+    import threading
+    from scripts import solution_verification
+    flows = []
+    # Holds both runs inside run_test_cases until each has started its first challenge
+    both_running = threading.Barrier(2, timeout=10)
+    def run_test_cases(*args, **kwargs):
+        flows.append(kwargs['user_id'])
+        if len(flows) <= 2:
+            both_running.wait()
+        return real_run_test_cases(*args, **kwargs)
+    real_run_test_cases = solution_verification.run_test_cases
+    monkeypatch.setattr(solution_verification, 'run_test_cases', run_test_cases)
+
+    reports = []
+    def verify():
+        with app.app_context():
+            reports.append(solution_verification.verify_coding_challenges(max_parallel=1))
+    threads = [threading.Thread(target=verify) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(flows)) == 2
+    for report in reports:
+        assert (report['verified'], report['failed'], report['error']) == (1, 1, 0)
+    assert _verified_flags(app) == {'correct': True, 'wrong': False, 'unsolved': False}
+
+@pytest.mark.parametrize('superseded', [False, True])
+def test_runs_without_a_verdict_leave_the_flag_unchanged(app, monkeypatch, superseded):
+    from scripts import solution_verification
+    from scripts.code_execution import CodeExecutionResult, SUPERSEDED_MESSAGE
+    from scripts.executor_service import sandbox_executor
+    def run_test_cases(language, code, test_cases, **kwargs):
+        if superseded:
+            result = CodeExecutionResult(False, "", "", SUPERSEDED_MESSAGE)
+            result.superseded = True
+        else:
+            result = CodeExecutionResult(False, "", "", "An unexpected error occurred during execution: no sandbox executor could run the code")
+        return [result for _ in test_cases]
+    monkeypatch.setattr(sandbox_executor, 'run_test_cases', run_test_cases)
+
+    before = _verified_flags(app)
+    with app.app_context():
+        report = solution_verification.verify_coding_challenges()
+    assert (report['verified'], report['failed'], report['error'], report['skipped']) == (0, 0, 2, 1)
+    assert _verified_flags(app) == before
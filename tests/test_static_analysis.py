@@ -0,0 +1,44 @@
+import pytest
+from scripts.code_execution import _static_code_analysis, _required_literal, _python_syntax_error
+
+@pytest.mark.parametrize("language, code, expected_message", [
+    ('python3', "print('hi')", "OK"),
+    # Imports are reported before keywords and regexes, in blacklist order
+    ('python3', "eval(os)", "Forbidden import 'os' detected in code. This is not allowed for security reasons."),
+    ('python3', "eval('1')", "Forbidden keyword 'eval(' detected in code. This operation is not allowed."),
+    ('python3', "WHILE True:\n    pass", "Forbidden code pattern 'while\\s*True\\s*:' detected. This operation is not allowed."),
+    ('python3', "x = 'é'\nWhile  true :", "Forbidden code pattern 'while\\s*True\\s*:' detected. This operation is not allowed."),
+    ('nodejs', "console.log(1)", "OK"),
+    ('nodejs', "let a = require('x')", "Forbidden keyword 'require(' detected in code. This operation is not allowed."),
+    ('php', "echo $_get['a'];", "Forbidden code pattern '\\$\\_GET' detected. This operation is not allowed."),
+    ('bash', "echo hi", "OK"),
+    ('bash', "echo a || echo b", "Forbidden code pattern '\\|\\|\\s*' detected. This operation is not allowed."),
+    ('dart', "new File ('x')", "Forbidden code pattern 'new\\s+File\\s*\\(' detected. This operation is not allowed."),
+])
+def test_static_code_analysis_verdicts(language, code, expected_message):
+    is_safe, message = _static_code_analysis(language, code)
+    assert message == expected_message
+    assert is_safe == (expected_message == "OK")
+    # The memoised second call returns the same verdict
+    assert _static_code_analysis(language, code) == (is_safe, message)
+
+@pytest.mark.parametrize("pattern, expected", [
+    (r'import\s+[a-zA-Z_]', 'import'),
+    (r'\bcat\s+/etc/passwd\b', 'cat'),
+    (r'\$\_GET', '$_get'),
+    (r'colou?r', 'colo'),
+    (r'a|b', None),
+    (r'\w+', None),
+])
+def test_required_literal(pattern, expected):
+    assert _required_literal(pattern) == expected
+
+def test_python_syntax_error_matches_runtime_report():
+    assert _python_syntax_error('python3', "print('ok')") is None
+    report = _python_syntax_error('python3', "print(\n")
+    assert report.startswith('File "/sandbox/user_code.py", line 1')
+    assert report.endswith("SyntaxError: '(' was never closed")
+    # Compiler errors carry no source line, the runtime prints it from the file
+    assert _python_syntax_error('python3', "x = 1\nreturn x") == (
+        'File "/sandbox/user_code.py", line 2\n    return x\n    ^^^^^^^^\nSyntaxError: \'return\' outside function'
+    )
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from app import create_app
+from scripts.extensions import db
+from scripts.config import TestConfig
+
+class StreamTestConfig(TestConfig):
+    SANDBOX_BACKEND = 'fake'
+    SANDBOX_FAKE_LATENCY_MS = 0
+    EXECUTION_CACHE_SIZE = 0
+
+@pytest.fixture(scope='module')
+def app():
+    """
+    Provides an application with a coding challenge whose fake runtime echoes the test case input.
+    """
+    app = create_app(config_class=StreamTestConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        from scripts.models import User, Category, Challenge, TestCase
+        user = User(username='stream_user', email='stream@example.com', password_hash='x')
+        category = Category(name='Stream')
+        db.session.add_all([user, category])
+        db.session.commit()
+        challenge = Challenge(name='Stream Challenge', description='d', points=10, category_id=category.id, challenge_type='CODING', language='python3')
+        db.session.add(challenge)
+        db.session.commit()
+        db.session.add_all([
+            TestCase(challenge_id=challenge.id, input_data='a', expected_output='a', order=0),
+            TestCase(challenge_id=challenge.id, input_data='b', expected_output='x', order=1),
+        ])
+        db.session.commit()
+        app.config['TEST_USER_ID'] = user.id
+        app.config['TEST_CHALLENGE_ID'] = challenge.id
+        yield app
+        db.drop_all()
+
+def test_results_are_streamed_per_test_case(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(app.config['TEST_USER_ID'])
+
+    response = client.post(f"/api/challenges/{app.config['TEST_CHALLENGE_ID']}/submit_code/stream", json={'code': "print(input())"})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert events[0] == {'event': 'start', 'test_case_count': 2}
+    streamed = {event['index']: event['result']['passed'] for event in events if event['event'] == 'test_case'}
+    assert streamed == {0: True, 1: False}
+    done = events[-1]
+    assert done['event'] == 'done' and done['status'] == 200
+    assert [result['passed'] for result in done['result']['test_case_results']] == [True, False]
+
+def test_busy_grading_threads_grade_in_the_request(app, monkeypatch):
+    from scripts import api_routes
+    monkeypatch.setattr(api_routes._stream_grading_pool, 'submit', lambda app, fn: False)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(app.config['TEST_USER_ID'])
+
+    response = client.post(f"/api/challenges/{app.config['TEST_CHALLENGE_ID']}/submit_code/stream", json={'code': "print(input())"})
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [event['event'] for event in events] == ['start', 'test_case', 'test_case', 'done']
+    assert [result['passed'] for result in events[-1]['result']['test_case_results']] == [True, False]
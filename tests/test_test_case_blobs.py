@@ -0,0 +1,124 @@
+import os
+
+import pytest
+from flask import Flask
+
+from scripts import code_execution
+from scripts import models
+from scripts.config import TestConfig
+from scripts.test_case_blobs import test_case_blob_store
+
+# Echoes the 50000 lines of input the tests run it with
+_ECHO_CODE = "for _ in range(50000):\n    print(input())"
+
+@pytest.fixture
+def blob_store(tmp_path):
+    """
+    Stores test case data of 1 KB or more in a temporary directory.
+    """
+    app = Flask(__name__)
+    app.config.update(TEST_CASE_BLOB_DIR=str(tmp_path), TEST_CASE_BLOB_THRESHOLD_BYTES=1024)
+    test_case_blob_store.init_app(app)
+    yield test_case_blob_store
+    app.config.from_object(TestConfig)
+    test_case_blob_store.init_app(app)
+
+def test_large_data_is_moved_out_of_the_row(blob_store, tmp_path):
+    large_input = "\n".join(str(i) for i in range(1000))
+    test_case = models.TestCase(challenge_id=1, input_data=large_input, expected_output="small", order=0)
+    assert test_case.input_data is None and test_case.expected_output == "small"
+    blob_path = os.path.join(tmp_path, test_case.input_data_blob[:2], test_case.input_data_blob)
+    # Nothing is written until the test case is flushed
+    assert not os.path.exists(blob_path)
+    assert test_case.read_input_data() == large_input
+    test_case.write_pending_blobs()
+    assert os.path.exists(blob_path)
+    assert test_case.read_input_data() == large_input
+    assert test_case.expected_output_source() == "small"
+
+    # Identical data is stored once
+    other = models.TestCase(challenge_id=2, input_data="x", expected_output=large_input, order=0)
+    assert other.expected_output == "" and other.expected_output_blob == test_case.input_data_blob
+    assert other.input_source() == "x"
+
+def test_blobs_are_written_on_flush_and_collected_when_unreferenced(tmp_path):
+    from app import create_app
+    from scripts.extensions import db
+    app = create_app(config_class=TestConfig)
+    app.config.update(TEST_CASE_BLOB_DIR=str(tmp_path), TEST_CASE_BLOB_THRESHOLD_BYTES=1024)
+    test_case_blob_store.init_app(app)
+    kept, replaced, rolled_back = ("\n".join(f"{name} {i}" for i in range(1000)) for name in ('kept', 'replaced', 'rolled back'))
+    try:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            test_case = models.TestCase(challenge_id=1, input_data=replaced, expected_output=kept, order=0)
+            db.session.add(test_case)
+            db.session.commit()
+            replaced_digest, kept_digest = test_case.input_data_blob, test_case.expected_output_blob
+            assert test_case_blob_store.get(replaced_digest).read_text() == replaced
+
+            # A rolled back assignment that was never flushed writes nothing
+            test_case.input_data = rolled_back
+            rolled_back_digest = test_case.input_data_blob
+            db.session.rollback()
+            assert not os.path.exists(test_case_blob_store.get(rolled_back_digest).path)
+
+            test_case.input_data = "small"
+            db.session.commit()
+            assert not os.path.exists(test_case_blob_store.get(rolled_back_digest).path)
+            # Recently written files survive, since their transaction may not have committed yet
+            assert models.collect_test_case_blobs() == 0
+            for digest in (replaced_digest, kept_digest):
+                os.utime(test_case_blob_store.get(digest).path, (0, 0))
+            assert models.collect_test_case_blobs() == 1
+            assert not os.path.exists(test_case_blob_store.get(replaced_digest).path)
+            assert test_case.read_expected_output() == kept
+            db.drop_all()
+    finally:
+        app.config.from_object(TestConfig)
+        test_case_blob_store.init_app(app)
+
+@pytest.mark.parametrize('mode', ['sequential', 'batch', 'parallel'])
+def test_blob_test_cases_run_without_loading_them(blob_store, mode):
+    numbers = "\n".join(str(i) for i in range(50000))
+    test_case = models.TestCase(challenge_id=1, input_data=numbers, expected_output=numbers + "\n", order=0)
+    wrong = models.TestCase(challenge_id=1, input_data=numbers, expected_output=numbers[:-1] + "0", order=1)
+    for tc in (test_case, wrong):
+        tc.write_pending_blobs()
+    test_cases = [(tc.input_source(), tc.expected_output_source()) for tc in (test_case, wrong)]
+
+    app = Flask(__name__)
+    app.config.from_object(TestConfig)
+    app.config.update(SANDBOX_BACKEND='rlimit', CODE_EXECUTION_MODE=mode)
+    with app.app_context():
+        results = code_execution.execute_test_cases('python3', _ECHO_CODE, test_cases)
+    assert results[0].success, results[0].error_message
+    assert not results[1].success and results[1].error_message.startswith("Output mismatch.")
+    assert "truncated to" in results[1].error_message
+
+@pytest.mark.parametrize('digest', ['../../../etc/shadow', '/etc/shadow', 'AB' * 32, 'ab' * 31, None])
+def test_blob_digests_cannot_escape_the_store(blob_store, digest):
+    from scripts.executor_service import test_case_data_from_wire
+    with pytest.raises(ValueError):
+        test_case_data_from_wire({'blob': digest})
+    assert test_case_blob_store.get('ab' * 32).digest == 'ab' * 32
+
+def test_existing_databases_get_the_blob_columns():
+    from app import create_app
+    from scripts.extensions import db
+    app = create_app(config_class=TestConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        # A test_case table as created before the blob columns existed
+        with db.engine.begin() as connection:
+            connection.execute(db.text("DROP TABLE test_case"))
+            connection.execute(db.text(
+                "CREATE TABLE test_case (id INTEGER PRIMARY KEY, challenge_id INTEGER NOT NULL, "
+                "input_data TEXT, expected_output TEXT NOT NULL, \"order\" INTEGER NOT NULL)"
+            ))
+        models.upgrade_schema()
+        models.upgrade_schema()
+        assert models.TestCase.query.filter(models.TestCase.input_data_blob.is_(None)).count() == 0
+        db.drop_all()
@@ -0,0 +1,117 @@
+import shutil
+import subprocess
+import sys
+import time
+from collections import deque
+
+import pytest
+
+from scripts.sandbox_limits import SandboxLimits
+from scripts.warm_pool import WarmInterpreterPool, WARM_POOL_BOOTSTRAPS, encode_submission
+
+_PROGRAMS = {
+    'python3': [
+        ("import sys\nprint(__name__, sys.argv[0].endswith('user_code.py'))\nprint(input())\nprint(sys.stdin.read().upper(), end='')\n", "first\nsecond\nthird\n"),
+        ("print('no input')\n", None),
+        ("def fail():\n    raise ValueError('broken')\n\nfail()\n", None),
+        ("import sys\nsys.exit(3)\n", None),
+    ],
+    'nodejs': [
+        ("const lines = require('fs').readFileSync(0, 'utf8').split('\\n');\nconsole.log(require.main === module, lines[0], lines.length);\n", "first\nsecond\n"),
+        ("process.exitCode = 3;\nconsole.log('exit code');\n", None),
+    ],
+}
+
+_INTERPRETERS = {'python3': [sys.executable], 'nodejs': ['node']}
+
+def _run(args, stdin_bytes):
+    return subprocess.run(args, input=stdin_bytes, capture_output=True, timeout=10)
+
+def _bootstrap_args(language, sandbox_dir):
+    # The sandbox's /sandbox directory is a temporary directory on the host
+    inline_option, bootstrap = WARM_POOL_BOOTSTRAPS[language]
+    return _INTERPRETERS[language] + [inline_option, bootstrap.replace('/sandbox', str(sandbox_dir))]
+
+@pytest.mark.parametrize('language,code,test_case_input', [
+    (language, code, test_case_input) for language, programs in _PROGRAMS.items() for code, test_case_input in programs
+])
+def test_warm_runs_match_cold_runs(tmp_path, language, code, test_case_input):
+    if shutil.which(_INTERPRETERS[language][0]) is None:
+        pytest.skip(f"{language} is not installed")
+    warm_dir, cold_dir = tmp_path / 'warm', tmp_path / 'cold'
+    warm_dir.mkdir()
+    cold_dir.mkdir()
+    extension = '.py' if language == 'python3' else '.js'
+    # Tracebacks name the file, so both runs use the same path length and name
+    cold_path = cold_dir / f'user_code{extension}'
+    cold_path.write_text(code)
+
+    warm = _run(_bootstrap_args(language, warm_dir), encode_submission(code, test_case_input))
+    cold = _run(_INTERPRETERS[language] + [str(cold_path)], (test_case_input or "").encode('utf-8'))
+
+    assert (warm_dir / f'user_code{extension}').read_text() == code
+    assert warm.returncode == cold.returncode
+    assert warm.stdout == cold.stdout
+    # The bootstrap's own frame is dropped, so a traceback looks like the cold run's
+    assert warm.stderr.replace(b'/warm/', b'/cold/') == cold.stderr
+    assert b'<string>' not in warm.stderr
+
+def test_encode_submission_counts_bytes():
+    assert encode_submission("print('é')", "ü\n") == b"11\nprint('\xc3\xa9')\xc3\xbc\n"
+    assert encode_submission("") == b"0\n"
+
+def _idle_interpreter():
+    # Waits for stdin like a warm interpreter
+    process = subprocess.Popen([sys.executable, '-c', 'import sys; sys.stdin.read()'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return process, SandboxLimits(0, 0, 0).start_run('python3')
+
+def _stop(process):
+    process.kill()
+    process.wait()
+    for pipe in (process.stdin, process.stdout, process.stderr):
+        pipe.close()
+
+def test_acquire_discards_dead_interpreters():
+    pool = WarmInterpreterPool()
+    pool._languages = ('python3',)
+    dead, alive = _idle_interpreter(), _idle_interpreter()
+    _stop(dead[0])
+    pool._idle['python3'] = deque([dead, alive])
+    try:
+        assert pool.acquire('python3') is alive
+        assert not pool._idle['python3'] and dead[0].stdin.closed
+        assert pool.acquire('python3') is None and pool.acquire('nodejs') is None
+    finally:
+        _stop(alive[0])
+
+def test_refill_replaces_used_and_dead_interpreters(monkeypatch):
+    pool = WarmInterpreterPool()
+    pool._size = 2
+    pool._languages = ('python3',)
+    pool._idle['python3'] = deque()
+    spawned = []
+    def spawn(language):
+        spawned.append(_idle_interpreter())
+        return spawned[-1]
+    monkeypatch.setattr(pool, '_spawn', spawn)
+
+    def wait_for(condition):
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    try:
+        pool.start()
+        assert wait_for(lambda: pool.idle_count('python3') == 2)
+        used = pool.acquire('python3')
+        assert wait_for(lambda: pool.idle_count('python3') == 2) and len(spawned) == 3
+        # An interpreter dying while idle is replaced on the next pass
+        _stop(pool._idle['python3'][0][0])
+        pool._refill_needed.set()
+        assert wait_for(lambda: len(spawned) == 4 and pool.idle_count('python3') == 2)
+        assert used not in pool._idle['python3']
+    finally:
+        for process, _ in spawned:
+            if process.poll() is None:
+                _stop(process)